@@ -0,0 +1,162 @@
+"""
+Benchmark de /courses/course_content con muchas requests concurrentes.
+
+Corre la app en proceso (httpx + ASGITransport, todo en un event loop como
+un worker de uvicorn) contra --url y compara:
+    - sync: la ruta anterior, con la Session síncrona de get_db y las
+      consultas corriendo directo en el event loop
+    - async: la ruta actual, AsyncSession sobre asyncpg con run_sync
+
+Ambos modos usan el mismo pool (--pool-size + --max-overflow) y un usuario
+autenticado (esqueleto + is_paid, progress y marcas). Sin --warm el
+esqueleto se arma en cada request, así todas pasan por la base.
+
+En modo sync, con el pool agotado el event loop queda bloqueado esperando
+conexión y no puede cerrar las sesiones que la liberarían: cada request
+trabada bloquea el loop --sync-pool-timeout segundos y termina en 500
+(errors). Esperar más no ayuda, solo alarga el bloqueo.
+
+Uso (con las variables de entorno de la app cargadas):
+    python benchmarks/concurrency.py --url postgresql://.../bench --concurrency 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Optional
+
+import httpx
+from fastapi import Depends
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+from app.main import app
+from app.database.base import Base
+from app.database.config import SessionLocal
+from app.database.async_config import AsyncSessionLocal
+from app.database.queries.catalog import course_content_cache
+from app.dependencies import get_db, get_cookies_optional
+from app.routers.courses import _build_course_content
+
+USER = {"user_id": 1, "is_sensei": False}
+
+
+async def course_content_sync(
+    course_id: int,
+    user_info: Optional[dict] = Depends(get_cookies_optional),
+    db: Session = Depends(get_db)
+):
+    # Ruta anterior: consultas síncronas directo en el event loop
+    content = _build_course_content(db, course_id=course_id, user_info=user_info)
+    return JSONResponse(content=content, status_code=200)
+
+
+def seed(engine, sections: int, lessons: int, threads: int) -> None:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    total = sections * lessons
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, email) VALUES (1, 'student', 'student@bench')"))
+        conn.execute(text(
+            "INSERT INTO courses (id, sensei_id, name, price, lessons_count) VALUES (1, 1, 'course 1', 10, :total)"
+        ), {"total": total})
+        conn.execute(text(
+            "INSERT INTO sections (id, course_id, title) "
+            "SELECT g, 1, 'section ' || g FROM generate_series(1, :sections) g"
+        ), {"sections": sections})
+        conn.execute(text(
+            "INSERT INTO lessons (id, section_id, course_id, title, file_id, mime_type) "
+            "SELECT g, 1 + (g - 1) / :lessons, 1, 'lesson ' || g, 'file-' || g, 'video/mp4' "
+            "FROM generate_series(1, :total) g"
+        ), {"lessons": lessons, "total": total})
+        conn.execute(text(
+            "INSERT INTO threads (lesson_id, user_id, topic, description) "
+            "SELECT 1 + g % :total, 1, 'topic ' || g, 'question ' || g FROM generate_series(1, :threads) g"
+        ), {"total": total, "threads": threads})
+        conn.execute(text("INSERT INTO my_byd_courses (user_id, course_id, price) VALUES (1, 1, 10)"))
+        conn.execute(text(
+            "INSERT INTO lessons_complete (user_id, lesson_id) "
+            "SELECT 1, g FROM generate_series(1, :total / 2) g"
+        ), {"total": total})
+        conn.execute(text("ANALYZE"))
+
+
+async def burst(path: str, concurrency: int) -> dict:
+    # Un error del pool cuenta como respuesta 500, no corta el benchmark
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        (await client.get(path)).raise_for_status()
+
+        async def one():
+            start = time.perf_counter()
+            response = await client.get(path)
+            return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    times = sorted(latency for latency, status in results)
+    return {
+        "throughput": concurrency / elapsed,
+        "p50": statistics.median(times) * 1000,
+        "p99": times[max(0, int(len(times) * 0.99) - 1)] * 1000,
+        "errors": sum(status != 200 for latency, status in results),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent course_content on the sync and asyncpg paths")
+    parser.add_argument("--url", required=True, help="Empty Postgres database (tables are recreated)")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--sections", type=int, default=10)
+    parser.add_argument("--lessons", type=int, default=10, help="Lessons per section")
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--max-overflow", type=int, default=10)
+    parser.add_argument("--pool-timeout", type=float, default=45, help="Same as config.pool_args")
+    parser.add_argument("--sync-pool-timeout", type=float, default=1, help="Sync path: every stalled request blocks the loop this long")
+    parser.add_argument("--warm", action="store_true", help="Serve the skeleton from course_content_cache")
+    args = parser.parse_args(argv)
+
+    pool = {"pool_size": args.pool_size, "max_overflow": args.max_overflow}
+    engine = create_engine(args.url, pool_pre_ping=True, pool_timeout=args.sync_pool_timeout, **pool)
+    async_engine = create_async_engine(
+        make_url(args.url).set(drivername="postgresql+asyncpg"), pool_timeout=args.pool_timeout, **pool
+    )
+    seed(engine, args.sections, args.lessons, args.threads)
+    SessionLocal.configure(bind=engine)
+    AsyncSessionLocal.configure(bind=async_engine)
+
+    if not args.warm:
+        course_content_cache.set = lambda *args, **kwargs: None
+    app.dependency_overrides[get_cookies_optional] = lambda: USER
+    app.add_api_route("/bench/course_content_sync", course_content_sync, methods=["GET"])
+
+    paths = {
+        "sync": "/bench/course_content_sync?course_id=1",
+        "async": "/api/courses/course_content?course_id=1",
+    }
+    async def run_round(path: str) -> dict:
+        try:
+            return await burst(path, args.concurrency)
+        finally:
+            # Las conexiones asyncpg quedan atadas al event loop de la ronda
+            await async_engine.dispose()
+
+    for mode, path in paths.items():
+        for round_ in range(args.rounds):
+            result = asyncio.run(run_round(path))
+            print(
+                f"{mode:5} round {round_ + 1}: {args.concurrency} requests  {result['throughput']:7.1f} req/s"
+                f"   p50 {result['p50']:8.1f} ms   p99 {result['p99']:8.1f} ms   errors {result['errors']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
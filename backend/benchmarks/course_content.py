@@ -0,0 +1,121 @@
+"""
+Benchmark de tamaño de respuesta y latencia de los endpoints de contenido
+de curso sobre un curso sintético grande (por defecto 25 secciones y 500
+lecciones):
+    - /courses/course_content: curso completo (lo que cargaba el front)
+    - /courses/course_skeleton: estructura sin archivos, hilos ni marcas
+    - /courses/course_section: una sección con el detalle completo
+
+Corre la app en proceso (httpx + ASGITransport) con un usuario autenticado
+que compró el curso. warm: esqueleto desde course_content_cache; cold: se
+vacía el cache antes de cada request.
+
+Uso (con las variables de entorno de la app cargadas):
+    python benchmarks/course_content.py --url postgresql://.../bench --sections 25 --lessons 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.main import app
+from app.database.base import Base
+from app.database.async_config import AsyncSessionLocal
+from app.database.queries.catalog import course_content_cache
+from app.dependencies import get_cookies_optional
+
+USER = {"user_id": 1, "is_sensei": False}
+
+
+def seed(engine, sections: int, lessons: int, threads: int) -> None:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    total = sections * lessons
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, email) VALUES (1, 'student', 'student@bench')"))
+        conn.execute(text(
+            "INSERT INTO courses (id, sensei_id, name, description, price, lessons_count) "
+            "VALUES (1, 1, 'course 1', repeat('description ', 50), 10, :total)"
+        ), {"total": total})
+        conn.execute(text(
+            "INSERT INTO sections (id, course_id, title) "
+            "SELECT g, 1, 'section ' || g FROM generate_series(1, :sections) g"
+        ), {"sections": sections})
+        conn.execute(text(
+            "INSERT INTO lessons (id, section_id, course_id, title, file_id, mime_type, time_validator) "
+            "SELECT g, 1 + (g - 1) / :lessons, 1, 'lesson ' || g, 'lessons/file-' || g || '.mp4', 'video/mp4', 600 "
+            "FROM generate_series(1, :total) g"
+        ), {"lessons": lessons, "total": total})
+        conn.execute(text(
+            "INSERT INTO threads (lesson_id, user_id, topic, description) "
+            "SELECT 1 + g % :total, 1, 'topic ' || g, 'question ' || g FROM generate_series(1, :threads) g"
+        ), {"total": total, "threads": threads})
+        conn.execute(text("INSERT INTO my_byd_courses (user_id, course_id, price) VALUES (1, 1, 10)"))
+        conn.execute(text(
+            "INSERT INTO lessons_complete (user_id, lesson_id) "
+            "SELECT 1, g FROM generate_series(1, :total / 2) g"
+        ), {"total": total})
+        conn.execute(text(
+            "INSERT INTO lesson_mark_time (user_id, lesson_id, mark_time, updated_at) "
+            "SELECT 1, g, 30, now() FROM generate_series(1, :total / 2) g"
+        ), {"total": total})
+        conn.execute(text("ANALYZE"))
+
+
+async def measure(client: httpx.AsyncClient, path: str, repeat: int, cold: bool) -> dict:
+    times = []
+    size = 0
+    for _ in range(repeat):
+        if cold:
+            course_content_cache.clear()
+        start = time.perf_counter()
+        response = await client.get(path)
+        times.append(time.perf_counter() - start)
+        response.raise_for_status()
+        size = len(response.content)
+    return {"p50": statistics.median(times) * 1000, "size": size}
+
+
+async def run(paths: dict, repeat: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench/api/courses") as client:
+        for name, path in paths.items():
+            (await client.get(path)).raise_for_status()
+            for cold in (False, True):
+                result = await measure(client, path, repeat, cold)
+                print(
+                    f"{name:16} {'cold' if cold else 'warm':4}  {result['size'] / 1024:8.1f} KB"
+                    f"   p50 {result['p50']:7.2f} ms"
+                )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark course_content vs course_skeleton/course_section")
+    parser.add_argument("--url", required=True, help="Empty Postgres database (tables are recreated)")
+    parser.add_argument("--sections", type=int, default=25)
+    parser.add_argument("--lessons", type=int, default=20, help="Lessons per section")
+    parser.add_argument("--threads", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    seed(create_engine(args.url), args.sections, args.lessons, args.threads)
+    AsyncSessionLocal.configure(bind=create_async_engine(make_url(args.url).set(drivername="postgresql+asyncpg")))
+    app.dependency_overrides[get_cookies_optional] = lambda: USER
+
+    section_id = (args.sections + 1) // 2
+    paths = {
+        "course_content": "/course_content?course_id=1",
+        "course_skeleton": "/course_skeleton?course_id=1",
+        "course_section": f"/course_section?course_id=1&section_id={section_id}",
+    }
+    asyncio.run(run(paths, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
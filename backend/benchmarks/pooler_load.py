@@ -0,0 +1,206 @@
+"""
+Prueba de carga del modo pooler de transacciones (DB_POOL_MODE=transaction)
+a través de PgBouncer (pool_mode = transaction).
+
+Arranca --workers procesos, cada uno con la app configurada en modo pooler
+(engines con los connect_args y pool_args de config.py y async_config.py,
+timeouts con SET LOCAL) y --concurrency requests en paralelo durante
+--duration segundos contra endpoints sync y async. Mientras tanto muestrea
+pg_stat_activity por la conexión directa (--admin-url): con el pooler el
+total de conexiones de servidor debe quedar estable y acotado por el
+default_pool_size de PgBouncer, sin importar workers x concurrency.
+
+Ejemplo de pgbouncer.ini:
+    [databases]
+    bench = host=127.0.0.1 port=5432 dbname=bench
+    [pgbouncer]
+    listen_port = 6432
+    pool_mode = transaction
+    default_pool_size = 20
+    max_client_conn = 1000
+
+Uso (con las variables de entorno de la app cargadas; la base debe estar vacía):
+    python benchmarks/pooler_load.py \\
+        --url postgresql://postgres@127.0.0.1:6432/bench \\
+        --admin-url postgresql://postgres@127.0.0.1:5432/bench \\
+        --workers 4 --concurrency 50 --duration 30
+"""
+
+import os
+
+# Antes de importar la app: config.py decide el modo al importarse
+os.environ["DB_POOL_MODE"] = "transaction"
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+
+# Rutas que no bloquean el event loop: AsyncSession (asyncpg) o Session
+# (psycopg2) vía run_db. Las de /stats corren la Session en el loop y con el
+# pool agotado se traban (ver benchmarks/concurrency.py), no miden el pooler
+ENDPOINTS = [
+    "/api/courses/course_content?course_id=1",   # AsyncSession
+    "/api/courses/mtd_courses",                   # AsyncSession
+    "/api/courses/my_courses",                    # AsyncSession
+    "/api/health/db",                             # Session vía run_db
+]
+
+USER = {"user_id": 1, "is_sensei": False}
+
+
+def seed(admin_url: str) -> None:
+    from app.database.base import Base
+
+    engine = create_engine(admin_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, email) VALUES (1, 'student', 'student@bench')"))
+        conn.execute(text(
+            "INSERT INTO courses (id, sensei_id, name, price, lessons_count) VALUES (1, 1, 'course 1', 10, 100)"
+        ))
+        conn.execute(text(
+            "INSERT INTO sections (id, course_id, title) SELECT g, 1, 'section ' || g FROM generate_series(1, 10) g"
+        ))
+        conn.execute(text(
+            "INSERT INTO lessons (id, section_id, course_id, title, file_id, mime_type) "
+            "SELECT g, 1 + (g - 1) / 10, 1, 'lesson ' || g, 'file-' || g, 'video/mp4' FROM generate_series(1, 100) g"
+        ))
+        conn.execute(text("INSERT INTO my_byd_courses (user_id, course_id, price) VALUES (1, 1, 10)"))
+    engine.dispose()
+
+
+def bind_app(url: str, ssl: bool) -> None:
+    """Engines de la app en modo pooler apuntando a --url."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.database import config
+    from app.database.async_config import AsyncSessionLocal, async_connect_args, async_pool_args, to_async_url
+
+    connect_args = {**config.connect_args, "sslmode": "require" if ssl else "disable"}
+    engine = create_engine(url, connect_args=connect_args, **config.pool_args)
+    event.listen(engine, "begin", config.set_local_timeouts)
+    config.SessionLocal.configure(bind=engine)
+
+    async_engine = create_async_engine(
+        to_async_url(url),
+        connect_args={**async_connect_args("byteTECH_pooler_bench"), "ssl": "require" if ssl else False},
+        **async_pool_args()
+    )
+    event.listen(async_engine.sync_engine, "begin", config.set_local_timeouts)
+    AsyncSessionLocal.configure(bind=async_engine)
+
+
+def worker(url: str, ssl: bool, concurrency: int, duration: float, ready, results) -> None:
+    import httpx
+
+    from app.main import app
+    from app.dependencies import get_cookies, get_cookies_optional
+
+    bind_app(url, ssl)
+    app.dependency_overrides[get_cookies] = lambda: USER
+    app.dependency_overrides[get_cookies_optional] = lambda: USER
+    # Todos los workers (y el muestreo) arrancan juntos, ya importada la app
+    ready.wait()
+
+    async def load():
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+            async def user_loop(offset: int):
+                nonlocal errors
+                index = offset
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    response = await client.get(ENDPOINTS[index % len(ENDPOINTS)])
+                    latencies.append(time.perf_counter() - start)
+                    errors += response.status_code != 200
+                    index += 1
+
+            await asyncio.gather(*(user_loop(offset) for offset in range(concurrency)))
+        return latencies, errors
+
+    latencies, errors = asyncio.run(load())
+    results.put({"latencies": latencies, "errors": errors})
+
+
+def sample_connections(admin_url: str, database: str, duration: float, interval: float) -> list[dict]:
+    engine = create_engine(admin_url, pool_size=1)
+    samples = []
+    query = text(
+        "SELECT count(*) AS total, count(*) FILTER (WHERE state = 'active') AS active "
+        "FROM pg_stat_activity WHERE datname = :database AND backend_type = 'client backend' "
+        "AND pid <> pg_backend_pid()"
+    )
+    deadline = time.perf_counter() + duration
+    with engine.connect() as conn:
+        while time.perf_counter() < deadline:
+            row = conn.execute(query, {"database": database}).one()
+            conn.rollback()
+            samples.append({"total": row.total, "active": row.active})
+            time.sleep(interval)
+    engine.dispose()
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the transaction-pooler mode through PgBouncer")
+    parser.add_argument("--url", required=True, help="Database URL through PgBouncer (pool_mode = transaction)")
+    parser.add_argument("--admin-url", required=True, help="Direct Postgres URL, used to seed and sample pg_stat_activity")
+    parser.add_argument("--workers", type=int, default=4, help="Processes, like uvicorn --workers")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent requests per worker")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--interval", type=float, default=0.5, help="pg_stat_activity sampling interval")
+    parser.add_argument("--ssl", action="store_true", help="Connect to the pooler with TLS")
+    args = parser.parse_args(argv)
+
+    seed(args.admin_url)
+
+    ready = multiprocessing.Barrier(args.workers + 1)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=worker, args=(args.url, args.ssl, args.concurrency, args.duration, ready, results)
+        )
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    ready.wait()
+
+    database = make_url(args.admin_url).database
+    samples = sample_connections(args.admin_url, database, args.duration, args.interval)
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = sorted(latency for outcome in outcomes for latency in outcome["latencies"])
+    errors = sum(outcome["errors"] for outcome in outcomes)
+    totals = [sample["total"] for sample in samples]
+    actives = [sample["active"] for sample in samples]
+    print(
+        f"{args.workers} workers x {args.concurrency} concurrent requests for {args.duration:.0f}s: "
+        f"{len(latencies)} requests ({len(latencies) / args.duration:.1f} req/s), {errors} errors"
+    )
+    if latencies:
+        print(
+            f"latency p50 {statistics.median(latencies) * 1000:.1f} ms   "
+            f"p99 {latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000:.1f} ms"
+        )
+    print(
+        f"server connections ({len(samples)} samples): min {min(totals)}  max {max(totals)}  "
+        f"mean {statistics.mean(totals):.1f}  stdev {statistics.pstdev(totals):.1f}   "
+        f"active max {max(actives)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
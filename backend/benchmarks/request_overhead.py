@@ -0,0 +1,123 @@
+"""
+Benchmark del costo por request de la sesión de base de datos (get_db).
+
+Corre la app en proceso (httpx + ASGITransport) contra --url y compara:
+    - before: get_db con el probe que hacía get_db_session antes de ceder la
+      sesión (SELECT 1 + COMMIT en cada request)
+    - after: get_db actual (el checkout lo valida pool_pre_ping)
+
+Endpoints medidos:
+    - sin base: /version y /health/ (no dependen de get_db)
+    - con base: /lessons_course y /stats/timeseries (una consulta cada uno)
+
+--latency-ms agrega una espera por sentencia y por COMMIT para simular el
+round trip a una base remota (la base local responde en ~0 ms).
+
+Uso (con las variables de entorno de la app cargadas):
+    python benchmarks/request_overhead.py --url postgresql://.../bench --requests 500 --latency-ms 2
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import create_engine, event, text
+
+from app.main import app
+from app.database.base import Base
+from app.database.config import SessionLocal
+from app.database.session import get_db_session
+from app.dependencies import get_db
+
+ENDPOINTS = {
+    "/version": "no db",
+    "/api/health/": "no db",
+    "/api/lessons_course?course_id=1": "db",
+    "/api/stats/timeseries?course_id=1": "db",
+}
+
+
+def get_db_with_probe():
+    # Lo que hacía get_db_session antes: probar la conexión antes de ceder la sesión
+    with get_db_session() as session:
+        session.execute(text("SELECT 1"))
+        session.commit()
+        yield session
+
+
+def seed(engine) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, username, email) VALUES (1, 'sensei', 'sensei@bench') "
+            "ON CONFLICT DO NOTHING"
+        ))
+        conn.execute(text(
+            "INSERT INTO courses (id, sensei_id, name, price, lessons_count) VALUES (1, 1, 'course 1', 10, 100) "
+            "ON CONFLICT DO NOTHING"
+        ))
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int, counter: dict) -> dict:
+    for _ in range(10):
+        (await client.get(path)).raise_for_status()
+    counter["statements"] = 0
+    times = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        (await client.get(path)).raise_for_status()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "p50": statistics.median(times) * 1000,
+        "p99": times[int(len(times) * 0.99) - 1] * 1000,
+        "statements": counter["statements"] / requests,
+    }
+
+
+async def run(mode: str, requests: int, counter: dict) -> None:
+    app.dependency_overrides.clear()
+    if mode == "before":
+        app.dependency_overrides[get_db] = get_db_with_probe
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path, kind in ENDPOINTS.items():
+            result = await measure(client, path, requests, counter)
+            print(
+                f"{mode:7} {kind:6} {path:36} p50 {result['p50']:7.2f} ms   p99 {result['p99']:7.2f} ms"
+                f"   {result['statements']:.1f} round trips/request"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per-request DB session overhead")
+    parser.add_argument("--url", required=True, help="Postgres database (tables are created if missing)")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated round trip per statement")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.url, pool_pre_ping=True, pool_size=5, max_overflow=10)
+    seed(engine)
+    SessionLocal.configure(bind=engine)
+
+    latency = args.latency_ms / 1000
+    counter = {"statements": 0}
+
+    def round_trip(*args):
+        counter["statements"] += 1
+        if latency:
+            time.sleep(latency)
+
+    # El ping de pool_pre_ping va directo al driver: no entra en la cuenta (igual en ambos modos)
+    event.listen(engine, "before_cursor_execute", round_trip)
+    event.listen(engine, "commit", round_trip)
+
+    for mode in ("before", "after"):
+        asyncio.run(run(mode, args.requests, counter))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark del rollup de ventas (sales_daily) sobre un dataset sintético.
+
+Crea el esquema en una base VACÍA, inserta --purchases compras repartidas
+en --days días y --courses cursos, y compara:
+    - scan: agregado por día y curso directo sobre my_byd_courses
+    - refresh: refresh_sales_rollup completo (job de puesta al día)
+    - timeseries: get_sales_timeseries (lo que sirve /stats/timeseries)
+    - record_sale: costo incremental por compra
+
+Uso (con las variables de entorno de la app cargadas):
+    python benchmarks/sales_rollup.py --url postgresql://.../bench --purchases 2000000
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database.base import Base
+from app.database.queries.stats import refresh_sales_rollup, get_sales_timeseries, record_sale
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def seed(engine, purchases: int, courses: int, days: int, users: int) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, username, email) "
+            "SELECT g, 'user' || g, 'user' || g || '@bench' FROM generate_series(1, :users) g"
+        ), {"users": users})
+        conn.execute(text(
+            "INSERT INTO courses (id, sensei_id, name, price) "
+            "SELECT g, 1, 'course ' || g, 10 + g % 50 FROM generate_series(1, :courses) g"
+        ), {"courses": courses})
+        # Pares (user, course) únicos: la compra g es del usuario g / courses
+        conn.execute(text(
+            "INSERT INTO my_byd_courses (user_id, course_id, created_at, price) "
+            "SELECT 1 + (g / :courses) % :users, 1 + g % :courses, "
+            "       now() - (g % :days) * interval '1 day', 10 + (g % :courses) % 50 "
+            "FROM generate_series(0, :purchases - 1) g"
+        ), {"purchases": purchases, "courses": courses, "days": days, "users": users})
+        conn.execute(text("ANALYZE"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the sales_daily rollup")
+    parser.add_argument("--url", required=True, help="Empty Postgres database")
+    parser.add_argument("--purchases", type=int, default=2_000_000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    users = args.purchases // args.courses + 1
+    engine = create_engine(args.url)
+    Session = sessionmaker(bind=engine)
+
+    start = time.perf_counter()
+    seed(engine, args.purchases, args.courses, args.days, users)
+    print(f"seed: {args.purchases} purchases in {time.perf_counter() - start:.1f}s")
+
+    scan = text(
+        "SELECT date(timezone('UTC', created_at)) AS day, course_id, count(*), sum(price) "
+        "FROM my_byd_courses GROUP BY 1, 2"
+    )
+    with Session() as db:
+        print(f"scan my_byd_courses:      {timed(lambda: db.execute(scan).all(), args.repeat):9.1f} ms")
+
+        start = time.perf_counter()
+        buckets = refresh_sales_rollup(db)
+        db.commit()
+        print(f"refresh_sales_rollup:     {(time.perf_counter() - start) * 1000:9.1f} ms ({buckets} buckets)")
+        db.execute(text("ANALYZE sales_daily"))
+
+        print(f"timeseries (all):         {timed(lambda: get_sales_timeseries(db), args.repeat):9.1f} ms")
+        print(f"timeseries (1 course):    {timed(lambda: get_sales_timeseries(db, course_id=1), args.repeat):9.1f} ms")
+
+        def one_sale():
+            record_sale(db, course_id=1, price=10.0)
+            db.rollback()
+        print(f"record_sale:              {timed(one_sale, 50):9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
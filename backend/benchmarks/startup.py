@@ -0,0 +1,82 @@
+"""
+Benchmark de arranque en frío de un worker.
+
+Cada medición corre en un proceso nuevo (import en frío, como un worker de
+uvicorn) contra una base ya migrada:
+    - after: import de app.main + startup del lifespan (chequeo de versión)
+    - before: import de app.main + Base.metadata.create_all, lo que hacía
+      cada worker al importarse antes de las migraciones (sin contar las
+      esperas de reintento que agregaba ante errores SSL)
+
+Uso (con las variables de entorno de la app cargadas):
+    python benchmarks/startup.py --url postgresql://.../bench --runs 5 --latency-ms 30
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import asyncio, json, sys, time
+start = time.perf_counter()
+import app.main
+from sqlalchemy import create_engine, event
+imported = time.perf_counter()
+
+engine = create_engine(sys.argv[2])
+latency = float(sys.argv[3]) / 1000
+queries = 0
+
+@event.listens_for(engine, "before_cursor_execute")
+def round_trip(*args):
+    # Latencia de red simulada por consulta (la base local responde en ~0 ms)
+    global queries
+    queries += 1
+    time.sleep(latency)
+
+if sys.argv[1] == "after":
+    import app.database.migrate as migrate
+    migrate.engine = engine
+
+    async def startup():
+        async with app.main.app.router.lifespan_context(app.main.app):
+            pass
+    asyncio.run(startup())
+    assert app.main.app.state.schema["up_to_date"], app.main.app.state.schema
+else:
+    from app.database.base import Base
+    Base.metadata.create_all(engine)
+ready = time.perf_counter()
+print(json.dumps({"import": imported - start, "init": ready - imported, "queries": queries}))
+"""
+
+
+def run(mode: str, url: str, latency_ms: float) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, mode, url, str(latency_ms)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark worker cold start")
+    parser.add_argument("--url", required=True, help="Migrated Postgres database")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated round trip per query")
+    args = parser.parse_args(argv)
+
+    for mode in ("before", "after"):
+        results = [run(mode, args.url, args.latency_ms) for _ in range(args.runs)]
+        imported = statistics.median(r["import"] for r in results) * 1000
+        init = statistics.median(r["init"] for r in results) * 1000
+        print(
+            f"{mode:7} import {imported:8.1f} ms   db init {init:8.1f} ms ({results[0]['queries']} queries)"
+            f"   total {imported + init:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# Configuracion del engine asíncrono (asyncpg) para los routers async.
+# Convive con database/config.py: mismas credenciales y límites de pool,
+# pero las queries no bloquean el event loop del worker.
+
+import itertools
+import logging
+import time
+from threading import Lock
+from uuid import uuid4
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from app.database.config import (
+    DATABASE_URL,
+    debug,
+    TRANSACTION_POOLER,
+    STATEMENT_TIMEOUT_MS,
+    IDLE_IN_TRANSACTION_TIMEOUT_MS,
+    set_local_timeouts,
+    is_connection_error
+)
+from app.parameters import settings
+
+logger = logging.getLogger(__name__)
+
+
+def to_async_url(url: str):
+    # postgresql://... -> postgresql+asyncpg://...
+    # asyncpg no entiende sslmode en la URL, el SSL va en connect_args
+    async_url = (
+        make_url(url)
+        .set(drivername="postgresql+asyncpg")
+        .difference_update_query(["sslmode"])
+    )
+    if TRANSACTION_POOLER:
+        # Sin cache de prepared statements del dialecto: la siguiente
+        # transacción puede ir a otra conexión de servidor
+        async_url = async_url.update_query_dict({"prepared_statement_cache_size": "0"})
+    return async_url
+
+
+def async_connect_args(application_name: str, read_only: bool = False) -> dict:
+    # Equivalente asyncpg de los connect_args de config.py
+    if TRANSACTION_POOLER:
+        # Sin estado de sesión: los timeouts van con SET LOCAL (set_local_timeouts),
+        # sin cache de statements y con nombres únicos para los prepared statements
+        return {
+            "ssl": "require",
+            "timeout": 15,
+            "server_settings": {"application_name": application_name},
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+
+    server_settings = {
+        "application_name": application_name,
+        "statement_timeout": str(STATEMENT_TIMEOUT_MS),
+        "idle_in_transaction_session_timeout": str(IDLE_IN_TRANSACTION_TIMEOUT_MS),
+    }
+    if read_only:
+        # Una réplica nunca debe recibir escrituras
+        server_settings["default_transaction_read_only"] = "on"
+    return {
+        "ssl": "require",
+        "timeout": 15,
+        "server_settings": server_settings,
+    }
+
+
+def async_pool_args() -> dict:
+    # Mismo criterio que pool_args en config.py, con el pool adaptado a asyncio
+    if TRANSACTION_POOLER:
+        if settings.DB_POOLER_POOL_SIZE > 0:
+            return {
+                "poolclass": AsyncAdaptedQueuePool,
+                "pool_size": settings.DB_POOLER_POOL_SIZE,
+                "max_overflow": 0,
+                "pool_pre_ping": True,
+                "pool_timeout": 45,
+            }
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_pre_ping": True,
+        "pool_recycle": 900,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 45,
+        "isolation_level": "READ_COMMITTED",
+    }
+
+
+def set_transaction_read_only(connection):
+    """Equivalente por transacción de default_transaction_read_only para el modo pooler"""
+    connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+
+
+def create_app_async_engine(url: str, application_name: str, read_only: bool = False):
+    async_engine = create_async_engine(
+        to_async_url(url),
+        connect_args=async_connect_args(application_name, read_only=read_only),
+        echo=debug,
+        **async_pool_args()
+    )
+    if TRANSACTION_POOLER:
+        if read_only:
+            # default_transaction_read_only no sobrevive al pooler: se fija por transacción,
+            # antes que cualquier otra sentencia
+            event.listen(async_engine.sync_engine, "begin", set_transaction_read_only)
+        event.listen(async_engine.sync_engine, "begin", set_local_timeouts)
+    return async_engine
+
+
+async_engine = create_app_async_engine(DATABASE_URL, "byteTECH_backend_v2_async")
+
+# expire_on_commit=False: igual que SessionLocal, y además evita lazy loads
+# implícitos tras el commit, que en una AsyncSession no están permitidos
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+# ---------------------------------------------- Read Replicas ----------------------------------------------
+class ReplicaSet:
+    """
+    Réplicas de lectura en round-robin. Una réplica que da error de conexión
+    queda fuera de rotación retry_after segundos; pool_pre_ping valida cada
+    conexión al sacarla del pool. Sin réplicas sanas, pick() devuelve None y
+    la lectura va al primario.
+    """
+
+    def __init__(self, engines: list, retry_after: float):
+        self.engines = engines
+        self.retry_after = retry_after
+        self._lock = Lock()
+        self._counter = itertools.count()
+        self._down_until = {id(engine): 0.0 for engine in engines}
+        for engine in engines:
+            event.listen(engine.sync_engine, "handle_error", self._on_error(engine))
+            event.listen(engine.sync_engine, "do_connect", self._on_connect(engine))
+
+    def _on_error(self, engine):
+        def handle_error(context):
+            # connection is None: falló al conectar. Un statement_timeout o un
+            # fallo de serialización no sacan a la réplica de rotación
+            if context.connection is None or is_connection_error(context):
+                self.mark_down(engine)
+        return handle_error
+
+    def _on_connect(self, engine):
+        def do_connect(dialect, connection_record, cargs, cparams):
+            # asyncpg lanza los fallos al conectar sin pasar por handle_error
+            try:
+                return dialect.connect(*cargs, **cparams)
+            except Exception:
+                self.mark_down(engine)
+                raise
+        return do_connect
+
+    def pick(self):
+        if not self.engines:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                engine = self.engines[next(self._counter) % len(self.engines)]
+                if self._down_until[id(engine)] <= now:
+                    return engine
+        return None
+
+    def mark_down(self, engine) -> None:
+        with self._lock:
+            self._down_until[id(engine)] = time.monotonic() + self.retry_after
+        logger.warning(f"Read replica {engine.url.host} out of rotation for {self.retry_after}s")
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "host": engine.url.host,
+                    "healthy": self._down_until[id(engine)] <= now,
+                    "pool": engine.sync_engine.pool.status()
+                }
+                for engine in self.engines
+            ]
+
+
+replica_set = ReplicaSet(
+    engines=[
+        create_app_async_engine(url, "byteTECH_backend_v2_replica", read_only=True)
+        for url in settings.SUPABASE_REPLICA_URLS
+    ],
+    retry_after=settings.REPLICA_RETRY_SECONDS
+)
@@ -1,8 +1,9 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, BigInteger, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, BigInteger, Text, Date
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import UniqueConstraint, DateTime
+from sqlalchemy import UniqueConstraint, DateTime, Index, func, text
+from sqlalchemy.dialects.postgresql import ARRAY
 
 Base = declarative_base()
 
@@ -29,7 +30,7 @@ class VerifyUser(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE", onupdate="CASCADE"))
     code = Column(String, unique=True, nullable=False)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    expires_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc) + timedelta(minutes=15))
+    expires_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc) + timedelta(minutes=15), index=True)
 
 
 
@@ -39,14 +40,14 @@ class ResetPassword(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE", onupdate="CASCADE"))
     token = Column(String, unique=True, nullable=False)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    expires_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc) + timedelta(minutes=15))
+    expires_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc) + timedelta(minutes=15), index=True)
 
 
 class Course(Base):
     __tablename__ = "courses"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    sensei_id = Column(Integer)
-    name = Column(String)
+    sensei_id = Column(Integer, index=True)
+    name = Column(String, index=True)
     description = Column(String)
     preludio = Column(String)
     requirements = Column(String)
@@ -54,6 +55,8 @@ class Course(Base):
     miniature_id = Column(String)
     video_id = Column(String)
     price = Column(Float)
+    # Contador denormalizado: lo mantienen create_lesson, delete_lesson_by_id y delete_section_by_id
+    lessons_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
 
     sections = relationship("Section", back_populates="course", cascade="all, delete")
     lessons = relationship("Lesson", back_populates="course", cascade="all, delete")
@@ -64,7 +67,7 @@ class Course(Base):
 class Section(Base):
     __tablename__ = "sections"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"))
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), index=True)
     title = Column(String)
 
     course = relationship("Course", back_populates="sections")
@@ -74,8 +77,8 @@ class Section(Base):
 class Lesson(Base):
     __tablename__ = "lessons"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    section_id = Column(Integer, ForeignKey("sections.id", ondelete="CASCADE"))
-    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"))
+    section_id = Column(Integer, ForeignKey("sections.id", ondelete="CASCADE"), index=True)
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), index=True)
     title = Column(String)
     file_id = Column(String)
     mime_type = Column(String)
@@ -95,10 +98,14 @@ class Thread(Base):
     user_id = Column(Integer)
     topic = Column(String)
     description = Column(String)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now(), nullable=False)
 
     lesson = relationship("Lesson", back_populates="threads")
     messages = relationship("Message", back_populates="thread", cascade="all, delete")
 
+    # Paginación keyset por lección
+    __table_args__ = (Index("ix_threads_lesson_id_created_at_id", "lesson_id", "created_at", "id"),)
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -106,20 +113,41 @@ class Message(Base):
     thread_id = Column(Integer, ForeignKey("threads.id", ondelete="CASCADE"))
     user_id = Column(Integer)
     message = Column(String)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now(), nullable=False)
 
     thread = relationship("Thread", back_populates="messages")
 
+    # Paginación keyset por hilo
+    __table_args__ = (Index("ix_messages_thread_id_created_at_id", "thread_id", "created_at", "id"),)
+
 
 class Purchase(Base):
     __tablename__ = "my_byd_courses"
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now(), nullable=False)
+    # Precio del curso al momento de la compra (base de revenue en sales_daily)
+    price = Column(Float, nullable=True)
 
     user = relationship("User", back_populates="purchases")
     course = relationship("Course", back_populates="purchased_by")
 
+    __table_args__ = (UniqueConstraint("user_id", "course_id", name="uq_my_byd_courses_user_course"),)
+
+
+class SalesDaily(Base):
+    """
+    Rollup diario de ventas por curso. Se mantiene de forma incremental en
+    save_purchase y se puede recalcular con app.database.rollup.
+    Sin FK a courses para conservar el histórico de cursos eliminados.
+    """
+    __tablename__ = "sales_daily"
+    day = Column(Date, primary_key=True)
+    course_id = Column(Integer, primary_key=True, index=True)
+    sales = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
 
 class UploadedCourse(Base):
     __tablename__ = "my_upldd_courses"
@@ -143,6 +171,20 @@ class LessonComplete(Base):
     user = relationship("User")
     lesson = relationship("Lesson")
 
+    __table_args__ = (UniqueConstraint("user_id", "lesson_id", name="uq_lessons_complete_user_lesson"),)
+
+
+class CourseProgress(Base):
+    """
+    Lecciones completadas por (usuario, curso) como array ordenado de ids.
+    Se mantiene junto a lessons_complete en mark_lesson_as_complete /
+    unmark_lesson_as_complete: el progreso de un curso es una sola fila.
+    """
+    __tablename__ = "course_progress"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True, index=True)
+    lesson_ids = Column(ARRAY(Integer), nullable=False, server_default=text("'{}'"))
+
 
 class PreviewFile(Base):
     __tablename__ = "preview_files"
@@ -162,7 +204,15 @@ class LessonMarkTime(Base):
     lesson_id = Column(Integer, ForeignKey("lessons.id", onupdate="CASCADE", ondelete="CASCADE"), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id", onupdate="CASCADE", ondelete="CASCADE"), nullable=True)
     mark_time = Column(Integer, nullable=True)
+    # Última vez que el usuario guardó la posición (NULL: nunca la vio)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
 
     # Opcional: relaciones
     lesson = relationship("Lesson", back_populates="marks")
-    user = relationship("User", back_populates="marks")
\ No newline at end of file
+    user = relationship("User", back_populates="marks")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "lesson_id", name="uq_lesson_mark_time_user_lesson"),
+        # Última lección vista por usuario (dashboard)
+        Index("ix_lesson_mark_time_user_id_updated_at", "user_id", "updated_at"),
+    )
\ No newline at end of file
@@ -4,7 +4,7 @@ import logging
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import DisconnectionError, OperationalError
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import QueuePool, NullPool
 from app.parameters import settings
 import time
 
@@ -14,6 +14,14 @@ debug = settings.DEBUG
 
 DATABASE_URL = settings.SUPABASE_URL_TEST if debug else settings.SUPABASE_URL
 
+# Modo pooler de transacciones (PgBouncer/Supavisor): cada transacción puede ir
+# a una conexión de servidor distinta, así que no se deja estado de sesión:
+# nada de parámetros "options" al conectar y timeouts con SET LOCAL por transacción
+TRANSACTION_POOLER = settings.DB_POOL_MODE == "transaction"
+
+STATEMENT_TIMEOUT_MS = 45000                # 45s
+IDLE_IN_TRANSACTION_TIMEOUT_MS = 300000     # 5min
+
 # Enhanced connection arguments for Supabase SSL stability after stress tests
 connect_args = {
     "sslmode": "require",
@@ -29,28 +37,80 @@ connect_args = {
     "keepalives_count": 5,       # More retries
     # More conservative connection timeout settings
     "connect_timeout": 15,       # Longer initial timeout
-    "options": "-c statement_timeout=45000 -c idle_in_transaction_session_timeout=300000",  # 45s statement, 5min idle timeout
+    "options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS} -c idle_in_transaction_session_timeout={IDLE_IN_TRANSACTION_TIMEOUT_MS}",  # 45s statement, 5min idle timeout
     # Additional SSL stability options
     "gssencmode": "disable",     # Disable GSS encryption to reduce complexity
     "target_session_attrs": "read-write",  # Ensure we get a writable connection
 }
 
+if TRANSACTION_POOLER:
+    # El pooler rechaza parámetros de arranque de sesión
+    connect_args.pop("options")
+
+    # Las conexiones al pooler son baratas: el límite real de conexiones a
+    # Postgres lo pone el pooler, no los workers
+    if settings.DB_POOLER_POOL_SIZE > 0:
+        pool_args = {
+            "poolclass": QueuePool,
+            "pool_size": settings.DB_POOLER_POOL_SIZE,
+            "max_overflow": 0,
+            "pool_pre_ping": True,
+            "pool_timeout": 45,
+        }
+    else:
+        pool_args = {"poolclass": NullPool}
+else:
+    pool_args = {
+        "poolclass": QueuePool,
+        "pool_pre_ping": True,        # Verifica la conexión antes de usarla
+        "pool_recycle": 900,          # More aggressive recycling (15 min) after stress test
+        "pool_size": 5,               # Reduced pool size to avoid overwhelming Supabase
+        "max_overflow": 10,           # Reduced overflow to be more conservative
+        "pool_timeout": 45,           # Longer timeout for stressed connections
+        "pool_reset_on_return": 'commit',  # Reset connections on return
+        # Additional engine options for SSL stability
+        "isolation_level": "READ_COMMITTED",  # Explicit isolation level
+    }
+
 engine = create_engine(
     DATABASE_URL,
     connect_args=connect_args,
-    poolclass=QueuePool,
-    pool_pre_ping=True,        # Verifica la conexión antes de usarla
-    pool_recycle=900,          # More aggressive recycling (15 min) after stress test
-    pool_size=5,               # Reduced pool size to avoid overwhelming Supabase
-    max_overflow=10,           # Reduced overflow to be more conservative
-    pool_timeout=45,           # Longer timeout for stressed connections
-    pool_reset_on_return='commit',  # Reset connections on return
     echo=debug,                # Log SQL queries in debug mode
-    # Additional engine options for SSL stability
-    isolation_level="READ_COMMITTED",  # Explicit isolation level
     future=True,               # Use SQLAlchemy 2.0 style
+    **pool_args
+)
+
+
+# Un solo statement (sirve también con prepared statements de asyncpg);
+# set_config(..., true) equivale a SET LOCAL y se descarta al cerrar la transacción
+SET_LOCAL_TIMEOUTS = (
+    f"SELECT set_config('statement_timeout', '{STATEMENT_TIMEOUT_MS}', true), "
+    f"set_config('idle_in_transaction_session_timeout', '{IDLE_IN_TRANSACTION_TIMEOUT_MS}', true)"
 )
 
+def set_local_timeouts(connection):
+    """Timeouts por transacción para el modo pooler de transacciones"""
+    connection.exec_driver_sql(SET_LOCAL_TIMEOUTS)
+
+if TRANSACTION_POOLER:
+    event.listen(engine, "begin", set_local_timeouts)
+
+
+# SQLSTATE de errores de conexión: clase 08 y servidor apagándose o arrancando
+CONNECTION_ERROR_SQLSTATES = ("08", "57P01", "57P02", "57P03")
+
+def is_connection_error(context) -> bool:
+    """
+    Para listeners de handle_error: True solo si falló la conexión
+    (desconexión o SQLSTATE de conexión). Un statement_timeout, un deadlock o
+    un fallo de serialización son OperationalError pero la base responde.
+    """
+    if context.is_disconnect or isinstance(context.sqlalchemy_exception, DisconnectionError):
+        return True
+    # psycopg2 y el adaptador de asyncpg exponen el SQLSTATE en pgcode
+    code = getattr(context.original_exception, "pgcode", None)
+    return bool(code) and code.startswith(CONNECTION_ERROR_SQLSTATES)
+
 # Add connection event listeners for better error handling
 @event.listens_for(engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
@@ -68,5 +128,7 @@ def receive_checkin(dbapi_connection, connection_record):
     """Log when connections are checked in"""
     logger.debug(f"Connection checked in: {id(dbapi_connection)}")
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# expire_on_commit=False: los objetos siguen usables tras el commit único del
+# unit of work sin volver a hacer SELECT por cada atributo
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
@@ -0,0 +1,75 @@
+"""
+Gestión del esquema con Alembic.
+
+- Paso único de migración (antes de arrancar los workers):
+      python -m app.database.migrate
+- Comprobación barata de versión del esquema al arrancar la app
+  (ver lifespan en main.py): una sola consulta a alembic_version.
+"""
+
+import logging
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from app.database.config import engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+
+def get_alembic_config() -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return config
+
+
+def get_head_revision() -> str:
+    """Revisión head según los scripts (no toca la base de datos)."""
+    return ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+
+
+def get_current_revision() -> str | None:
+    """Revisión aplicada en la base de datos, None si nunca se migró."""
+    with engine.connect() as connection:
+        try:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except ProgrammingError:
+            return None
+
+
+def check_schema_version() -> dict:
+    """
+    Compara la revisión de la base de datos con la head de los scripts.
+    """
+    head = get_head_revision()
+    current = get_current_revision()
+    return {
+        "current": current,
+        "head": head,
+        "up_to_date": current == head
+    }
+
+
+def upgrade_to_head() -> None:
+    """Aplica las migraciones pendientes (alembic upgrade head)."""
+    config = get_alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logger.info("Applying database migrations...")
+    upgrade_to_head()
+    logger.info(f"Database schema at revision {get_head_revision()}")
+
+
+if __name__ == "__main__":
+    main()
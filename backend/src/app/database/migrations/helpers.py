@@ -0,0 +1,52 @@
+"""
+Utilidades para escribir migraciones tolerantes a bases de datos creadas
+previamente con Base.metadata.create_all.
+"""
+
+import logging
+
+import sqlalchemy as sa
+from alembic import op
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def has_column(table: str, column: str) -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns(table)
+    return any(c["name"] == column for c in columns)
+
+
+def has_index(table: str, name: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    names = {i["name"] for i in inspector.get_indexes(table)}
+    names |= {c["name"] for c in inspector.get_unique_constraints(table)}
+    return name in names
+
+
+def delete_duplicates(table: str, columns: list[str]) -> list[dict]:
+    """
+    Borra filas duplicadas según columns conservando la de menor id,
+    necesario antes de crear una restricción UNIQUE. Cada fila borrada queda
+    en el log y se devuelve para que la migración ajuste lo que dependa de ella.
+    """
+    cols = ", ".join(columns)
+    removed = op.get_bind().execute(sa.text(
+        f"""
+        DELETE FROM {table} t
+        USING (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY {cols} ORDER BY id) AS rn
+            FROM {table}
+        ) d
+        WHERE t.id = d.id AND d.rn > 1
+        RETURNING t.*
+        """
+    )).mappings().all()
+    if removed:
+        logger.warning(f"Removed {len(removed)} duplicate rows from {table} on ({cols})")
+        for row in removed:
+            logger.warning(f"  {table}: {dict(row)}")
+    return [dict(row) for row in removed]
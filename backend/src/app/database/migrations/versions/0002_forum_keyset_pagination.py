@@ -0,0 +1,47 @@
+"""forum keyset pagination
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 15:57:16.196544
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.database.migrations.helpers import has_column, has_index
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Mensajes antiguos sin fecha: la paginación keyset necesita created_at
+    op.execute("UPDATE messages SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column('messages', 'created_at',
+               existing_type=postgresql.TIMESTAMP(timezone=True),
+               server_default=sa.text('now()'),
+               nullable=False)
+    if not has_index('messages', 'ix_messages_thread_id_created_at_id'):
+        op.create_index('ix_messages_thread_id_created_at_id', 'messages', ['thread_id', 'created_at', 'id'], unique=False)
+    if not has_column('threads', 'created_at'):
+        op.add_column('threads', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    if not has_index('threads', 'ix_threads_lesson_id_created_at_id'):
+        op.create_index('ix_threads_lesson_id_created_at_id', 'threads', ['lesson_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_threads_lesson_id_created_at_id', table_name='threads')
+    op.drop_column('threads', 'created_at')
+    op.drop_index('ix_messages_thread_id_created_at_id', table_name='messages')
+    op.alter_column('messages', 'created_at',
+               existing_type=postgresql.TIMESTAMP(timezone=True),
+               server_default=None,
+               nullable=True)
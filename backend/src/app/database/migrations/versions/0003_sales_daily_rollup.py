@@ -0,0 +1,55 @@
+"""sales daily rollup
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 15:57:17.457718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.migrations.helpers import has_table, has_column
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not has_table('sales_daily'):
+        op.create_table('sales_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        sa.Column('sales', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'course_id')
+        )
+        op.create_index(op.f('ix_sales_daily_course_id'), 'sales_daily', ['course_id'], unique=False)
+    if not has_column('my_byd_courses', 'created_at'):
+        # Las compras existentes no tienen fecha real: quedan en el día de la migración
+        op.add_column('my_byd_courses', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+    # Rellenar el rollup con las compras existentes (mismo cálculo que refresh_sales_rollup)
+    op.execute(
+        """
+        INSERT INTO sales_daily (day, course_id, sales, revenue)
+        SELECT date(timezone('UTC', p.created_at)), p.course_id, count(p.id), count(p.id) * coalesce(c.price, 0)
+        FROM my_byd_courses p
+        JOIN courses c ON c.id = p.course_id
+        GROUP BY date(timezone('UTC', p.created_at)), p.course_id, c.price
+        ON CONFLICT (day, course_id) DO UPDATE
+        SET sales = excluded.sales, revenue = excluded.revenue
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('my_byd_courses', 'created_at')
+    op.drop_index(op.f('ix_sales_daily_course_id'), table_name='sales_daily')
+    op.drop_table('sales_daily')
@@ -0,0 +1,94 @@
+"""hot path indexes
+
+Índices para los filtros más usados de app/database/queries y restricciones
+UNIQUE para progreso, marcas de tiempo y compras (se eliminan duplicados antes,
+quedan en el log y las compras borradas se descuentan de sales_daily).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 15:57:42.694124
+
+"""
+from collections import Counter
+from datetime import timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.migrations.helpers import has_index, delete_duplicates
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    indexes = [
+        ('ix_codes_verify_expires_at', 'codes_verify', ['expires_at']),
+        ('ix_tokens_reset_expires_at', 'tokens_reset', ['expires_at']),
+        ('ix_courses_name', 'courses', ['name']),
+        ('ix_courses_sensei_id', 'courses', ['sensei_id']),
+        ('ix_sections_course_id', 'sections', ['course_id']),
+        ('ix_lessons_course_id', 'lessons', ['course_id']),
+        ('ix_lessons_section_id', 'lessons', ['section_id']),
+    ]
+    for name, table, columns in indexes:
+        if not has_index(table, name):
+            op.create_index(name, table, columns, unique=False)
+
+    unique_constraints = [
+        ('uq_lessons_complete_user_lesson', 'lessons_complete', ['user_id', 'lesson_id']),
+        ('uq_lesson_mark_time_user_lesson', 'lesson_mark_time', ['user_id', 'lesson_id']),
+        ('uq_my_byd_courses_user_course', 'my_byd_courses', ['user_id', 'course_id']),
+    ]
+    for name, table, columns in unique_constraints:
+        if not has_index(table, name):
+            removed = delete_duplicates(table, columns)
+            if table == 'my_byd_courses':
+                _discount_removed_sales(removed)
+            op.create_unique_constraint(name, table, columns)
+
+
+def _discount_removed_sales(removed: list[dict]) -> None:
+    """
+    Descuenta de sales_daily las compras duplicadas borradas (0003 las contó).
+    El revenue baja en proporción para conservar el precio medio del bucket;
+    los buckets que quedan sin ventas se borran.
+    """
+    counts = Counter(
+        (row['created_at'].astimezone(timezone.utc).date(), row['course_id'])
+        for row in removed
+    )
+    bind = op.get_bind()
+    for (day, course_id), count in counts.items():
+        bind.execute(
+            sa.text(
+                """
+                UPDATE sales_daily
+                SET revenue = CASE WHEN sales > :count THEN revenue * (sales - :count) / sales ELSE 0 END,
+                    sales = greatest(sales - :count, 0)
+                WHERE day = :day AND course_id = :course_id
+                """
+            ),
+            {"count": count, "day": day, "course_id": course_id}
+        )
+    if counts:
+        bind.execute(sa.text("DELETE FROM sales_daily WHERE sales = 0"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tokens_reset_expires_at'), table_name='tokens_reset')
+    op.drop_index(op.f('ix_sections_course_id'), table_name='sections')
+    op.drop_constraint('uq_my_byd_courses_user_course', 'my_byd_courses', type_='unique')
+    op.drop_constraint('uq_lessons_complete_user_lesson', 'lessons_complete', type_='unique')
+    op.drop_index(op.f('ix_lessons_section_id'), table_name='lessons')
+    op.drop_index(op.f('ix_lessons_course_id'), table_name='lessons')
+    op.drop_constraint('uq_lesson_mark_time_user_lesson', 'lesson_mark_time', type_='unique')
+    op.drop_index(op.f('ix_courses_sensei_id'), table_name='courses')
+    op.drop_index(op.f('ix_courses_name'), table_name='courses')
+    op.drop_index(op.f('ix_codes_verify_expires_at'), table_name='codes_verify')
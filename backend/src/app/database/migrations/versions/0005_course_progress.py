@@ -0,0 +1,58 @@
+"""course progress
+
+Tabla course_progress: lecciones completadas por (usuario, curso) como array
+ordenado de ids, rellenada desde lessons_complete.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 17:02:11.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.database.migrations.helpers import has_table
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not has_table('course_progress'):
+        op.create_table('course_progress',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        sa.Column('lesson_ids', postgresql.ARRAY(sa.Integer()), server_default=sa.text("'{}'"), nullable=False),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'course_id')
+        )
+        op.create_index(op.f('ix_course_progress_course_id'), 'course_progress', ['course_id'], unique=False)
+
+    # Rellenar desde lessons_complete (mismo orden que mantiene mark_lesson_as_complete)
+    op.execute(
+        """
+        INSERT INTO course_progress (user_id, course_id, lesson_ids)
+        SELECT lc.user_id, l.course_id, array_agg(DISTINCT lc.lesson_id ORDER BY lc.lesson_id)
+        FROM lessons_complete lc
+        JOIN lessons l ON l.id = lc.lesson_id
+        JOIN users u ON u.id = lc.user_id
+        WHERE l.course_id IS NOT NULL
+        GROUP BY lc.user_id, l.course_id
+        ON CONFLICT (user_id, course_id) DO UPDATE
+        SET lesson_ids = excluded.lesson_ids
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_course_progress_course_id'), table_name='course_progress')
+    op.drop_table('course_progress')
@@ -0,0 +1,47 @@
+"""course lessons count
+
+Columna courses.lessons_count: contador denormalizado de lecciones por curso,
+rellenado desde lessons.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 18:24:40.561093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.migrations.helpers import has_column
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not has_column('courses', 'lessons_count'):
+        op.add_column('courses', sa.Column('lessons_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+    op.execute(
+        """
+        UPDATE courses c
+        SET lessons_count = counts.total
+        FROM (
+            SELECT course_id, count(*) AS total
+            FROM lessons
+            WHERE course_id IS NOT NULL
+            GROUP BY course_id
+        ) counts
+        WHERE counts.course_id = c.id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('courses', 'lessons_count')
@@ -0,0 +1,43 @@
+"""lesson mark time updated_at
+
+Columna lesson_mark_time.updated_at (última vez que se guardó la posición)
+con índice (user_id, updated_at) para el dashboard del estudiante. Las
+marcas existentes con mark_time > 0 toman la hora de la migración para que
+last_watched/resume las encuentren; las que siguen en 0 quedan en NULL.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 19:05:12.804417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.migrations.helpers import has_column, has_index
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not has_column('lesson_mark_time', 'updated_at'):
+        op.add_column('lesson_mark_time', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    # Progreso previo a la columna: sin esto nadie tendría lección para retomar
+    op.execute(
+        "UPDATE lesson_mark_time SET updated_at = now() "
+        "WHERE updated_at IS NULL AND mark_time > 0"
+    )
+    if not has_index('lesson_mark_time', 'ix_lesson_mark_time_user_id_updated_at'):
+        op.create_index('ix_lesson_mark_time_user_id_updated_at', 'lesson_mark_time', ['user_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_lesson_mark_time_user_id_updated_at', table_name='lesson_mark_time')
+    op.drop_column('lesson_mark_time', 'updated_at')
@@ -0,0 +1,55 @@
+"""purchase price
+
+Columna my_byd_courses.price: precio pagado en cada compra, base del revenue
+de sales_daily. Las compras existentes toman el precio medio de su bucket en
+sales_daily (que record_sale ya llevaba con el precio del momento) y, si no
+hay bucket, el precio actual del curso.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 20:12:48.130552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.migrations.helpers import has_column
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not has_column('my_byd_courses', 'price'):
+        op.add_column('my_byd_courses', sa.Column('price', sa.Float(), nullable=True))
+
+    op.execute(
+        """
+        UPDATE my_byd_courses p
+        SET price = s.revenue / s.sales
+        FROM sales_daily s
+        WHERE p.price IS NULL
+          AND s.sales > 0
+          AND s.course_id = p.course_id
+          AND s.day = date(timezone('UTC', p.created_at))
+        """
+    )
+    op.execute(
+        """
+        UPDATE my_byd_courses p
+        SET price = coalesce(c.price, 0)
+        FROM courses c
+        WHERE p.price IS NULL AND c.id = p.course_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('my_byd_courses', 'price')
@@ -0,0 +1,256 @@
+# Caches de contenido público de cursos: catálogo (/courses/mtd_courses)
+# y esqueleto de /courses/course_content
+
+import asyncio
+import time
+from threading import Lock
+from cachetools import TTLCache
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.database.base import Lesson, Thread
+from app.parameters import settings
+from app.utils.cache import cache
+
+
+# ---------------------------------------------- Catalog Cache ----------------------------------------------
+class CatalogCache:
+    """
+    Cache en memoria del catálogo ya serializado (cursos + nombre del sensei +
+    lecciones). Las escrituras de workbrench lo invalidan con invalidate_catalog;
+    el TTL acota lo que puede quedar desactualizado por escrituras hechas en
+    otro worker.
+
+    Protección contra stampede: tras una invalidación solo una request
+    reconstruye el catálogo, las demás esperan el lock y reciben ese resultado.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value = None
+        self._expires_at = 0.0
+        self._version = 0
+        self._lock = Lock()
+        self._build_lock = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.invalidations = 0
+
+    @property
+    def build_lock(self) -> asyncio.Lock:
+        # Se crea dentro del event loop en el primer uso
+        if self._build_lock is None:
+            self._build_lock = asyncio.Lock()
+        return self._build_lock
+
+    def _get_fresh(self):
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires_at:
+                return self._value
+            return None
+
+    async def get_or_build(self, build):
+        """
+        Devuelve el catálogo cacheado o lo reconstruye con build (coroutine
+        function sin argumentos). Si hubo una invalidación mientras se
+        construía, el resultado se devuelve pero no se guarda.
+        """
+        value = self._get_fresh()
+        if value is not None:
+            self.hits += 1
+            return value
+
+        async with self.build_lock:
+            # Otra request pudo reconstruirlo mientras esperábamos
+            value = self._get_fresh()
+            if value is not None:
+                self.hits += 1
+                return value
+
+            self.misses += 1
+            with self._lock:
+                version = self._version
+            value = await build()
+            self.rebuilds += 1
+            with self._lock:
+                if version == self._version:
+                    self._value = value
+                    self._expires_at = time.monotonic() + self.ttl
+            return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+            self._version += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        with self._lock:
+            cached = self._value is not None and time.monotonic() < self._expires_at
+        return {
+            "cached": cached,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rebuilds": self.rebuilds,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+catalog_cache = CatalogCache(ttl=settings.CATALOG_CACHE_TTL)
+cache.subscribe("catalog", lambda payload: catalog_cache.invalidate())
+
+
+def get_catalog_cache_stats() -> dict:
+    return catalog_cache.stats()
+
+
+def invalidate_catalog(db: Session) -> None:
+    """
+    Invalida el catálogo ahora y de nuevo tras el commit de la sesión (mismo
+    criterio que invalidate_user_profile). Un solo listener por transacción;
+    tras el commit se publica a todos los workers.
+    """
+    catalog_cache.invalidate()
+    if db.info.get("catalog_invalidate_pending"):
+        return
+    db.info["catalog_invalidate_pending"] = True
+
+    def after_commit(session):
+        session.info.pop("catalog_invalidate_pending", None)
+        cache.publish("catalog")
+
+    event.listen(db, "after_commit", after_commit, once=True)
+
+
+# ---------------------------------------------- Course Content Cache ----------------------------------------------
+class CourseContentCache:
+    """
+    Cache acotado (LRU + TTL) del esqueleto público de cada curso: datos del
+    curso, secciones, lecciones, resúmenes de hilos y preview. Lo que depende
+    del usuario (is_paid, progress, is_completed, mark_time) no se guarda.
+
+    Cada curso lleva una versión: un esqueleto construido mientras el curso
+    se invalidaba no se guarda.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._names = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions: dict[int, int] = {}
+        self._generation = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve_name(self, name: str) -> int | None:
+        with self._lock:
+            return self._names.get(name)
+
+    def get(self, course_id: int) -> dict | None:
+        with self._lock:
+            skeleton = self._cache.get(course_id)
+            if skeleton is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return skeleton
+
+    def version(self, course_id: int) -> tuple[int, int]:
+        with self._lock:
+            return self._generation, self._versions.get(course_id, 0)
+
+    def set(self, course_id: int, skeleton: dict, version: tuple[int, int]) -> None:
+        with self._lock:
+            if version != (self._generation, self._versions.get(course_id, 0)):
+                return
+            self._cache[course_id] = skeleton
+            self._names[skeleton["course_data"]["name"]] = course_id
+
+    def invalidate(self, course_id: int) -> None:
+        with self._lock:
+            self._versions[course_id] = self._versions.get(course_id, 0) + 1
+            self._cache.pop(course_id, None)
+            for name in [name for name, cached_id in self._names.items() if cached_id == course_id]:
+                self._names.pop(name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._versions.clear()
+            self._cache.clear()
+            self._names.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+course_content_cache = CourseContentCache(
+    maxsize=settings.COURSE_CONTENT_CACHE_MAXSIZE,
+    ttl=settings.COURSE_CONTENT_CACHE_TTL
+)
+cache.subscribe(
+    "course_content",
+    lambda course_id: course_content_cache.clear() if course_id is None else course_content_cache.invalidate(course_id)
+)
+
+
+def get_course_content_cache_stats() -> dict:
+    return course_content_cache.stats()
+
+
+def invalidate_course_content(db: Session, course_id: int | None = None) -> None:
+    """
+    Invalida el esqueleto de un curso (o de todos si course_id es None) ahora
+    y de nuevo, en todos los workers, tras el commit de la sesión. Los cursos
+    se acumulan en db.info: un solo listener por transacción y una publicación
+    por curso (o una sola si se invalidó todo).
+    """
+    if course_id is None:
+        course_content_cache.clear()
+    else:
+        course_content_cache.invalidate(course_id)
+
+    pending = db.info.get("course_content_pending")
+    if pending is not None:
+        pending.add(course_id)
+        return
+    db.info["course_content_pending"] = {course_id}
+
+    def after_commit(session):
+        course_ids = session.info.pop("course_content_pending", None) or set()
+        for pending_id in ({None} if None in course_ids else course_ids):
+            cache.publish("course_content", pending_id)
+
+    def after_rollback(session):
+        session.info.pop("course_content_pending", None)
+
+    event.listen(db, "after_commit", after_commit, once=True)
+    event.listen(db, "after_rollback", after_rollback, once=True)
+
+
+def invalidate_lesson_content(db: Session, lesson_id: int) -> None:
+    # Escrituras de foro: el curso se resuelve desde la lección
+    course_id = db.scalar(select(Lesson.course_id).where(Lesson.id == lesson_id))
+    if course_id is not None:
+        invalidate_course_content(db, course_id)
+
+
+def invalidate_thread_content(db: Session, thread_id: int) -> None:
+    course_id = db.scalar(
+        select(Lesson.course_id)
+        .join(Thread, Thread.lesson_id == Lesson.id)
+        .where(Thread.id == thread_id)
+    )
+    if course_id is not None:
+        invalidate_course_content(db, course_id)
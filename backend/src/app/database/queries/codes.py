@@ -26,8 +26,7 @@ def create_code(db: Session, user_id: int, max_retries=5) -> VerifyUser:
                 expires_at=datetime.now(timezone.utc) + timedelta(minutes=15)
             )
             db.add(new_code)
-            db.commit()
-            db.refresh(new_code)
+            db.flush()
             return new_code
 
     raise ValueError("No se pudo generar un código único tras varios intentos")
@@ -52,7 +51,6 @@ def delete_expired_codes(db: Session):
     db.query(VerifyUser).filter(
         VerifyUser.expires_at <= datetime.now(timezone.utc)
     ).delete()
-    db.commit()
 
 
 def delete_verification_code(db, code: str):
@@ -62,6 +60,6 @@ def delete_verification_code(db, code: str):
 
     if record:
         db.delete(record)
-        db.commit()
+        db.flush()
         return True
     return False
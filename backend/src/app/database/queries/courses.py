@@ -1,17 +1,148 @@
 from sqlalchemy.orm import Session
-from app.database.base import Course, Purchase
+from sqlalchemy import select, event, func
+from sqlalchemy.dialects.postgresql import insert
+from cachetools import TTLCache
+from threading import Lock
+from app.database.base import Course, Purchase, User, CourseProgress
 from app.utils.util_database import course_to_dict
 from app.utils.util_routers import delete_file
-from app.database.queries.lessons import get_lessons_by_section_id, get_total_lessons_by_course
+from app.database.queries.lessons import get_lessons_by_section_id
 from app.database.queries.sections import get_sections_by_course_id
-from app.database.queries.user import get_user_by_id
+from app.database.queries.user import get_usernames_by_ids
+from app.database.queries.stats import record_sale
+from app.database.queries.catalog import invalidate_catalog, invalidate_course_content
+from app.database.query_cache import cached_query
+from app.utils.cache import cache
+from app.parameters import settings
+
+
+# ---------------------------------------------- Entitlement Cache ----------------------------------------------
+class EntitlementCache:
+    """
+    Cache acotado (LRU + TTL) del conjunto de course_id comprados por usuario.
+    save_purchase agrega el curso tras el commit en todos los workers, así que
+    una comprobación de compra es una búsqueda en un set.
+
+    Cada grant/clear avanza una generación. Un conjunto cargado de la base se
+    guarda solo si no llegó ninguna compra del usuario (ni un clear) desde que
+    empezó la carga: esa consulta pudo leer antes del commit de la compra.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Generación del último grant por usuario; vive lo mismo que los conjuntos
+        self._granted = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+        self._cleared = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    def get(self, user_id: int) -> frozenset[int] | None:
+        with self._lock:
+            owned = self._cache.get(user_id)
+            if owned is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return owned
+
+    def generation(self) -> int:
+        # Leer antes de consultar la base y pasarlo a set()
+        with self._lock:
+            return self._generation
+
+    def set(self, user_id: int, course_ids, generation: int) -> bool:
+        with self._lock:
+            if self._granted.get(user_id, 0) > generation or self._cleared > generation:
+                # Compra (o clear) durante la carga: el conjunto puede no incluirla
+                self.discarded += 1
+                return False
+            self._cache[user_id] = frozenset(course_ids)
+            return True
+
+    def grant(self, user_id: int, course_id: int) -> None:
+        # Actualiza el conjunto si está cargado; si no, marca las cargas en curso como viejas
+        with self._lock:
+            self._generation += 1
+            self._granted[user_id] = self._generation
+            owned = self._cache.get(user_id)
+            if owned is not None:
+                self._cache[user_id] = owned | {course_id}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cleared = self._generation
+            self._cache.clear()
+            self._granted.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "discarded": self.discarded,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+entitlement_cache = EntitlementCache(
+    maxsize=settings.ENTITLEMENT_CACHE_MAXSIZE,
+    ttl=settings.ENTITLEMENT_CACHE_TTL
+)
+
+# Compras registradas por cualquier worker
+cache.subscribe(
+    "entitlement",
+    lambda grant: entitlement_cache.clear() if grant is None else entitlement_cache.grant(grant["user_id"], grant["course_id"])
+)
+
+
+def get_entitlement_cache_stats() -> dict:
+    return entitlement_cache.stats()
+
+
+def get_owned_course_ids(db: Session, user_id: int) -> frozenset[int]:
+    """
+    Ids de los cursos comprados por el usuario, en una sola consulta y
+    cacheados con TTL. Incluye las compras aún sin commit de esta sesión.
+    """
+    owned = entitlement_cache.get(user_id)
+    if owned is None:
+        generation = entitlement_cache.generation()
+        owned = frozenset(db.scalars(select(Purchase.course_id).where(Purchase.user_id == user_id)))
+        entitlement_cache.set(user_id, owned, generation)
+    pending = db.info.get("entitlement_grants")
+    if pending:
+        owned = owned | {course_id for grant_user, course_id in pending if grant_user == user_id}
+    return owned
+
+
+def _grant_after_commit(db: Session, user_id: int, course_id: int) -> None:
+    pending = db.info.setdefault("entitlement_grants", set())
+    pending.add((user_id, course_id))
+
+    def after_commit(session):
+        session.info.pop("entitlement_grants", None)
+        cache.publish("entitlement", {"user_id": user_id, "course_id": course_id})
+
+    def after_rollback(session):
+        session.info.pop("entitlement_grants", None)
+
+    event.listen(db, "after_commit", after_commit, once=True)
+    event.listen(db, "after_rollback", after_rollback, once=True)
 
 
 def add_course(db: Session, course_data: dict) -> Course:
     course = Course(**course_data)
     db.add(course)
-    db.commit()
-    db.refresh(course)
+    db.flush()
+    invalidate_catalog(db)
     return course
 
 
@@ -19,20 +150,19 @@ def delete_course(db: Session, course_id: int) -> bool:
     course = db.query(Course).filter(Course.id == course_id).first()
     if course:
         db.delete(course)
-        db.commit()
+        db.flush()
+        invalidate_catalog(db)
+        invalidate_course_content(db, course_id)
         return True
     return False
 
 
+@cached_query(tables=("courses",))
 def get_all_courses(db: Session) -> list[Course]:
     courses = db.query(Course).all()
     if not courses:
         return []
 
-    # Obtener lecciones totales de cada curso
-    for course in courses:
-        lessons = get_total_lessons_by_course(course_id=course.id, db=db)
-
     return [
         {
             "id": course.id,
@@ -44,7 +174,7 @@ def get_all_courses(db: Session) -> list[Course]:
             "hours": course.hours,
             "miniature_id": course.miniature_id,
             "price": course.price,
-            "lessons_count": lessons
+            "lessons_count": course.lessons_count
         }
         for course in courses
     ]
@@ -102,27 +232,47 @@ def update_course(db: Session, course_id: int, update_data: dict) -> Course | No
         return None
     for key, value in update_data.items():
         setattr(course, key, value)
-    db.commit()
-    db.refresh(course)
+    db.flush()
+    invalidate_catalog(db)
+    invalidate_course_content(db, course_id)
     return course
 
 
-def save_purchase(db: Session, user_id: int, course_id: int):
-    new_purchase = Purchase(user_id=user_id, course_id=course_id)
-    db.add(new_purchase)
-    db.commit()
-    db.refresh(new_purchase)
-    return new_purchase
+def save_purchase(db: Session, user_id: int, course_id: int) -> bool:
+    """
+    Registra la compra con INSERT ... ON CONFLICT DO NOTHING sobre
+    (user_id, course_id): idempotente ante reintentos del webhook. Guarda
+    el precio del curso en ese momento.
+    Retorna True si se creó la compra, False si ya existía.
+    """
+    stmt = (
+        insert(Purchase)
+        .values(
+            user_id=user_id,
+            course_id=course_id,
+            # Precio vigente al comprar: el rollup no cambia si después cambia el precio
+            price=select(Course.price).where(Course.id == course_id).scalar_subquery()
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "course_id"])
+        .returning(Purchase.created_at, Purchase.price)
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        return False
+
+    # Mantener el rollup diario en la misma transacción que la compra
+    record_sale(db, course_id, row.price, row.created_at)
+    _grant_after_commit(db, user_id, course_id)
+    return True
 
 
 def get_courses_by_user(db: Session, user_id: int):
     courses = db.query(Course).filter(Course.sensei_id == user_id).all()
     courses = [course_to_dict(c) for c in courses]
+    usernames = get_usernames_by_ids(db, {course["sensei_id"] for course in courses})
     for course in courses:
         course.pop("video_id", None)
-        sensei_id = course["sensei_id"]
-        user = get_user_by_id(db, sensei_id)
-        course["sensei_name"] = user.username
+        course["sensei_name"] = usernames.get(course["sensei_id"])
 
 
     return courses
@@ -130,32 +280,32 @@ def get_courses_by_user(db: Session, user_id: int):
 
 # Opción 3: Query más limpia usando relationship (si tienes la relación definida)
 def get_purchased_courses_by_user(db: Session, user_id: int) -> list[dict]:
-    courses = (
-        db.query(Course)
+    """
+    Cursos comprados con nombre del sensei, total de lecciones y porcentaje
+    de progreso en una sola query: el total sale de courses.lessons_count y
+    las completadas del tamaño del array de course_progress.
+    """
+    completed_lessons = func.coalesce(func.cardinality(CourseProgress.lesson_ids), 0)
+    rows = db.execute(
+        select(Course, User.username, completed_lessons.label("completed_lessons"))
         .join(Purchase, Purchase.course_id == Course.id)
-        .filter(Purchase.user_id == user_id)
-        .all()
-    )
+        .outerjoin(User, User.id == Course.sensei_id)
+        .outerjoin(
+            CourseProgress,
+            (CourseProgress.course_id == Course.id) & (CourseProgress.user_id == user_id)
+        )
+        .where(Purchase.user_id == user_id)
+    ).all()
 
     result_courses = []
-    for course in courses:
+    for course, sensei_name, completed in rows:
         course_dict = course_to_dict(course)
         course_dict.pop("video_id", None)
-        
-        sensei_id = course_dict["sensei_id"]
-        user = get_user_by_id(db, sensei_id)
-        course_dict["sensei_name"] = user.username
-        
-        # Usar la relación para contar lecciones
-        lessons = course.lessons
-        course_dict["lessons_count"] = len(lessons)
-
-        # Obtener progreso del curso
-        from app.database.queries.progress import get_course_progress
-        progress = get_course_progress(db, user_id, course.id)
-        course_dict["progress"] = progress.get("progress_percentage", 0)
-
-        
+        course_dict["sensei_name"] = sensei_name
+        course_dict["lessons_count"] = course.lessons_count
+        course_dict["progress"] = (
+            round(completed / course.lessons_count * 100, 2) if course.lessons_count > 0 else 0
+        )
         result_courses.append(course_dict)
 
     return result_courses
@@ -190,7 +340,6 @@ def delete_course_and_relations(db: Session, course_id: int) -> bool:
         if not success:
             return False
 
-        db.commit()
         return True
 
     except Exception as e:
@@ -200,4 +349,12 @@ def delete_course_and_relations(db: Session, course_id: int) -> bool:
 
 
 def purchase_exists(db: Session, user_id: int, course_id: int) -> bool:
-    return db.query(Purchase).filter_by(user_id=user_id, course_id=course_id).first() is not None
+    if course_id in get_owned_course_ids(db, user_id):
+        return True
+    if not cache.broadcasts:
+        # Sin bus compartido otro worker pudo registrar la compra: el negativo
+        # se confirma en la base (un lookup por índice único)
+        return db.scalar(
+            select(Purchase.id).where(Purchase.user_id == user_id, Purchase.course_id == course_id)
+        ) is not None
+    return False
@@ -1,8 +1,10 @@
 from sqlalchemy.orm import Session
-from app.database.base import Lesson
-from sqlalchemy import func
-from app.database.queries.progress import is_lesson_completed
+from app.database.base import Course, Lesson
+from sqlalchemy import select, update
+from app.database.queries.progress import is_lesson_completed, remove_lessons_from_progress
 from app.database.queries.marks import get_mark_by_lesson_and_user
+from app.database.queries.catalog import invalidate_catalog, invalidate_course_content
+from app.database.query_cache import cached_query
 
 
 def create_lesson(db: Session, section_id: int, title: str, file_id: str, course_id: int, mime_type: str, time_validator: float) -> Lesson:
@@ -15,8 +17,10 @@ def create_lesson(db: Session, section_id: int, title: str, file_id: str, course
         time_validator=time_validator
     )
     db.add(lesson)
-    db.commit()
-    db.refresh(lesson)
+    db.flush()
+    adjust_lessons_count(db, course_id, 1)
+    invalidate_catalog(db)
+    invalidate_course_content(db, course_id)
     return lesson
 
 
@@ -24,15 +28,30 @@ def delete_lesson_by_id(db: Session, lesson_id: int) -> Lesson:
     lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
     if lesson:
         db.delete(lesson)
-        db.commit()
+        db.flush()
+        remove_lessons_from_progress(db, lesson.course_id, [lesson.id])
+        adjust_lessons_count(db, lesson.course_id, -1)
+        invalidate_catalog(db)
+        invalidate_course_content(db, lesson.course_id)
     return lesson
 
 
+def adjust_lessons_count(db: Session, course_id: int, delta: int) -> None:
+    # Suma atómica en la base: dos altas concurrentes no se pisan
+    if course_id is None or not delta:
+        return
+    db.execute(
+        update(Course)
+        .where(Course.id == course_id)
+        .values(lessons_count=Course.lessons_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@cached_query(tables=("courses",), tags=lambda args, result: [f"courses:{args['course_id']}"])
 def get_total_lessons_by_course(db, course_id: int):
-    total = db.query(func.count(Lesson.id)) \
-              .filter(Lesson.course_id == course_id) \
-              .scalar()
-    return total
+    total = db.scalar(select(Course.lessons_count).where(Course.id == course_id))
+    return total or 0
 
 
 def get_lessons_by_section_id(db: Session, sections_id: list, user_id: int = None) -> list:
@@ -73,3 +92,32 @@ def get_lessons_by_section_id(db: Session, sections_id: list, user_id: int = Non
                 }
                 lessons_data.append(lesson_info)
     return lessons_data
+
+
+def get_lessons_by_section_ids(db: Session, section_ids: list[int]) -> dict[int, list[dict]]:
+    """
+    Lecciones de varias secciones en una sola consulta, agrupadas por
+    section_id y ordenadas por id. Mismo formato que get_lessons_by_section_id
+    sin usuario (is_completed False, mark_time en 0).
+    """
+    lessons_by_section = {section_id: [] for section_id in section_ids}
+    if not section_ids:
+        return lessons_by_section
+
+    lessons = db.scalars(
+        select(Lesson)
+        .where(Lesson.section_id.in_(section_ids))
+        .order_by(Lesson.section_id, Lesson.id)
+    )
+    for lesson in lessons:
+        lessons_by_section[lesson.section_id].append({
+            "id": lesson.id,
+            "section_id": lesson.section_id,
+            "title": lesson.title,
+            "file_id": lesson.file_id,
+            "mime_type": lesson.mime_type,
+            "time_validator": lesson.time_validator,
+            "is_completed": False,
+            "mark_time": {"id": None, "time": 0}
+        })
+    return lessons_by_section
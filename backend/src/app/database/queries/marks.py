@@ -1,5 +1,8 @@
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-from app.database.base import LessonMarkTime
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from app.database.base import Lesson, LessonMarkTime
 
 
 def get_mark_by_lesson_and_user(db: Session, lesson_id: int, user_id: int):
@@ -13,23 +16,112 @@ def get_mark_by_lesson_and_user(db: Session, lesson_id: int, user_id: int):
     ).first()
 
     if not mark:
-        add_response = create_mark(db, lesson_id, user_id, 0)
+        add_response, _ = create_mark(db, lesson_id, user_id, 0)
         return add_response
     return mark
 
 
 def create_mark(db: Session, lesson_id: int, user_id: int, mark_time: int):
-    mark = LessonMarkTime(lesson_id=lesson_id, user_id=user_id, mark_time=mark_time)
-    db.add(mark)
-    db.commit()
-    db.refresh(mark)
-    return mark
+    """
+    Crea la marca de tiempo en una sola sentencia con ON CONFLICT sobre
+    (user_id, lesson_id). Si ya existía se devuelve la existente sin modificarla.
+    Retorna (mark, created).
+    """
+    stmt = (
+        insert(LessonMarkTime)
+        .values(lesson_id=lesson_id, user_id=user_id, mark_time=mark_time)
+        .on_conflict_do_update(
+            index_elements=["user_id", "lesson_id"],
+            set_={"mark_time": LessonMarkTime.__table__.c.mark_time}
+        )
+        .returning(LessonMarkTime, literal_column("xmax = 0").label("created"))
+        .execution_options(populate_existing=True)
+    )
+    mark, created = db.execute(stmt).one()
+    return mark, created
 
 
 def update_mark_time(db: Session, mark_id: int, new_time: int):
     mark = db.query(LessonMarkTime).filter(LessonMarkTime.id == mark_id).first()
     if mark:
         mark.mark_time = new_time
-        db.commit()
-        db.refresh(mark)
+        mark.updated_at = datetime.now(timezone.utc)
+        db.flush()
     return mark
+
+
+def get_marks_by_lessons(db: Session, user_id: int, lesson_ids) -> dict[int, dict]:
+    """
+    Marcas de tiempo del usuario para varias lecciones: {lesson_id: {"id", "time"}}.
+    Igual que get_mark_by_lesson_and_user, crea con tiempo 0 las que falten,
+    todas en un único INSERT ... ON CONFLICT DO NOTHING.
+    """
+    lesson_ids = set(lesson_ids)
+    if not lesson_ids:
+        return {}
+
+    stmt = select(LessonMarkTime.id, LessonMarkTime.lesson_id, LessonMarkTime.mark_time).where(
+        LessonMarkTime.user_id == user_id,
+        LessonMarkTime.lesson_id.in_(lesson_ids)
+    )
+    marks = {row.lesson_id: {"id": row.id, "time": row.mark_time} for row in db.execute(stmt)}
+
+    missing = lesson_ids - marks.keys()
+    if missing:
+        inserted = db.execute(
+            insert(LessonMarkTime)
+            .values([{"lesson_id": lesson_id, "user_id": user_id, "mark_time": 0} for lesson_id in missing])
+            .on_conflict_do_nothing(index_elements=["user_id", "lesson_id"])
+            .returning(LessonMarkTime.id, LessonMarkTime.lesson_id, LessonMarkTime.mark_time)
+        )
+        marks.update({row.lesson_id: {"id": row.id, "time": row.mark_time} for row in inserted})
+
+        # Otra request pudo crearlas entre el SELECT y el INSERT
+        missing -= marks.keys()
+        if missing:
+            rows = db.execute(stmt.where(LessonMarkTime.lesson_id.in_(missing)))
+            marks.update({row.lesson_id: {"id": row.id, "time": row.mark_time} for row in rows})
+    return marks
+
+
+def get_last_watched_by_course(db: Session, user_id: int, course_ids) -> dict[int, dict]:
+    """
+    Última lección vista por el usuario en cada curso, en una sola consulta
+    (DISTINCT ON course_id ordenado por updated_at). Solo cuentan las marcas
+    guardadas con update_mark_time; las creadas en 0 al abrir un curso no.
+    Devuelve {course_id: {"lesson_id", "section_id", "title", "mark_id", "mark_time", "updated_at"}}.
+    """
+    course_ids = set(course_ids)
+    if not course_ids:
+        return {}
+
+    stmt = (
+        select(
+            Lesson.course_id,
+            Lesson.id.label("lesson_id"),
+            Lesson.section_id,
+            Lesson.title,
+            LessonMarkTime.id.label("mark_id"),
+            LessonMarkTime.mark_time,
+            LessonMarkTime.updated_at
+        )
+        .join(Lesson, Lesson.id == LessonMarkTime.lesson_id)
+        .where(
+            LessonMarkTime.user_id == user_id,
+            LessonMarkTime.updated_at.is_not(None),
+            Lesson.course_id.in_(course_ids)
+        )
+        .distinct(Lesson.course_id)
+        .order_by(Lesson.course_id, LessonMarkTime.updated_at.desc(), LessonMarkTime.id.desc())
+    )
+    return {
+        row.course_id: {
+            "lesson_id": row.lesson_id,
+            "section_id": row.section_id,
+            "title": row.title,
+            "mark_id": row.mark_id,
+            "mark_time": row.mark_time,
+            "updated_at": row.updated_at.isoformat()
+        }
+        for row in db.execute(stmt)
+    }
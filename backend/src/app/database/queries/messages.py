@@ -1,13 +1,19 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from app.database.base import Message
-from app.database.queries.user import get_user_by_id
+from app.database.queries.user import get_usernames_by_ids
+from app.database.queries.catalog import invalidate_thread_content
+from app.utils.util_database import DEFAULT_PAGE_SIZE, keyset_page, encode_cursor, page_cursors
 
 
 def create_message(db: Session, thread_id: int, user_id: str, message: str, date_created=None):
-    msg = Message(thread_id=thread_id, user_id=user_id, message=message, created_at=date_created)
+    msg = Message(thread_id=thread_id, user_id=user_id, message=message)
+    if date_created:
+        msg.created_at = date_created
     db.add(msg)
-    db.commit()
-    db.refresh(msg)
+    db.flush()
+    # messages_count de los resúmenes de hilos en course_content
+    invalidate_thread_content(db, thread_id)
     return msg
 
 
@@ -15,25 +21,37 @@ def delete_message_by_id(db: Session, message_id: int):
     msg = db.query(Message).filter(Message.id == message_id).first()
     if msg:
         db.delete(msg)
-        db.commit()
+        db.flush()
+        invalidate_thread_content(db, msg.thread_id)
     return msg
 
 
-def get_messages_by_thread_id(db: Session, thread_id: int):
-    messages = db.query(Message).filter(Message.thread_id == thread_id).all()
-    if not messages:
-        return None
-
+def get_messages_by_thread_id(
+        db: Session,
+        thread_id: int,
+        limit: int = DEFAULT_PAGE_SIZE,
+        before: str = None,
+        after: str = None
+        ) -> dict:
+    """
+    Página de mensajes de un hilo en orden cronológico (keyset sobre created_at, id).
+    Con after devuelve solo los mensajes nuevos desde ese cursor.
+    """
+    stmt = select(Message).where(Message.thread_id == thread_id)
+    rows, has_more = keyset_page(db, stmt, Message.created_at, Message.id, limit, before, after)
+    messages = [row[0] for row in rows]
+
+    usernames = get_usernames_by_ids(db, {msg.user_id for msg in messages})
     message_list = []
     for msg in messages:
-        user_data = get_user_by_id(db, msg.user_id)
         message_data = {
             "id": msg.id,
             "thread_id": msg.thread_id,
-            "username": user_data.username if user_data else None,
+            "username": usernames.get(msg.user_id),
             "message": msg.message,
-            "created_at": msg.created_at.isoformat() if msg.created_at else None
+            "created_at": msg.created_at.isoformat(),
+            "cursor": encode_cursor(msg.created_at, msg.id)
         }
         message_list.append(message_data)
 
-    return message_list
+    return {"items": message_list, **page_cursors(message_list, has_more, after)}
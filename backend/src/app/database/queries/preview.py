@@ -1,13 +1,14 @@
 from sqlalchemy.orm import Session
 from app.database.base import PreviewFile   
 from sqlalchemy import select, delete, update
+from app.database.queries.catalog import invalidate_course_content
 
 # Crear un nuevo registro
 def add_preview_file(db: Session, course_id: int, file_id: str) -> dict:
     new_file = PreviewFile(course_id=course_id, file_id=file_id)
     db.add(new_file)
-    db.commit()
-    db.refresh(new_file)
+    db.flush()
+    invalidate_course_content(db, course_id)
     return {
         "id": new_file.id,
         "course_id": new_file.course_id,
@@ -30,7 +31,7 @@ def get_preview_files_by_course(db: Session, course_id: int) -> dict | None:
 def delete_preview_files_by_course(db: Session, course_id: int) -> dict:
     stmt = delete(PreviewFile).where(PreviewFile.course_id == course_id)
     result = db.execute(stmt)
-    db.commit()
+    invalidate_course_content(db, course_id)
     return {"deleted": result.rowcount}  # cantidad de filas borradas
 
 
@@ -43,7 +44,7 @@ def update_preview_file_by_course(db: Session, course_id: int, new_file_id: str)
         .returning(PreviewFile.id, PreviewFile.course_id, PreviewFile.file_id)
     )
     result = db.execute(stmt)
-    db.commit()
+    invalidate_course_content(db, course_id)
     row = result.fetchone()
     if row:
         return {"id": row.id, "course_id": row.course_id, "file_id": row.file_id}
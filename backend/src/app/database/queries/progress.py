@@ -1,37 +1,59 @@
 from sqlalchemy.orm import Session
-from app.database.base import Lesson
-from app.database.base import LessonComplete
+from sqlalchemy import select, update, delete, func, literal, distinct
+from sqlalchemy.dialects.postgresql import insert, array, aggregate_order_by
+from app.database.base import Course, Lesson
+from app.database.base import LessonComplete, CourseProgress
 
 # Query 1: Guardar/marcar lección como completada
-def mark_lesson_as_complete(db: Session, user_id: int, lesson_id: int) -> LessonComplete:
+def mark_lesson_as_complete(db: Session, user_id: int, lesson_id: int) -> bool | None:
     """
-    Marca una lección como completada para un usuario específico.
-    Si ya existe el registro, no hace nada (evita duplicados).
+    Marca una lección como completada para un usuario específico en una sola
+    sentencia (INSERT ... ON CONFLICT DO NOTHING sobre (user_id, lesson_id)).
+    Si se creó, agrega el id al array ordenado de course_progress en la misma
+    sentencia. Retorna True si se creó el registro, False si ya existía
+    y None si la lección no existe.
     """
-    # Verificar si ya existe el registro
-    existing_complete = (
-        db.query(LessonComplete)
-        .filter(
-            LessonComplete.user_id == user_id,
-            LessonComplete.lesson_id == lesson_id
-        )
-        .first()
+    lesson = select(Lesson.id, Lesson.course_id).where(Lesson.id == lesson_id).cte("lesson")
+    inserted = (
+        insert(LessonComplete)
+        .from_select(["user_id", "lesson_id"], select(literal(user_id), lesson.c.id))
+        .on_conflict_do_nothing(index_elements=["user_id", "lesson_id"])
+        .returning(LessonComplete.lesson_id)
+        .cte("inserted")
     )
-    
-    if existing_complete:
-        return existing_complete
-    
-    # Crear nuevo registro
-    lesson_complete = LessonComplete(
-        user_id=user_id,
-        lesson_id=lesson_id
+    progress_insert = insert(CourseProgress).from_select(
+        ["user_id", "course_id", "lesson_ids"],
+        select(literal(user_id), lesson.c.course_id, array([lesson.c.id]))
+        .join(inserted, inserted.c.lesson_id == lesson.c.id)
+        .where(lesson.c.course_id.is_not(None))
     )
-    
-    db.add(lesson_complete)
-    db.commit()
-    db.refresh(lesson_complete)
-    
-    return lesson_complete
+    merged_id = func.unnest(
+        func.array_cat(CourseProgress.lesson_ids, progress_insert.excluded.lesson_ids)
+    ).column_valued("lesson_id")
+    progress = (
+        progress_insert
+        .on_conflict_do_update(
+            index_elements=["user_id", "course_id"],
+            set_={
+                "lesson_ids": select(
+                    func.array_agg(aggregate_order_by(distinct(merged_id), merged_id))
+                ).scalar_subquery()
+            }
+        )
+        .returning(CourseProgress.user_id)
+        .cte("progress")
+    )
+    row = db.execute(
+        select(
+            select(func.count()).select_from(lesson).scalar_subquery().label("lesson_exists"),
+            select(func.count()).select_from(inserted).scalar_subquery().label("created"),
+            select(func.count()).select_from(progress).scalar_subquery().label("progress")
+        )
+    ).one()
+
+    if not row.lesson_exists:
+        return None
+    return bool(row.created)
 
 
 # Query 3: Verificar si una lección está completada (retorna boolean)
@@ -54,27 +76,70 @@ def is_lesson_completed(db: Session, user_id: int, lesson_id: int) -> bool:
     ) is not None
 
 
+# Query 4: Ids de lecciones completadas por un usuario en un curso
+def get_completed_lesson_ids(db: Session, user_id: int, course_id: int) -> set[int]:
+    """
+    Devuelve el conjunto de lesson_id completados por el usuario dentro del
+    curso, leyendo una sola fila de course_progress.
+    """
+    lesson_ids = db.scalar(
+        select(CourseProgress.lesson_ids).where(
+            CourseProgress.user_id == user_id,
+            CourseProgress.course_id == course_id
+        )
+    )
+    return set(lesson_ids or ())
+
+
 # Query 6: Eliminar registro de lección completada (desmarcar)
 def unmark_lesson_as_complete(db: Session, user_id: int, lesson_id: int) -> bool:
     """
-    Desmarca una lección como completada (elimina el registro).
+    Desmarca una lección como completada (elimina el registro) y la quita
+    del array de course_progress.
     Retorna True si se eliminó, False si no existía.
     """
-    lesson_complete = (
-        db.query(LessonComplete)
-        .filter(
+    deleted = db.execute(
+        delete(LessonComplete)
+        .where(
             LessonComplete.user_id == user_id,
             LessonComplete.lesson_id == lesson_id
         )
-        .first()
+        .returning(LessonComplete.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if deleted is None:
+        return False
+
+    db.execute(
+        update(CourseProgress)
+        .where(
+            CourseProgress.user_id == user_id,
+            CourseProgress.course_id == select(Lesson.course_id).where(Lesson.id == lesson_id).scalar_subquery()
+        )
+        .values(lesson_ids=func.array_remove(CourseProgress.lesson_ids, lesson_id))
+    )
+    return True
+
+
+def remove_lessons_from_progress(db: Session, course_id: int, lesson_ids: list[int]) -> None:
+    """
+    Quita lecciones borradas de los arrays de course_progress del curso
+    (lessons_complete se limpia solo por ON DELETE CASCADE).
+    """
+    if not lesson_ids:
+        return
+    remaining = func.unnest(CourseProgress.lesson_ids).column_valued("lesson_id")
+    db.execute(
+        update(CourseProgress)
+        .where(
+            CourseProgress.course_id == course_id,
+            CourseProgress.lesson_ids.overlap(array(lesson_ids))
+        )
+        .values(lesson_ids=func.array(
+            select(remaining).where(remaining.not_in(lesson_ids)).order_by(remaining).scalar_subquery()
+        ))
+        .execution_options(synchronize_session=False)
     )
-    
-    if lesson_complete:
-        db.delete(lesson_complete)
-        db.commit()
-        return True
-    
-    return False
 
 
 # Query 7: Obtener progreso de un curso (lecciones completadas vs total)
@@ -82,26 +147,31 @@ def get_course_progress(db: Session, user_id: int, course_id: int) -> dict:
     """
     Obtiene el progreso de un usuario en un curso específico.
     Retorna diccionario con total_lessons, completed_lessons, y progress_percentage.
+    Las completadas salen del tamaño del array de course_progress.
     """
-    from sqlalchemy import func
-    
-    # Total de lecciones en el curso
-    total_lessons = (
-        db.query(func.count(Lesson.id))
-        .filter(Lesson.course_id == course_id)
-        .scalar()
-    )
-    
-    # Lecciones completadas por el usuario en este curso
-    completed_lessons = (
-        db.query(func.count(LessonComplete.id))
-        .join(Lesson, LessonComplete.lesson_id == Lesson.id)
-        .filter(
-            LessonComplete.user_id == user_id,
-            Lesson.course_id == course_id
+    row = db.execute(
+        select(
+            # Total de lecciones en el curso (contador de courses)
+            func.coalesce(
+                select(Course.lessons_count)
+                .where(Course.id == course_id)
+                .scalar_subquery(),
+                0
+            ).label("total_lessons"),
+            # Lecciones completadas por el usuario en este curso
+            func.coalesce(
+                select(func.cardinality(CourseProgress.lesson_ids))
+                .where(
+                    CourseProgress.user_id == user_id,
+                    CourseProgress.course_id == course_id
+                )
+                .scalar_subquery(),
+                0
+            ).label("completed_lessons")
         )
-        .scalar()
-    )
+    ).one()
+    total_lessons = row.total_lessons
+    completed_lessons = row.completed_lessons
     
     progress_percentage = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
     
@@ -1,26 +1,39 @@
+from collections import Counter
 from sqlalchemy.inspection import inspect
 from sqlalchemy.orm import Session
 from app.database.base import Section
-from app.database.queries.lessons import get_lessons_by_section_id
+from app.database.queries.lessons import get_lessons_by_section_id, adjust_lessons_count
+from app.database.queries.progress import remove_lessons_from_progress
+from app.database.queries.catalog import invalidate_catalog, invalidate_course_content
+from app.database.query_cache import cached_query
 
 
 def add_section(db: Session, section_data: dict) -> Section:
     section = Section(**section_data)
     db.add(section)
-    db.commit()
-    db.refresh(section)
+    db.flush()
+    invalidate_course_content(db, section.course_id)
     return section
 
 
 def delete_section_by_id(db: Session, section_id: int) -> bool:
     section = db.query(Section).filter(Section.id == section_id).first()
     if section:
+        lesson_ids = [lesson.id for lesson in section.lessons]
+        removed_by_course = Counter(lesson.course_id for lesson in section.lessons)
         db.delete(section)
-        db.commit()
+        db.flush()
+        remove_lessons_from_progress(db, section.course_id, lesson_ids)
+        for course_id, removed in removed_by_course.items():
+            adjust_lessons_count(db, course_id, -removed)
+        # Las lecciones de la sección cambian el lessons_count del catálogo
+        invalidate_catalog(db)
+        invalidate_course_content(db, section.course_id)
         return True
     return False
 
 
+@cached_query(tables=("sections",), tags=lambda args, result: [f"courses:{args['course_id']}"])
 def get_sections_by_course_id(db: Session, course_id: int) -> list[int]:
     sections_data = db.query(Section).filter(Section.course_id == course_id).all()
     if not sections_data:
@@ -1,34 +1,135 @@
-from app.database.base import Purchase
-from app.database.queries.courses import get_course_by_id
-from app.database.queries.user import get_all_users
-from sqlalchemy import func
+from app.database.base import Purchase, User, SalesDaily
+from sqlalchemy import delete, func, select, true, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from datetime import date, datetime, timezone
 
 def get_stats(db):
-    results = (
-        db.query(Purchase.course_id, func.count(Purchase.id).label("sales"))
+    """
+    Calcula todo el payload de /stats en una sola consulta:
+    ingresos por curso con el precio guardado en cada compra (el mismo que suma
+    sales_daily) más el total de usuarios.
+    """
+    sales = (
+        select(
+            Purchase.course_id,
+            func.sum(func.coalesce(Purchase.price, 0)).label("profits")
+        )
         .group_by(Purchase.course_id)
-        .all()
+        .subquery()
     )
+    users = select(func.count(User.id).label("total_users")).subquery()
+
+    # LEFT JOIN ... ON TRUE para obtener el total de usuarios aunque no haya ventas
+    stmt = (
+        select(users.c.total_users, sales.c.course_id, sales.c.profits)
+        .select_from(users.outerjoin(sales, true()))
+    )
+    rows = db.execute(stmt).all()
 
-    sales_dict = {course_id: sales for course_id, sales in results}
     total_profits: int = 0
     course_profits: dict = {}
-
-    for id, x in sales_dict.items():
-        course = get_course_by_id(db, id)
-        course_data = course["course_data"]
-        price = course_data['price']
-        profits = x * price
-        print(f"Course ID: {id}, Sales: {x}, Price: {price}, Profits: {profits}")
-        course_profits[id] = profits
-        total_profits += profits
-
-
+    for row in rows:
+        if row.course_id is None:
+            continue
+        course_profits[row.course_id] = row.profits
+        total_profits += row.profits
 
     response = {
-        "total_users": len(get_all_users(db)),
+        "total_users": rows[0].total_users if rows else 0,
         "total_profits": total_profits,
         "profits_by_course": course_profits
     }
 
-    return response 
+    return response
+
+
+def _purchase_day(column):
+    # Día de la compra en UTC
+    return func.date(func.timezone("UTC", column))
+
+
+def record_sale(db, course_id: int, price: float = None, purchased_at: datetime = None):
+    """
+    Suma una venta al rollup diario (INSERT ... ON CONFLICT DO UPDATE) con el
+    precio guardado en la compra. Se llama desde save_purchase.
+    """
+    day = (purchased_at or datetime.now(timezone.utc)).astimezone(timezone.utc).date()
+    stmt = insert(SalesDaily).values(day=day, course_id=course_id, sales=1, revenue=price or 0)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SalesDaily.day, SalesDaily.course_id],
+        set_={
+            "sales": SalesDaily.sales + stmt.excluded.sales,
+            "revenue": SalesDaily.revenue + stmt.excluded.revenue
+        }
+    )
+    db.execute(stmt)
+
+
+def refresh_sales_rollup(db, since: date = None) -> int:
+    """
+    Recalcula el rollup desde my_byd_courses (job de puesta al día).
+    Sobrescribe los buckets (día, curso) a partir de since y borra los que ya
+    no tienen compras (p. ej. por el cascade al borrar un curso); es idempotente.
+    El revenue suma el precio guardado en cada compra, así un cambio de
+    precio del curso no reescribe el histórico.
+    Retorna la cantidad de buckets escritos.
+    """
+    day = _purchase_day(Purchase.created_at)
+    source = (
+        select(
+            day.label("day"),
+            Purchase.course_id,
+            func.count(Purchase.id),
+            func.coalesce(func.sum(Purchase.price), 0)
+        )
+        .group_by(day, Purchase.course_id)
+    )
+    if since:
+        source = source.where(day >= since)
+
+    # Misma transacción: quien lee el rollup nunca ve el hueco entre borrar y escribir
+    stale = delete(SalesDaily).where(
+        tuple_(SalesDaily.day, SalesDaily.course_id).not_in(
+            # Sin NULLs: un NULL en NOT IN no deja borrar nada
+            source.with_only_columns(day, Purchase.course_id).where(Purchase.course_id.is_not(None))
+        )
+    )
+    if since:
+        stale = stale.where(SalesDaily.day >= since)
+    db.execute(stale)
+
+    stmt = insert(SalesDaily).from_select(
+        ["day", "course_id", "sales", "revenue"], source
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SalesDaily.day, SalesDaily.course_id],
+        set_={
+            "sales": stmt.excluded.sales,
+            "revenue": stmt.excluded.revenue
+        }
+    )
+    result = db.execute(stmt)
+    return result.rowcount
+
+
+def get_sales_timeseries(db, start: date = None, end: date = None, course_id: int = None) -> list[dict]:
+    """
+    Ventas e ingresos por día y curso, leyendo solo el rollup sales_daily.
+    """
+    stmt = select(SalesDaily).order_by(SalesDaily.day, SalesDaily.course_id)
+    if start:
+        stmt = stmt.where(SalesDaily.day >= start)
+    if end:
+        stmt = stmt.where(SalesDaily.day <= end)
+    if course_id is not None:
+        stmt = stmt.where(SalesDaily.course_id == course_id)
+
+    return [
+        {
+            "day": row.day.isoformat(),
+            "course_id": row.course_id,
+            "sales": row.sales,
+            "revenue": row.revenue
+        }
+        for row in db.scalars(stmt)
+    ]
@@ -1,13 +1,17 @@
 from sqlalchemy.orm import Session
-from app.database.base import Thread
-from app.database.queries.user import get_user_by_id
+from sqlalchemy import select, func, case
+from app.database.base import Thread, Message, User, Lesson
+from app.database.queries.user import get_usernames_by_ids
+from app.database.queries.catalog import invalidate_lesson_content
+from app.database.query_cache import cached_query
+from app.utils.util_database import DEFAULT_PAGE_SIZE, keyset_page, encode_cursor, page_cursors
 
 
 def create_thread(db: Session, lesson_id: int, user_id: str, topic: str, description: str = None):
     thread = Thread(lesson_id=lesson_id, user_id=user_id, topic=topic, description=description)
     db.add(thread)
-    db.commit()
-    db.refresh(thread)
+    db.flush()
+    invalidate_lesson_content(db, lesson_id)
     return thread
 
 
@@ -15,23 +19,165 @@ def delete_thread_by_id(db: Session, thread_id: int):
     thread = db.query(Thread).filter(Thread.id == thread_id).first()
     if thread:
         db.delete(thread)
-        db.commit()
+        db.flush()
+        invalidate_lesson_content(db, thread.lesson_id)
     return thread
 
 
-def get_threads_by_lesson_id(db: Session, lesson_id: int):
-    threads = db.query(Thread).filter(Thread.lesson_id == lesson_id).all()
-    if not threads:
-        return None
+def get_threads_by_lesson_id(
+        db: Session,
+        lesson_id: int,
+        limit: int = DEFAULT_PAGE_SIZE,
+        before: str = None,
+        after: str = None
+        ) -> dict:
+    """
+    Página de hilos de una lección en orden cronológico (keyset sobre created_at, id).
+    Con after devuelve solo los hilos nuevos desde ese cursor.
+    """
+    stmt = select(Thread).where(Thread.lesson_id == lesson_id)
+    rows, has_more = keyset_page(db, stmt, Thread.created_at, Thread.id, limit, before, after)
+    threads = [row[0] for row in rows]
+
+    usernames = get_usernames_by_ids(db, {thread.user_id for thread in threads})
     thread_list = []
     for thread in threads:
-        user_data = get_user_by_id(db, thread.user_id)
         thread_data = {
             "id": thread.id,
             "lesson_id": thread.lesson_id,
-            "username": user_data.username if user_data else None,
+            "username": usernames.get(thread.user_id),
             "topic": thread.topic,
-            "description": thread.description
+            "description": thread.description,
+            "created_at": thread.created_at.isoformat(),
+            "cursor": encode_cursor(thread.created_at, thread.id)
         }
         thread_list.append(thread_data)
-    return thread_list
+
+    return {"items": thread_list, **page_cursors(thread_list, has_more, after)}
+
+
+def _thread_summary_tags(args: dict, result: dict) -> list[str]:
+    # Hilos nuevos/borrados por lección, mensajes por hilo y nombres de autor
+    return [
+        "users",
+        *(f"lessons:{lesson_id}" for lesson_id in args["lesson_ids"]),
+        *(f"threads:{thread['id']}" for threads in result.values() for thread in threads)
+    ]
+
+
+@cached_query(
+    tables=("threads", "messages"),
+    tags=_thread_summary_tags,
+    decode=lambda cached: {int(lesson_id): threads for lesson_id, threads in cached.items()}
+)
+def get_threads_by_lesson_ids(db: Session, lesson_ids: list[int]) -> dict[int, list[dict]]:
+    """
+    Carga en una sola consulta los hilos de varias lecciones, con el autor
+    (join a users) y el número de mensajes, agrupados por lesson_id.
+    Devuelve resúmenes ligeros: id, lesson_id, topic, username, messages_count.
+    """
+    threads_by_lesson = {lesson_id: [] for lesson_id in lesson_ids}
+    if not lesson_ids:
+        return threads_by_lesson
+
+    # Contar solo los mensajes de los hilos pedidos (índice por thread_id)
+    messages_count = (
+        select(Message.thread_id, func.count(Message.id).label("messages_count"))
+        .where(Message.thread_id.in_(select(Thread.id).where(Thread.lesson_id.in_(lesson_ids))))
+        .group_by(Message.thread_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            Thread.id,
+            Thread.lesson_id,
+            Thread.topic,
+            User.username,
+            func.coalesce(messages_count.c.messages_count, 0).label("messages_count")
+        )
+        .outerjoin(User, User.id == Thread.user_id)
+        .outerjoin(messages_count, messages_count.c.thread_id == Thread.id)
+        .where(Thread.lesson_id.in_(lesson_ids))
+        .order_by(Thread.lesson_id, Thread.id)
+    )
+    for row in db.execute(stmt):
+        threads_by_lesson[row.lesson_id].append({
+            "id": row.id,
+            "lesson_id": row.lesson_id,
+            "username": row.username,
+            "topic": row.topic,
+            "messages_count": row.messages_count
+        })
+    return threads_by_lesson
+
+
+def get_unread_activity_by_course(db: Session, user_id: int, course_ids) -> dict[int, dict]:
+    """
+    Actividad sin leer del foro en una sola consulta: en los hilos donde el
+    usuario participa (los abrió o escribió en ellos), cuenta los mensajes de
+    otros usuarios posteriores a su última participación.
+    Devuelve {course_id: {"unread_messages", "threads": [{"id", "lesson_id", "topic", "unread", "last_activity"}]}},
+    solo con los cursos que tienen algo sin leer.
+    """
+    course_ids = set(course_ids)
+    if not course_ids:
+        return {}
+
+    # Hilos de los cursos pedidos: acota todo lo demás por índice
+    course_threads = (
+        select(Thread.id, Thread.user_id, Thread.created_at)
+        .join(Lesson, Lesson.id == Thread.lesson_id)
+        .where(Lesson.course_id.in_(course_ids))
+        .cte("course_threads")
+    )
+    own_messages = (
+        select(Message.thread_id, func.max(Message.created_at).label("last_posted"))
+        .where(
+            Message.user_id == user_id,
+            Message.thread_id.in_(select(course_threads.c.id))
+        )
+        .group_by(Message.thread_id)
+        .subquery()
+    )
+    # greatest ignora los NULL: vale con abrir el hilo o con escribir en él
+    last_seen = func.greatest(
+        own_messages.c.last_posted,
+        case((Thread.user_id == user_id, Thread.created_at))
+    )
+    stmt = (
+        select(
+            Thread.id,
+            Thread.lesson_id,
+            Thread.topic,
+            Lesson.course_id,
+            func.count(Message.id).label("unread"),
+            func.max(Message.created_at).label("last_activity")
+        )
+        .join(Lesson, Lesson.id == Thread.lesson_id)
+        .outerjoin(own_messages, own_messages.c.thread_id == Thread.id)
+        .join(
+            Message,
+            (Message.thread_id == Thread.id)
+            & Message.user_id.is_distinct_from(user_id)
+            & (Message.created_at > last_seen)
+        )
+        .where(
+            Lesson.course_id.in_(course_ids),
+            (Thread.user_id == user_id) | own_messages.c.thread_id.is_not(None)
+        )
+        .group_by(Thread.id, Lesson.course_id)
+        .order_by(func.max(Message.created_at).desc())
+    )
+
+    activity = {}
+    for row in db.execute(stmt):
+        course_activity = activity.setdefault(row.course_id, {"unread_messages": 0, "threads": []})
+        course_activity["unread_messages"] += row.unread
+        course_activity["threads"].append({
+            "id": row.id,
+            "lesson_id": row.lesson_id,
+            "topic": row.topic,
+            "unread": row.unread,
+            "last_activity": row.last_activity.isoformat()
+        })
+    return activity
@@ -13,8 +13,7 @@ def save_token(db: Session, user_id: int, token: str) -> ResetPassword:
             expires_at=datetime.now(timezone.utc) + timedelta(minutes=15)
         )
         db.add(new_token)
-        db.commit()
-        db.refresh(new_token)
+        db.flush()
         return new_token
 
     raise ValueError("No se pudo generar un código único tras varios intentos")
@@ -24,4 +23,3 @@ def delete_expired_tokens(db: Session):
     db.query(ResetPassword).filter(
         ResetPassword.expires_at <= datetime.now(timezone.utc)
     ).delete()
-    db.commit()
@@ -1,7 +1,90 @@
 # Queries especificas para la tabla User
 
 from sqlalchemy.orm import Session
+from sqlalchemy import select, event
+from cachetools import TTLCache
+from threading import Lock
 from app.database.base import User
+from app.parameters import settings
+from app.database.queries.catalog import invalidate_catalog, invalidate_course_content
+from app.utils.cache import cache
+
+
+# ---------------------------------------------- Profile Cache ----------------------------------------------
+class UserProfileCache:
+    """
+    Cache acotado (LRU + TTL) de proyecciones de perfil entre requests.
+    Guarda solo id, username e is_sensei; se invalida en update_user/delete_user.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, user_ids) -> dict[int, dict]:
+        found = {}
+        with self._lock:
+            for user_id in user_ids:
+                profile = self._cache.get(user_id)
+                if profile is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    found[user_id] = profile
+        return found
+
+    def set_many(self, profiles) -> None:
+        with self._lock:
+            for profile in profiles:
+                self._cache[profile["id"]] = profile
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+profile_cache = UserProfileCache(
+    maxsize=settings.USER_CACHE_MAXSIZE,
+    ttl=settings.USER_CACHE_TTL
+)
+
+# Invalidaciones publicadas por cualquier worker
+cache.subscribe(
+    "user_profile",
+    lambda user_id: profile_cache.clear() if user_id is None else profile_cache.invalidate(user_id)
+)
+
+
+def get_user_cache_stats() -> dict:
+    return profile_cache.stats()
+
+
+def invalidate_user_profile(db: Session, user_id: int) -> None:
+    """
+    Invalida el perfil ahora y de nuevo tras el commit de la sesión, para que
+    otra request no vuelva a cachear la versión anterior mientras tanto.
+    Tras el commit se publica a todos los workers.
+    """
+    profile_cache.invalidate(user_id)
+    event.listen(db, "after_commit", lambda session: cache.publish("user_profile", user_id), once=True)
+
 
 def create_user(db: Session, name: str, email: str, password: str, is_sensei: bool, is_verify: bool = False):
     new_user = User(
@@ -12,8 +95,7 @@ def create_user(db: Session, name: str, email: str, password: str, is_sensei: bo
         is_verify=is_verify
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    db.flush()
     return new_user
 
 
@@ -21,7 +103,9 @@ def delete_user(db: Session, user_id: int):
     user = db.query(User).filter(User.id == user_id).first()
     if user:
         db.delete(user)
-        db.commit()
+        db.flush()
+        invalidate_user_profile(db, user_id)
+        invalidate_course_content(db)
         return True
     return False
 
@@ -30,6 +114,80 @@ def get_user_by_id(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 
+class UserLoader:
+    """
+    Loader de nombres de usuario con alcance de request (patrón DataLoader).
+    Acumula ids pendientes, consulta primero profile_cache y resuelve los
+    faltantes con un único SELECT id, username, is_sensei ... WHERE id IN (...),
+    memoizando el resultado mientras viva la sesión (una por request, ver get_db).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._pending: set[int] = set()
+        self._profiles: dict[int, dict | None] = {}
+
+    def prime(self, user_ids) -> None:
+        # Encola ids para resolverlos en el siguiente dispatch
+        for user_id in user_ids:
+            if user_id is not None and user_id not in self._profiles:
+                self._pending.add(user_id)
+
+    def dispatch(self) -> None:
+        if not self._pending:
+            return
+        ids = self._pending
+        self._pending = set()
+
+        # Primero el cache entre requests, luego un único SELECT para los faltantes
+        found = profile_cache.get_many(ids)
+        missing = ids - found.keys()
+        if missing:
+            rows = self.db.execute(
+                select(User.id, User.username, User.is_sensei).where(User.id.in_(missing))
+            ).all()
+            loaded = [
+                {"id": row.id, "username": row.username, "is_sensei": row.is_sensei}
+                for row in rows
+            ]
+            profile_cache.set_many(loaded)
+            found.update({profile["id"]: profile for profile in loaded})
+
+        for user_id in ids:
+            self._profiles[user_id] = found.get(user_id)
+
+    def load_profiles(self, user_ids) -> dict[int, dict | None]:
+        user_ids = list(user_ids)
+        self.prime(user_ids)
+        self.dispatch()
+        return {user_id: self._profiles.get(user_id) for user_id in user_ids}
+
+    def load_many(self, user_ids) -> dict[int, str | None]:
+        profiles = self.load_profiles(user_ids)
+        return {
+            user_id: profile["username"] if profile else None
+            for user_id, profile in profiles.items()
+        }
+
+    def load(self, user_id: int) -> str | None:
+        return self.load_many([user_id])[user_id]
+
+
+def get_user_loader(db: Session) -> UserLoader:
+    """
+    Devuelve el UserLoader asociado a la sesión, creándolo si no existe.
+    """
+    loader = db.info.get("user_loader")
+    if loader is None:
+        loader = UserLoader(db)
+        db.info["user_loader"] = loader
+    return loader
+
+
+def get_usernames_by_ids(db: Session, user_ids) -> dict[int, str | None]:
+    return get_user_loader(db).load_many(user_ids)
+
+
 def get_user_by_email(db: Session, email: str):
     user = db.query(User).filter(User.email == email).first()
     return {
@@ -79,8 +237,14 @@ def update_user(
         user.is_verify = verify
     if is_sensei:
         user.is_sensei = is_sensei
-    db.commit()
-    db.refresh(user)
+    db.flush()
+    invalidate_user_profile(db, user_id)
+    if user.is_sensei and (name or is_sensei):
+        # El catálogo muestra el nombre del sensei
+        invalidate_catalog(db)
+    if name:
+        # Nombres de sensei y de autores de hilos en los esqueletos de course_content
+        invalidate_course_content(db)
     return user
 
 
@@ -0,0 +1,219 @@
+"""
+Cache de resultados para funciones de lectura de app/database/queries.
+
+Cada resultado se guarda en el backend compartido (app.utils.cache) con
+etiquetas, y las escrituras de la sesión las invalidan solas:
+
+- after_flush: cada instancia nueva, modificada o borrada de un modelo
+  rastreado emite "tabla", "tabla:pk" y una etiqueta por clave foránea
+  ("courses:3" para una Lesson con course_id=3, con el valor anterior si cambió).
+- do_orm_execute: INSERT/UPDATE/DELETE masivos (db.execute(insert(...)),
+  query.delete()) emiten "tabla" y "tabla:*", porque no se sabe qué filas tocan.
+- after_commit: se vuelven a invalidar las etiquetas de la transacción, por si
+  otra request cacheó datos anteriores al commit entre medio.
+
+Una lectura toma cache.generation() antes de consultar y el resultado solo se
+guarda si ninguna de sus etiquetas se invalidó desde entonces: una consulta
+que leyó antes de un commit no deja en el cache el valor anterior.
+
+Una entrada sin tags depende de la tabla completa (etiqueta "tabla"). Con tags
+depende de esas etiquetas y de "tabla:*" para cada tabla de tables.
+
+Mientras la sesión tiene escrituras sin commit, las lecturas van directo a la
+base (ni leen ni guardan en el cache).
+
+El cache no hace I/O en el event loop (rutas async, AsyncSession.run_sync):
+ahí las lecturas van directo a la base ("bypassed") y las invalidaciones se
+encolan al hilo de envío del backend (cache.invalidate_tags_later). Desde los
+hilos de run_db se invalida en línea, así la misma request ve su escritura.
+
+Solo se activa con un backend compartido (redis, sqlite): invalidate_tags borra
+en el almacén común y lo ven todos los workers. Con CACHE_BACKEND=memory cada
+worker tendría su copia y las invalidaciones de otro worker no le llegarían,
+así que todas las lecturas se cuentan como "bypassed" y van a la base.
+"""
+
+import functools
+import inspect
+import json
+import logging
+from threading import Lock
+
+from sqlalchemy import event
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from app.database.base import Course, Section, Lesson, Thread, Message, Purchase, User
+from app.database.session import _in_event_loop
+from app.parameters import settings
+from app.utils.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Modelos cuyas escrituras invalidan el cache
+TRACKED_TABLES = {
+    model.__tablename__
+    for model in (Course, Section, Lesson, Thread, Message, Purchase, User)
+}
+
+PENDING_TAGS = "query_cache_tags"
+
+_stats: dict[str, dict] = {}
+_stats_lock = Lock()
+
+
+def _count(name: str, field: str) -> None:
+    with _stats_lock:
+        stats = _stats.setdefault(name, {"hits": 0, "misses": 0, "bypassed": 0})
+        stats[field] += 1
+
+
+def get_query_cache_stats() -> dict:
+    with _stats_lock:
+        return {
+            name: {
+                **stats,
+                "hit_rate": round(stats["hits"] / (stats["hits"] + stats["misses"]), 4)
+                if stats["hits"] + stats["misses"] else 0.0
+            }
+            for name, stats in _stats.items()
+        }
+
+
+def cached_query(tables: tuple, tags=None, ttl: int = None, decode=None):
+    """
+    Decorador para funciones de lectura con firma (db: Session, ...).
+    El resultado tiene que poder serializarse a JSON.
+
+    tables: tablas que lee la función.
+    tags: callable(args: dict, result) -> etiquetas finas (p. ej. "courses:3").
+    decode: reconstruye el resultado tras leerlo del cache (claves int de un dict).
+    """
+    def decorator(func):
+        name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(db: Session, *args, **kwargs):
+            if not _enabled() or _in_event_loop() or _has_pending_writes(db):
+                _count(name, "bypassed")
+                return func(db, *args, **kwargs)
+
+            arguments = signature.bind(db, *args, **kwargs)
+            arguments.apply_defaults()
+            call_args = dict(list(arguments.arguments.items())[1:])
+            key = f"q:{name}:{json.dumps(call_args, sort_keys=True, default=str)}"
+
+            try:
+                cached = cache.get(key)
+            except Exception as e:
+                logger.warning(f"Query cache read failed for {name}: {e!r}")
+                cached = None
+            if cached is not None:
+                _count(name, "hits")
+                return decode(cached["value"]) if decode else cached["value"]
+
+            _count(name, "misses")
+            try:
+                # Antes de consultar: si otra sesión invalida alguna etiqueta
+                # mientras tanto, set() descarta este resultado
+                generation = cache.generation()
+            except Exception as e:
+                logger.warning(f"Query cache read failed for {name}: {e!r}")
+                generation = None
+            result = func(db, *args, **kwargs)
+            if generation is None:
+                return result
+            if tags is None:
+                entry_tags = list(tables)
+            else:
+                entry_tags = [*tags(call_args, result), *(f"{table}:*" for table in tables)]
+            try:
+                # Envuelto en un dict para cachear también None y False
+                cache.set(
+                    key, {"value": result}, ttl=ttl or settings.QUERY_CACHE_TTL,
+                    tags=entry_tags, generation=generation
+                )
+            except Exception as e:
+                logger.warning(f"Query cache write failed for {name}: {e!r}")
+            return result
+
+        return wrapper
+    return decorator
+
+
+def _enabled() -> bool:
+    # Sin broadcast (memory) el cache es por worker: un resultado viejo duraría todo el TTL
+    return settings.QUERY_CACHE_ENABLED and cache.broadcasts
+
+
+def _has_pending_writes(db: Session) -> bool:
+    return bool(db.info.get(PENDING_TAGS)) or bool(db.new or db.dirty or db.deleted)
+
+
+def _instance_tags(instance, deleted: bool = False) -> set[str]:
+    state = sa_inspect(instance)
+    table = state.mapper.local_table
+    tags = {table.name}
+    for column in table.primary_key.columns:
+        tags.add(f"{table.name}:{getattr(instance, column.key)}")
+    for fk in table.foreign_keys:
+        column = fk.parent
+        values = {getattr(instance, column.key)}
+        if not deleted:
+            # Valor anterior si la FK cambió (la fila sale de ese padre)
+            values.update(state.attrs[column.key].history.deleted or ())
+        tags.update(f"{fk.column.table.name}:{value}" for value in values if value is not None)
+    return tags
+
+
+def _invalidate(tags) -> None:
+    if not tags:
+        return
+    if _in_event_loop():
+        cache.invalidate_tags_later(*tags)
+        return
+    try:
+        cache.invalidate_tags(*tags)
+    except Exception as e:
+        logger.warning(f"Query cache invalidation failed for {sorted(tags)}: {e!r}")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flush_tags(session, flush_context):
+    tags = set()
+    for instance in session.new:
+        if sa_inspect(instance).mapper.local_table.name in TRACKED_TABLES:
+            tags |= _instance_tags(instance)
+    for instance in session.dirty:
+        if (sa_inspect(instance).mapper.local_table.name in TRACKED_TABLES
+                and session.is_modified(instance, include_collections=False)):
+            tags |= _instance_tags(instance)
+    for instance in session.deleted:
+        if sa_inspect(instance).mapper.local_table.name in TRACKED_TABLES:
+            tags |= _instance_tags(instance, deleted=True)
+    if tags:
+        session.info.setdefault(PENDING_TAGS, set()).update(tags)
+        _invalidate(tags)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tags(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is None or table.name not in TRACKED_TABLES:
+        return
+    tags = {table.name, f"{table.name}:*"}
+    orm_execute_state.session.info.setdefault(PENDING_TAGS, set()).update(tags)
+    _invalidate(tags)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    _invalidate(session.info.pop(PENDING_TAGS, None))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(PENDING_TAGS, None)
@@ -0,0 +1,32 @@
+"""
+Job de puesta al día del rollup de ventas (sales_daily).
+
+Uso:
+    python -m app.database.rollup            # recalcula todo el histórico
+    python -m app.database.rollup --days 7   # solo los últimos 7 días
+"""
+
+import argparse
+from datetime import datetime, timezone, timedelta
+
+from app.database.session import get_db_session
+from app.database.queries.stats import refresh_sales_rollup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the sales_daily rollup")
+    parser.add_argument("--days", type=int, default=None, help="Only refresh the last N days")
+    args = parser.parse_args(argv)
+
+    since = None
+    if args.days is not None:
+        since = (datetime.now(timezone.utc) - timedelta(days=args.days)).date()
+
+    with get_db_session() as db:
+        buckets = refresh_sales_rollup(db, since=since)
+
+    print(f"Sales rollup refreshed: {buckets} buckets (since={since})")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,23 +3,28 @@ Database session management with retry logic for Supabase SSL connection issues
 """
 
 import logging
+import threading
 import time
 import asyncio
-from contextlib import contextmanager
-from typing import Generator, Optional, Any, Callable, Awaitable
+from contextlib import contextmanager, asynccontextmanager
+from typing import Generator, AsyncGenerator, Optional, Any, Callable, Awaitable
 from functools import wraps
 
+from fastapi import Request
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import (
     OperationalError, 
     DisconnectionError, 
     TimeoutError,
     StatementError
 )
-from sqlalchemy import text
+from sqlalchemy import text, event
 
-from .config import SessionLocal, engine
+from .config import SessionLocal, engine, is_connection_error
+from .async_config import AsyncSessionLocal, async_engine, replica_set
 from app.logging_config import log_db_error, log_connection_retry
+from app.parameters import settings
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +32,168 @@ class DatabaseConnectionError(Exception):
     """Custom exception for database connection issues"""
     pass
 
+class CircuitOpenError(DatabaseConnectionError):
+    """Raised without touching the database while the circuit breaker is open"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Database circuit breaker is open, retry in {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker compartido por todas las requests del worker.
+
+    - closed: todo pasa; failure_threshold fallos de conexión seguidos lo abren.
+    - open: se falla rápido (CircuitOpenError -> 503) sin tocar la base.
+    - half_open: pasado reset_timeout se deja pasar una sola request de prueba;
+      si conecta se cierra, si falla se vuelve a abrir.
+
+    Los fallos/éxitos se registran desde eventos del engine (ver más abajo),
+    así cuentan todas las conexiones, no solo las funciones decoradas.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> None:
+        """Raises CircuitOpenError if the request must fail fast"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - now
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(remaining)
+                self._state = self.HALF_OPEN
+                self._probe_started_at = None
+            # half_open: una sola prueba a la vez (se libera si se queda colgada)
+            if self._probe_started_at is None or now - self._probe_started_at > self.reset_timeout:
+                self._probe_started_at = now
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.reset_timeout)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Database circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started_at = None
+                self.times_opened += 1
+                logger.warning(f"Database circuit breaker opened after {self._failures} failures")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def stats(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "retry_after": max(0.0, round(self._opened_at + self.reset_timeout - time.monotonic(), 1))
+                    if state == self.OPEN else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected
+            }
+
+
+db_breaker = CircuitBreaker(
+    failure_threshold=settings.DB_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.DB_BREAKER_RESET_TIMEOUT
+)
+
+
+def _on_engine_error(context):
+    # Errores sobre una conexión ya abierta (desconexiones, SSL cerrado...)
+    if context.connection is None:
+        return  # los fallos al conectar se cuentan en _on_do_connect
+    # Timeouts de sentencia o fallos de serialización no abren el breaker
+    if is_connection_error(context):
+        db_breaker.record_failure()
+
+def _on_do_connect(dialect, connection_record, cargs, cparams):
+    # Fallos al abrir conexión; asyncpg los lanza sin pasar por handle_error
+    try:
+        return dialect.connect(*cargs, **cparams)
+    except Exception:
+        db_breaker.record_failure()
+        raise
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    # El checkout llega tras pasar pool_pre_ping: la base responde
+    db_breaker.record_success()
+
+for _engine in (engine, async_engine.sync_engine):
+    event.listen(_engine, "handle_error", _on_engine_error)
+    event.listen(_engine, "do_connect", _on_do_connect)
+    event.listen(_engine, "checkout", _on_checkout)
+
+
+RETRYABLE_ERRORS = [
+    'ssl connection has been closed',
+    'connection already closed',
+    'server closed the connection',
+    'connection was closed',
+    'ssl error',
+    'connection lost',
+    'ssl connection has been closed unexpectedly'
+]
+
+def _is_retryable(error: Exception) -> bool:
+    error_msg = str(error).lower()
+    return any(keyword in error_msg for keyword in RETRYABLE_ERRORS)
+
+def _in_event_loop() -> bool:
+    # True si el código síncrono corre en el hilo del event loop
+    # (ruta async o AsyncSession.run_sync): ahí no se puede hacer time.sleep
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
 def retry_db_operation(max_retries: int = 3, delay: float = 1.0, backoff: float = 2.0):
     """
     Decorator to retry database operations on connection failures
     Works with both sync and async functions
+
+    - Async: backoff con asyncio.sleep.
+    - Sync en un hilo del pool: backoff con time.sleep.
+    - Sync en el hilo del event loop: reintenta sin esperar, nunca bloquea el loop.
+    - Con el circuit breaker abierto no reintenta: lanza CircuitOpenError.
     
     Args:
         max_retries: Maximum number of retry attempts
@@ -38,100 +201,57 @@ def retry_db_operation(max_retries: int = 3, delay: float = 1.0, backoff: float
         backoff: Multiplier for delay on each retry
     """
     def decorator(func: Callable) -> Callable:
+        def should_retry(e: Exception, attempt: int, current_delay: float) -> bool:
+            if attempt >= max_retries or not _is_retryable(e):
+                return False
+            # El fallo ya quedó registrado por el engine; si abrió el circuito, fallar rápido
+            db_breaker.allow()
+            log_connection_retry(attempt + 1, max_retries + 1, str(e))
+            log_db_error("SSL_RETRY", str(e), {
+                "attempt": attempt + 1,
+                "function": func.__name__,
+                "delay": current_delay
+            })
+            return True
+
+        def give_up(last_exception: Exception):
+            log_db_error("SSL_FAILURE", f"All {max_retries + 1} attempts failed", {
+                "function": func.__name__,
+                "last_error": str(last_exception)
+            })
+            raise DatabaseConnectionError(f"Database operation failed after {max_retries + 1} attempts") from last_exception
+
         if asyncio.iscoroutinefunction(func):
             @wraps(func)
             async def async_wrapper(*args, **kwargs):
-                last_exception = None
                 current_delay = delay
-                
                 for attempt in range(max_retries + 1):
                     try:
                         return await func(*args, **kwargs)
                     except (OperationalError, DisconnectionError, TimeoutError) as e:
-                        last_exception = e
-                        error_msg = str(e).lower()
-                        
-                        # Check if it's an SSL connection error
-                        if any(keyword in error_msg for keyword in [
-                            'ssl connection has been closed',
-                            'connection already closed',
-                            'server closed the connection',
-                            'connection was closed',
-                            'ssl error',
-                            'connection lost',
-                            'ssl connection has been closed unexpectedly'
-                        ]):
-                            if attempt < max_retries:
-                                log_connection_retry(attempt + 1, max_retries + 1, str(e))
-                                log_db_error("SSL_RETRY", str(e), {
-                                    "attempt": attempt + 1,
-                                    "function": func.__name__,
-                                    "delay": current_delay
-                                })
-                                await asyncio.sleep(current_delay)
-                                current_delay *= backoff
-                                continue
-                        
-                        # Re-raise if it's not a retryable error or max retries exceeded
-                        raise e
-                    except Exception as e:
-                        # Don't retry on non-connection errors
-                        raise e
-                
-                # If we get here, all retries failed
-                log_db_error("SSL_FAILURE", f"All {max_retries + 1} attempts failed", {
-                    "function": func.__name__,
-                    "last_error": str(last_exception)
-                })
-                raise DatabaseConnectionError(f"Database operation failed after {max_retries + 1} attempts") from last_exception
+                        if not should_retry(e, attempt, current_delay):
+                            if attempt >= max_retries and _is_retryable(e):
+                                give_up(e)
+                            raise e
+                        await asyncio.sleep(current_delay)
+                        current_delay *= backoff
             
             return async_wrapper
         else:
             @wraps(func)
             def sync_wrapper(*args, **kwargs):
-                last_exception = None
                 current_delay = delay
-                
                 for attempt in range(max_retries + 1):
                     try:
                         return func(*args, **kwargs)
                     except (OperationalError, DisconnectionError, TimeoutError) as e:
-                        last_exception = e
-                        error_msg = str(e).lower()
-                        
-                        # Check if it's an SSL connection error
-                        if any(keyword in error_msg for keyword in [
-                            'ssl connection has been closed',
-                            'connection already closed',
-                            'server closed the connection',
-                            'connection was closed',
-                            'ssl error',
-                            'connection lost',
-                            'ssl connection has been closed unexpectedly'
-                        ]):
-                            if attempt < max_retries:
-                                log_connection_retry(attempt + 1, max_retries + 1, str(e))
-                                log_db_error("SSL_RETRY", str(e), {
-                                    "attempt": attempt + 1,
-                                    "function": func.__name__,
-                                    "delay": current_delay
-                                })
-                                time.sleep(current_delay)
-                                current_delay *= backoff
-                                continue
-                        
-                        # Re-raise if it's not a retryable error or max retries exceeded
-                        raise e
-                    except Exception as e:
-                        # Don't retry on non-connection errors
-                        raise e
-                
-                # If we get here, all retries failed
-                log_db_error("SSL_FAILURE", f"All {max_retries + 1} attempts failed", {
-                    "function": func.__name__,
-                    "last_error": str(last_exception)
-                })
-                raise DatabaseConnectionError(f"Database operation failed after {max_retries + 1} attempts") from last_exception
+                        if not should_retry(e, attempt, current_delay):
+                            if attempt >= max_retries and _is_retryable(e):
+                                give_up(e)
+                            raise e
+                        if not _in_event_loop():
+                            time.sleep(current_delay)
+                            current_delay *= backoff
             
             return sync_wrapper
     return decorator
@@ -139,17 +259,31 @@ def retry_db_operation(max_retries: int = 3, delay: float = 1.0, backoff: float
 @contextmanager
 def get_db_session() -> Generator[Session, None, None]:
     """
-    Context manager for database sessions with automatic cleanup and retry logic
+    Context manager for database sessions with automatic cleanup and retry logic.
+
+    Unit of work: las queries solo hacen flush, aquí se hace un único commit
+    al salir sin errores (rollback si hubo excepción).
+
+    La sesión no pide conexión al pool hasta la primera query, así que los
+    endpoints que no tocan la base no hacen checkout. La validez de la conexión
+    la comprueba pool_pre_ping en el checkout, no un SELECT 1 por request.
+
+    Con el circuit breaker abierto falla rápido con CircuitOpenError (503).
     """
+    db_breaker.allow()
     session = None
     try:
         session = SessionLocal()
-        
-        # Test the connection
-        session.execute(text("SELECT 1"))
-        session.commit()
-        
+
         yield session
+
+        # Si nunca se usó la base no hay transacción que cerrar
+        if session.in_transaction():
+            if session.is_active:
+                session.commit()
+            else:
+                # Un flush falló y el router devolvió su propia respuesta de error
+                session.rollback()
         
     except (OperationalError, DisconnectionError) as e:
         if session:
@@ -202,6 +336,85 @@ def get_db():
     with get_db_session() as session:
         yield session
 
+@asynccontextmanager
+async def get_async_db_session(bind=None) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Versión async de get_db_session sobre el engine asyncpg, con el mismo
+    unit of work: un único commit al salir sin errores, rollback si no.
+
+    Las funciones de app/database/queries se reutilizan tal cual con
+    `await db.run_sync(funcion, *args)`, que les pasa la Session síncrona
+    subyacente sin bloquear el event loop.
+
+    Args:
+        bind: engine de una réplica de lectura; None para el primario.
+              Si la réplica no responde se usa el primario.
+    """
+    session = None
+    if bind is not None:
+        session = AsyncSessionLocal(bind=bind)
+        try:
+            # Checkout (con pre_ping) antes de entregar la sesión
+            await session.connection()
+        except Exception as e:
+            logger.warning(f"Read replica unavailable, falling back to primary: {e}")
+            await session.close()
+            replica_set.mark_down(bind)
+            session = None
+    if session is None:
+        db_breaker.allow()
+        session = AsyncSessionLocal()
+    try:
+        yield session
+
+        if session.in_transaction():
+            if session.is_active:
+                await session.commit()
+            else:
+                await session.rollback()
+
+    except (OperationalError, DisconnectionError) as e:
+        await session.rollback()
+        log_db_error("CONNECTION_ERROR", str(e), {"context": "async_session"})
+        raise DatabaseConnectionError(f"Failed to establish database connection: {e}") from e
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"Database session error: {e}")
+        raise e
+    finally:
+        try:
+            await session.close()
+        except Exception as e:
+            logger.warning(f"Error closing session: {e}")
+
+async def get_async_db():
+    """
+    Dependency function for FastAPI to get an async database session
+    """
+    async with get_async_db_session() as session:
+        yield session
+
+def recently_wrote(request: Request) -> bool:
+    """
+    True si el usuario escribió hace menos de READ_YOUR_WRITES_SECONDS
+    (cookie que pone ReadYourWritesMiddleware tras cada escritura).
+    """
+    rw_until = request.cookies.get(settings.READ_YOUR_WRITES_COOKIE)
+    try:
+        return float(rw_until) > time.time()
+    except (TypeError, ValueError):
+        return False
+
+async def get_read_db(request: Request):
+    """
+    Dependency para endpoints de solo lectura: usa una réplica (round-robin)
+    salvo que no haya réplicas sanas o el usuario acabe de escribir, en cuyo
+    caso lee del primario para ver sus propios cambios.
+    """
+    replica = None if recently_wrote(request) else replica_set.pick()
+    async with get_async_db_session(bind=replica) as session:
+        yield session
+
 @retry_db_operation(max_retries=2, delay=0.3)
 def health_check() -> bool:
     """
@@ -224,6 +437,10 @@ def reset_connection_pool():
     """
     try:
         engine.dispose()
+        # close=False: las conexiones asyncpg en uso se descartan al devolverse
+        async_engine.sync_engine.dispose(close=False)
+        for replica in replica_set.engines:
+            replica.sync_engine.dispose(close=False)
         logger.info("Database connection pool reset successfully")
     except Exception as e:
         logger.error(f"Failed to reset connection pool: {e}")
@@ -78,7 +78,7 @@ def get_cookies(
 
 # Legacy get_db function - replaced by get_db_session in session.py
 # Keeping for backward compatibility but recommend using get_db_session
-from app.database.session import get_db_session
+from app.database.session import get_db_session, get_async_db, get_read_db
 
 def get_cookies_optional(
     request: Request,
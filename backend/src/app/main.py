@@ -1,18 +1,71 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.middlewares import TokenRefreshMiddleware
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from app.middlewares import TokenRefreshMiddleware, ReadYourWritesMiddleware
 from app.parameters import settings
 from app.logging_config import setup_logging
+from app.database.config import engine
+from app.database.async_config import async_engine, replica_set
+from app.database.migrate import check_schema_version
+from app.database.session import CircuitOpenError
+from app.utils.cache import cache
+import asyncio
+import math
 import logging
 
 # Initialize logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Tiempo máximo que el arranque espera la comprobación del esquema
+SCHEMA_CHECK_TIMEOUT = 5.0
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    El esquema se gestiona con migraciones (python -m app.database.migrate),
+    así que cada worker solo comprueba la versión del esquema al arrancar.
+    Si la base de datos no responde, arranca en modo degradado sin esperar.
+    """
+    try:
+        schema = await asyncio.wait_for(
+            run_in_threadpool(check_schema_version),
+            timeout=SCHEMA_CHECK_TIMEOUT
+        )
+        app.state.schema = schema
+        if schema["up_to_date"]:
+            logger.info(f"Database schema up to date (revision {schema['head']})")
+        else:
+            logger.warning(
+                f"Database schema at revision {schema['current']}, expected {schema['head']}. "
+                "Run: python -m app.database.migrate"
+            )
+    except Exception as e:
+        app.state.schema = None
+        logger.warning(f"Schema version check failed, starting in degraded mode: {e!r}")
+        logger.info("💡 Use /api/health/db once the database recovers")
+
+    # Escucha de invalidaciones publicadas por otros workers
+    cache.start()
+
+    yield
+
+    cache.close()
+
+    engine.dispose()
+    await async_engine.dispose()
+    for replica in replica_set.engines:
+        await replica.dispose()
+
+
 app = FastAPI(
     title="ByteTech API",
     version=settings.VERSION,
-    docs_url="/docs" if settings.DEBUG else None  # Desactiva docs en producción
+    docs_url="/docs" if settings.DEBUG else None,  # Desactiva docs en producción
+    lifespan=lifespan
 )
 
 logger.info(f"ByteTech API starting - Version: {settings.VERSION}, Debug: {settings.DEBUG}")
@@ -31,6 +84,21 @@ app.add_middleware(
 
 app.add_middleware(TokenRefreshMiddleware)
 
+# Solo hace falta marcar escrituras si hay réplicas de lectura
+if settings.SUPABASE_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# -------- Exception Handlers --------
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    # Base de datos caída: fallar rápido en vez de acumular requests esperando
+    return JSONResponse(
+        status_code=503,
+        content={"message": "Database temporarily unavailable, please try again later."},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
 @app.get("/version")
 async def get_version():
     version = settings.VERSION
@@ -62,68 +130,3 @@ router_list = [
 
 for router in router_list:
     app.include_router(router, prefix="/api")
-
-
-# -------- Setup Database --------
-from app.database.base import Base
-from app.database.config import engine
-from app.database.session import reset_connection_pool
-from sqlalchemy.exc import OperationalError
-import time
-
-def initialize_database_with_retry(max_retries=3, delay=5.0):  # Reduced retries, longer delays
-    """Initialize database with retry logic for SSL connection issues"""
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"Attempting database initialization (attempt {attempt + 1}/{max_retries})")
-            
-            # Reset connection pool before attempting
-            if attempt > 0:
-                logger.info("Resetting connection pool before retry")
-                reset_connection_pool()
-                time.sleep(delay * attempt)  # Exponential backoff
-            
-            # Try to create tables
-            Base.metadata.create_all(bind=engine)
-            logger.info("Database initialization successful")
-            return True
-            
-        except OperationalError as e:
-            error_msg = str(e).lower()
-            if 'ssl connection has been closed' in error_msg or 'ssl' in error_msg:
-                logger.warning(f"SSL connection error on attempt {attempt + 1}: {e}")
-                if attempt < max_retries - 1:
-                    wait_time = delay * (attempt + 1)
-                    logger.info(f"⏳ Waiting {wait_time} seconds before retry (Supabase SSL protection active)...")
-                    logger.info(f"💡 Tip: This usually resolves in 15-30 minutes after stress testing")
-                    continue
-                else:
-                    logger.error("All database initialization attempts failed")
-                    raise e
-            else:
-                # Non-SSL error, don't retry
-                logger.error(f"Non-retryable database error: {e}")
-                raise e
-        except Exception as e:
-            logger.error(f"Unexpected database initialization error: {e}")
-            raise e
-    
-    return False
-
-# Initialize database with retry logic - with graceful degradation
-try:
-    logger.info("Starting database initialization with extended retry logic...")
-    initialize_database_with_retry()
-except Exception as e:
-    logger.error(f"Failed to initialize database after all retries: {e}")
-    logger.warning("⚠️  SUPABASE SSL PROTECTION ACTIVE - Starting in degraded mode")
-    logger.info("💡 App will start without DB initialization. Use /api/health/db/reset once Supabase recovers")
-    logger.info("🕐 Expected recovery time: 15-30 minutes after stress test")
-    
-    # Reset the engine to clean state for later use
-    try:
-        engine.dispose()
-        logger.info("Engine disposed - ready for later reconnection")
-    except Exception as dispose_error:
-        logger.warning(f"Could not dispose engine: {dispose_error}")
-
@@ -2,6 +2,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from app.parameters import settings
+import time
 
 # Middleware to refresh the access token
 class TokenRefreshMiddleware(BaseHTTPMiddleware):
@@ -28,4 +29,28 @@ class TokenRefreshMiddleware(BaseHTTPMiddleware):
             return JSONResponse(
                 status_code=http_exc.status_code,
                 content={"detail": http_exc.detail}
-            )
\ No newline at end of file
+            )
+
+# Middleware de read-your-writes para las réplicas de lectura
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """
+    Tras una escritura exitosa marca al cliente con una cookie de corta
+    duración; mientras dure, get_read_db lee del primario y no de una réplica
+    que quizá aún no tiene el cambio.
+    """
+    WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+
+        if request.method in self.WRITE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                key=settings.READ_YOUR_WRITES_COOKIE,
+                value=str(int(time.time()) + settings.READ_YOUR_WRITES_SECONDS),
+                httponly=settings.HTTPONLY,
+                secure=settings.SECURE,
+                samesite=settings.SAMESITE,
+                max_age=settings.READ_YOUR_WRITES_SECONDS
+            )
+
+        return response
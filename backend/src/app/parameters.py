@@ -74,6 +74,44 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_URL_TEST: str
 
+    # CONNECTION MODE
+    # "session": conexión directa (o pooler en modo sesión) con QueuePool propio
+    # "transaction": PgBouncer/Supavisor en modo transacción (puerto 6543 en Supabase)
+    DB_POOL_MODE: str = "session"
+    DB_POOLER_POOL_SIZE: int = 10           # Solo en modo transaction; 0 = NullPool (sin tope propio)
+
+    # READ REPLICAS
+    SUPABASE_REPLICA_URLS: list[str] = []   # Vacío = todas las lecturas van al primario
+    REPLICA_RETRY_SECONDS: int = 30         # Tiempo fuera de rotación tras un fallo
+    READ_YOUR_WRITES_SECONDS: int = 5       # Lecturas al primario tras una escritura del usuario
+    READ_YOUR_WRITES_COOKIE: str = "rw_until"
+
+    # CACHE SETTINGS
+    USER_CACHE_MAXSIZE: int = 10_000   # Perfiles de usuario en memoria por worker
+    USER_CACHE_TTL: int = 300          # 5 minutos
+    CATALOG_CACHE_TTL: int = 60        # Cota de desfase entre workers para /courses/mtd_courses
+    COURSE_CONTENT_CACHE_MAXSIZE: int = 500   # Esqueletos de /courses/course_content por worker
+    COURSE_CONTENT_CACHE_TTL: int = 300
+    ENTITLEMENT_CACHE_MAXSIZE: int = 10_000   # Cursos comprados por usuario, por worker
+    ENTITLEMENT_CACHE_TTL: int = 300
+
+    # SHARED CACHE
+    # "memory": por worker | "redis": CACHE_URL=redis://host:6379/0 | "sqlite": CACHE_URL=ruta del archivo
+    CACHE_BACKEND: str = "memory"
+    CACHE_URL: str = ""
+    CACHE_NAMESPACE: str = "bytetech"
+    CACHE_DEFAULT_TTL: int = 300
+    QUERY_CACHE_ENABLED: bool = True   # Cache de resultados de app/database/queries; solo con redis o sqlite (ver query_cache.py)
+    QUERY_CACHE_TTL: int = 300
+
+    # CIRCUIT BREAKER SETTINGS
+    DB_BREAKER_FAILURE_THRESHOLD: int = 5   # Fallos de conexión seguidos para abrir
+    DB_BREAKER_RESET_TIMEOUT: int = 30      # Segundos abierto antes de probar (half-open)
+
+    # THREAD OFFLOAD SETTINGS
+    DB_OFFLOAD_THREADS: int = 0        # 0 = pool_size + max_overflow del engine (ver utils/offload.py)
+    IO_OFFLOAD_THREADS: int = 10       # Storage, Stripe y bcrypt
+
     # RESEND API
     RESEND_API_KEY: str 
     SENDER_MAIL: str
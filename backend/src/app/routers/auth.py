@@ -22,8 +22,9 @@ from app.utils.signature import (
     verify_token
 )
 from app.parameters import settings
-from app.utils.util_routers import process_code
+from app.utils.util_routers import process_code, send_code_mail
 from app.database.queries.tokens import delete_expired_tokens
+from app.utils.offload import run_db, run_io
 
 auth_router = APIRouter(tags=["auth"], prefix="/auth")
 
@@ -97,15 +98,16 @@ async def init_register(
             - Error (400/500): Appropriate error message
     """
     # Check if the user already exists
-    existing_user = get_user_by_email(email=email, db=db)
+    existing_user = await run_db(get_user_by_email, email=email, db=db)
     if existing_user:
         return JSONResponse(status_code=400, content={"message": "User already exists"})
     
     # Hash the password before storing it
-    hashed_password = hash_password(password)
+    hashed_password = await run_io(hash_password, password)
 
     # Create the user in the database
-    response_create = create_user(
+    response_create = await run_db(
+        create_user,
         name=name,
         email=email,
         password=hashed_password,
@@ -117,11 +119,11 @@ async def init_register(
         return JSONResponse(status_code=500, content={"message": "Failed to create user"})
     
     # Process of create and send verification code
-    process_response = process_code(
+    process_response = await run_db(
+        process_code,
         db=db,
         user_id=response_create.id,
-        email=response_create.email,
-        username=response_create.username
+        email=response_create.email
     )
 
     if process_response["status"] == 500:
@@ -130,6 +132,14 @@ async def init_register(
             content=process_response["message"]
         )
 
+    # El envío es HTTP: fuera del pool de base de datos
+    await run_io(
+        send_code_mail,
+        email=response_create.email,
+        username=response_create.username,
+        value=process_response["value"]
+    )
+
     # return the created user information
     return JSONResponse(
         status_code=200,
@@ -220,14 +230,15 @@ async def verify_register(
     """
 
     # Get id of the user by email
-    user = get_user_by_email(email=email, db=db)
+    user = await run_db(get_user_by_email, email=email, db=db)
     if not user:
         return JSONResponse(status_code=404, content={"message": "User not found"})
     
     user_id = user["id"]
 
     # Verify the code
-    code_response = get_valid_code(
+    code_response = await run_db(
+        get_valid_code,
         db=db, 
         code=code,
         user_id=user_id
@@ -237,7 +248,8 @@ async def verify_register(
         return JSONResponse(status_code=400, content={"message": code_response["message"]})
     
     # Verify user
-    update_response = update_user(
+    update_response = await run_db(
+        update_user,
         db=db,
         user_id=user_id,
         verify=True
@@ -390,14 +402,15 @@ async def login(
         - access_token: JWT for authenticated requests (expires in 1h)
         - refresh_token: JWT for refreshing access token (expires in 7d)
     """
-    get_response = get_user_by_email(
+    get_response = await run_db(
+        get_user_by_email,
         email=email,
         db=db
     )
     if not get_response:
         return JSONResponse(status_code=404, content={"message": "User not found"})
     
-    verify_pswd_result = verify_password(password, get_response["password"])
+    verify_pswd_result = await run_io(verify_password, password, get_response["password"])
     if not verify_pswd_result:
         return JSONResponse(status_code=401, content={"message": "Invalid password"})
     
@@ -406,11 +419,11 @@ async def login(
     #  if the user is not verified, return a message
     if not get_response["is_verify"]:
         # Init process of verification
-        process_response = process_code(
+        process_response = await run_db(
+            process_code,
             db=db,
             user_id=get_response["id"],
-            email=get_response["email"],
-            username=get_response["name"]
+            email=get_response["email"]
         )
 
         if process_response["status"] == 500:
@@ -419,6 +432,13 @@ async def login(
                 content=process_response["message"]
         )
 
+        await run_io(
+            send_code_mail,
+            email=get_response["email"],
+            username=get_response["name"],
+            value=process_response["value"]
+        )
+
         return JSONResponse(
             status_code=428,
             content={
@@ -508,23 +528,31 @@ async def init_restore_password(
             - Error (404): User not found
             - Error (500): Failed to send code
     """
-    user = get_user_by_email(email=email, db=db)
+    user = await run_db(get_user_by_email, email=email, db=db)
     if not user:
         return JSONResponse(status_code=404, content={"message": "User not found"})
     
-    process_response = process_code(
+    process_response = await run_db(
+        process_code,
         db=db,
         user_id=user["id"],
         email=user["email"],
-        username=user["name"],
         is_restore=True
     )
 
     if process_response["status"] == 500:
         return JSONResponse(status_code=500, content=process_response["message"])
 
+    await run_io(
+        send_code_mail,
+        email=user["email"],
+        username=user["name"],
+        value=process_response["value"],
+        is_restore=True
+    )
+
     # Delete expired tokens
-    delete_expired_tokens(db=db)
+    await run_db(delete_expired_tokens, db=db)
 
     return JSONResponse(status_code=200, content={
         "message": "Verification URL sent to your email",
@@ -544,10 +572,11 @@ async def restore_password(
         user_id = payload["user_id"]
         
         # Hash the new password
-        hashed_password = hash_password(new_password)
+        hashed_password = await run_io(hash_password, new_password)
 
         # Update the user's password in the database
-        update_response = update_user(
+        update_response = await run_db(
+            update_user,
             db=db,
             user_id=user_id,
             password=hashed_password
@@ -574,7 +603,7 @@ async def get_users(db: Session = Depends(get_db)):
     Errors:
         404: No users found
     """
-    users = get_all_users(db=db)
+    users = await run_db(get_all_users, db=db)
     if not users:
         return JSONResponse(status_code=404, content={"message": "No users found"})
     
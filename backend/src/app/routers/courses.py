@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, status, Request, Form
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database.queries.courses import (
     get_all_courses, 
     get_course_by_id, 
@@ -10,14 +11,17 @@ from app.database.queries.courses import (
 )
 from app.database.queries.sections import get_sections_by_course_id
 from app.database.queries.preview import get_preview_files_by_course
-from app.database.queries.marks import update_mark_time
+from app.database.queries.marks import update_mark_time, get_marks_by_lessons, get_last_watched_by_course
+from app.database.queries.threads import get_unread_activity_by_course
 from app.utils.util_routers import include_threads
-from app.database.queries.progress import unmark_lesson_as_complete, get_course_progress, mark_lesson_as_complete
-from app.database.queries.lessons import get_lessons_by_section_id
-from app.database.queries.user import get_user_by_id
+from app.database.queries.progress import unmark_lesson_as_complete, mark_lesson_as_complete, get_completed_lesson_ids
+from app.database.queries.lessons import get_lessons_by_section_ids
+from app.database.queries.user import get_usernames_by_ids, get_user_loader
+from app.database.queries.catalog import catalog_cache, course_content_cache
 from fastapi.responses import JSONResponse
-from app.dependencies import get_cookies, get_cookies_optional, get_db
-from app.database.session import get_db_session, retry_db_operation
+from app.dependencies import get_cookies, get_cookies_optional, get_async_db
+from app.database.session import retry_db_operation
+from app.utils.offload import run_io
 from app.database.base import Course
 from app.parameters import settings
 import stripe
@@ -29,10 +33,262 @@ stripe.api_key = settings.STRIPE_API_KEY
 courses_router = APIRouter(tags=["courses"], prefix="/courses")
 
 
+def _build_course_skeleton(db: Session, course_id: int) -> dict | None:
+    """
+    Parte pública de /course_content, igual para cualquier usuario: datos del
+    curso, secciones con sus lecciones, hilos y preview. Se guarda en
+    course_content_cache y lo invalidan las escrituras de workbrench y foros.
+    """
+    course = get_course_by_id(course_id=course_id, db=db)
+    if not course:
+        return None
+    course_data = course["course_data"]
+
+    sensei_name = get_user_loader(db).load(course_data["sensei_id"])
+    course_data["sensei_name"] = sensei_name or "Unknown Sensei"
+    course_data["progress"] = None
+
+    sections = get_sections_by_course_id(course_id=course_id, db=db)
+    lessons_by_section = get_lessons_by_section_ids(db, [section["id"] for section in sections])
+
+    sections_data = {
+        position: {
+            "id": section["id"],
+            "title": section["title"],
+            "lessons": lessons_by_section[section["id"]]
+        }
+        for position, section in enumerate(sections, start=1)
+    }
+
+    # Adjuntar los hilos de todas las lecciones del curso en una sola consulta
+    include_threads(
+        lessons=[lesson for section in sections_data.values() for lesson in section["lessons"]],
+        db_session=db
+    )
+
+    course_data["content"] = sections_data
+
+    # Agregar preview
+    preview = get_preview_files_by_course(db, course_id)
+    course_data["preview"] = preview or None
+
+    return {"course_data": course_data}
+
+
+def _progress(lesson_ids: list[int], completed: set[int]) -> dict:
+    # Mismo cálculo que get_course_progress, con los datos ya cargados
+    total_lessons = len(lesson_ids)
+    completed_lessons = len(completed.intersection(lesson_ids))
+    progress_percentage = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
+    return {
+        "total_lessons": total_lessons,
+        "completed_lessons": completed_lessons,
+        "progress_percentage": round(progress_percentage, 2)
+    }
+
+
+def _course_lesson_ids(course_data: dict) -> list[int]:
+    return [
+        lesson["id"]
+        for section in course_data["content"].values()
+        for lesson in section["lessons"]
+    ]
+
+
+def _lessons_with_state(lessons: list[dict], completed: set[int], marks: dict[int, dict]) -> list[dict]:
+    return [
+        {
+            **lesson,
+            "is_completed": lesson["id"] in completed,
+            "mark_time": marks.get(lesson["id"], {"id": None, "time": 0})
+        }
+        for lesson in lessons
+    ]
+
+
+def _is_paid(db: Session, course_id: int, user_info: dict) -> bool:
+    return bool(user_info["is_sensei"]) or purchase_exists(user_id=user_info["user_id"], course_id=course_id, db=db)
+
+
+def _apply_user_overlay(db: Session, skeleton: dict, user_info: Optional[dict]) -> dict:
+    """
+    Combina el esqueleto cacheado con el estado del usuario (is_paid,
+    progress, is_completed, mark_time) sin modificar el esqueleto.
+    Con usuario autenticado son tres consultas sin importar el tamaño del curso.
+    """
+    course_data = dict(skeleton["course_data"])
+    if not user_info:
+        return {"is_paid": False, "course_content": course_data}
+
+    course_id = course_data["id"]
+    user_id = user_info["user_id"]
+    is_paid = _is_paid(db, course_id, user_info)
+
+    lesson_ids = _course_lesson_ids(course_data)
+    completed = get_completed_lesson_ids(db=db, user_id=user_id, course_id=course_id)
+    marks = get_marks_by_lessons(db=db, user_id=user_id, lesson_ids=lesson_ids)
+
+    course_data["progress"] = _progress(lesson_ids, completed)
+    course_data["content"] = {
+        position: {
+            **section,
+            "lessons": _lessons_with_state(section["lessons"], completed, marks)
+        }
+        for position, section in course_data["content"].items()
+    }
+    return {"is_paid": is_paid, "course_content": course_data}
+
+
+def _get_course_skeleton(
+        db: Session,
+        course_id: Optional[int] = None,
+        course_name: Optional[str] = None
+) -> dict | None:
+    """
+    Esqueleto público desde course_content_cache, construyéndolo si no está.
+    Retorna None si el curso no existe.
+    """
+    if course_name:
+        course_id = course_content_cache.resolve_name(course_name)
+        if course_id is None:
+            course = get_course_by_name(name=course_name, db=db)
+            if not course:
+                return None
+            course_id = course["course_data"]["id"]
+
+    skeleton = course_content_cache.get(course_id)
+    if skeleton is None:
+        version = course_content_cache.version(course_id)
+        skeleton = _build_course_skeleton(db, course_id)
+        if not skeleton:
+            return None
+        course_content_cache.set(course_id, skeleton, version)
+    return skeleton
+
+
+def _build_course_content(
+        db: Session,
+        course_id: Optional[int] = None,
+        course_name: Optional[str] = None,
+        user_info: Optional[dict] = None
+) -> dict | None:
+    """
+    Arma el contenido de /course_content con la Session síncrona que entrega
+    AsyncSession.run_sync: esqueleto público desde course_content_cache más
+    el estado del usuario. Retorna None si el curso no existe.
+    """
+    skeleton = _get_course_skeleton(db, course_id=course_id, course_name=course_name)
+    if not skeleton:
+        return None
+    return _apply_user_overlay(db, skeleton, user_info)
+
+
+def _build_course_outline(
+        db: Session,
+        course_id: Optional[int] = None,
+        course_name: Optional[str] = None,
+        user_info: Optional[dict] = None
+) -> dict | None:
+    """
+    Arma /course_skeleton: datos del curso y secciones con id y título de
+    cada lección, sin archivos, hilos ni marcas de tiempo. Con usuario
+    autenticado agrega is_paid, progress e is_completed (dos consultas).
+    """
+    skeleton = _get_course_skeleton(db, course_id=course_id, course_name=course_name)
+    if not skeleton:
+        return None
+
+    course_data = {key: value for key, value in skeleton["course_data"].items() if key != "content"}
+    completed = set()
+    is_paid = False
+    if user_info:
+        course_id = course_data["id"]
+        is_paid = _is_paid(db, course_id, user_info)
+        completed = get_completed_lesson_ids(db=db, user_id=user_info["user_id"], course_id=course_id)
+        course_data["progress"] = _progress(_course_lesson_ids(skeleton["course_data"]), completed)
+
+    course_data["sections"] = [
+        {
+            "position": position,
+            "id": section["id"],
+            "title": section["title"],
+            "lessons": [
+                {"id": lesson["id"], "title": lesson["title"], "is_completed": lesson["id"] in completed}
+                for lesson in section["lessons"]
+            ]
+        }
+        for position, section in skeleton["course_data"]["content"].items()
+    ]
+    return {"is_paid": is_paid, "course": course_data}
+
+
+def _build_course_section(
+        db: Session,
+        course_id: int,
+        section_id: int,
+        user_info: Optional[dict] = None
+) -> dict | None:
+    """
+    Arma /course_section: una sección con el mismo detalle de lecciones que
+    /course_content (archivos, hilos, is_completed, mark_time). Las marcas
+    faltantes se crean solo para las lecciones de esta sección.
+    Retorna None si el curso o la sección no existen.
+    """
+    skeleton = _get_course_skeleton(db, course_id=course_id)
+    if not skeleton:
+        return None
+
+    position, section = next(
+        ((position, section) for position, section in skeleton["course_data"]["content"].items()
+         if section["id"] == section_id),
+        (None, None)
+    )
+    if section is None:
+        return None
+
+    section = {**section, "position": position}
+    if not user_info:
+        return {"is_paid": False, "section": section}
+
+    lesson_ids = [lesson["id"] for lesson in section["lessons"]]
+    completed = get_completed_lesson_ids(db=db, user_id=user_info["user_id"], course_id=course_id)
+    marks = get_marks_by_lessons(db=db, user_id=user_info["user_id"], lesson_ids=lesson_ids)
+    section["lessons"] = _lessons_with_state(section["lessons"], completed, marks)
+    return {"is_paid": _is_paid(db, course_id, user_info), "section": section}
+
+
+def _build_dashboard(db: Session, user_id: int) -> dict:
+    """
+    Arma /dashboard con tres consultas fijas, sin importar cuántos cursos
+    tenga el usuario: cursos comprados con progreso, última lección vista
+    por curso y actividad sin leer del foro.
+    """
+    courses = get_purchased_courses_by_user(db, user_id)
+    course_ids = [course["id"] for course in courses]
+    last_watched = get_last_watched_by_course(db, user_id, course_ids)
+    forum = get_unread_activity_by_course(db, user_id, course_ids)
+
+    for course in courses:
+        course["last_watched"] = last_watched.get(course["id"])
+        course["forum"] = forum.get(course["id"], {"unread_messages": 0, "threads": []})
+
+    # Para el botón "continuar": la lección vista más recientemente entre todos los cursos
+    resume = max(
+        ({"course_id": course_id, **lesson} for course_id, lesson in last_watched.items()),
+        key=lambda lesson: lesson["updated_at"],
+        default=None
+    )
+    return {
+        "courses": courses,
+        "resume": resume,
+        "unread_messages": sum(activity["unread_messages"] for activity in forum.values())
+    }
+
+
 @courses_router.get("/mtd_courses")
 @retry_db_operation(max_retries=3, delay=0.5)
 async def get_mtd_courses(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene todos los cursos disponibles con información del sensei
@@ -46,20 +302,24 @@ async def get_mtd_courses(
     
     Notas:
         - Si no hay cursos, retorna lista vacía
+        - El resultado sale de catalog_cache mientras no haya escrituras
+        - Se construye desde el primario: una réplica atrasada dejaría en
+          catalog_cache (y en el query cache) un catálogo viejo hasta la próxima escritura
     """
-    mtd_courses_response = get_all_courses(db=db)
-    if not mtd_courses_response:
-        return {"mtd_courses": []}
-    
-    mtd_courses = []
-    for course in mtd_courses_response:
-        user_id = course["sensei_id"]
-        sensei = get_user_by_id(user_id=user_id, db=db)
-        if sensei:
-            course["sensei_name"] = sensei.username
-        else:
-            course["sensei_name"] = "Unknown Sensei"
-        mtd_courses.append(course)
+    async def build_catalog() -> list[dict]:
+        mtd_courses_response = await db.run_sync(get_all_courses)
+        if not mtd_courses_response:
+            return []
+
+        usernames = await db.run_sync(get_usernames_by_ids, {course["sensei_id"] for course in mtd_courses_response})
+        mtd_courses = []
+        for course in mtd_courses_response:
+            course["sensei_name"] = usernames.get(course["sensei_id"]) or "Unknown Sensei"
+            mtd_courses.append(course)
+        return mtd_courses
+
+    # Catálogo cacheado por worker; lo invalidan las escrituras de workbrench
+    mtd_courses = await catalog_cache.get_or_build(build_catalog)
 
     return JSONResponse(
         content={"mtd_courses": mtd_courses},
@@ -73,7 +333,7 @@ async def get_course_content(
     course_name: Optional[str] = None,
     course_id: Optional[int] = None, 
     user_info: Optional[dict] = Depends(get_cookies_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene el contenido completo de un curso específico
@@ -100,85 +360,107 @@ async def get_course_content(
         - Este endpoint permite acceso sin autenticación para vista previa
         - Si no hay autenticación, is_paid será false y progress será null
     """
-    if course_name:
-        course = get_course_by_name(name=course_name, db=db)
-    else:
-        course = get_course_by_id(course_id=course_id, db=db)
-    if not course:
+    # Todas las consultas del contenido en un solo run_sync sobre asyncpg
+    content = await db.run_sync(
+        _build_course_content,
+        course_id=course_id,
+        course_name=course_name,
+        user_info=user_info
+    )
+    if not content:
         return JSONResponse(status_code=404, content={"message": "Course not found"})
-    
-    is_paid = False
-    print(user_info)
 
-    # Solo verificar si el usuario está autenticado
-    if user_info:
-        if user_info["is_sensei"]:
-            is_paid = True
-        else:
-            exist_response = purchase_exists(user_id=user_info["user_id"], course_id=course_id, db=db)
-            if exist_response:
-                is_paid = True
+    return JSONResponse(
+        content=content,
+        status_code=200
+    )
 
+
+@courses_router.get("/course_skeleton")
+@retry_db_operation(max_retries=3, delay=0.5)
+async def get_course_skeleton(
+    course_name: Optional[str] = None,
+    course_id: Optional[int] = None,
+    user_info: Optional[dict] = Depends(get_cookies_optional),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtiene la estructura liviana de un curso para el primer render
     
-    course_data = course["course_data"]
-    sensei_name = get_user_by_id(user_id=course_data["sensei_id"], db=db)
-    course_data["sensei_name"] = sensei_name.username if sensei_name else "Unknown Sensei"
+    Entry:
+        course_id: int (query parameter)
+        course_name: str (query parameter, opcional)
+        user_info: dict (obtenido de cookies JWT, opcional)
     
-    # Añadir progreso del curso solo si el usuario está autenticado
-    if user_info:
-        progress = get_course_progress(
-            db=db, 
-            user_id=user_info["user_id"], 
-            course_id=course_id
-            )
-        course_data["progress"] = progress
-    else:
-        course_data["progress"] = None
-
-    sections = get_sections_by_course_id(course_id=course_id, db=db)
-
-    sections_data = {}
-    count = 0
-    for section in sections:
-        id = section["id"]
-        # Solo obtener lecciones con información de usuario si está autenticado
-        if user_info:
-            lessons = get_lessons_by_section_id(
-                sections_id=[id], 
-                db=db,
-                user_id=user_info["user_id"])
-        else:
-            lessons = get_lessons_by_section_id(
-                sections_id=[id], 
-                db=db,
-                user_id=None)
-        lessons_with_threads = include_threads(lessons=lessons, db_session=db)
-        section_info = {
-            "id": id,
-            "title": section["title"],
-            "lessons": lessons_with_threads
-        }
-        sections_data[count + 1] = section_info
-        count += 1
+    Return:
+        status_code: 200 o 404
+        content: json con:
+            - is_paid: bool (false si no está autenticado)
+            - course: datos del curso, preview, progress (null si no está
+              autenticado) y sections: lista con position, id, title y
+              lessons (id, title, is_completed)
+    
+    Errors:
+        404: Curso no encontrado
+        
+    Notas:
+        - El detalle de cada sección se pide aparte con /course_section
+    """
+    content = await db.run_sync(
+        _build_course_outline,
+        course_id=course_id,
+        course_name=course_name,
+        user_info=user_info
+    )
+    if not content:
+        return JSONResponse(status_code=404, content={"message": "Course not found"})
 
-    course_data["content"] = sections_data
-    print("Contenido del curso:", course_data)
+    return JSONResponse(content=content, status_code=200)
 
-    # Agregar preview
-    preview = get_preview_files_by_course(db, course_id)
-    course_data["preview"] = preview or None
 
-    return JSONResponse(
-        content={"is_paid": is_paid, "course_content": course_data},
-        status_code=200
+@courses_router.get("/course_section")
+@retry_db_operation(max_retries=3, delay=0.5)
+async def get_course_section(
+    course_id: int,
+    section_id: int,
+    user_info: Optional[dict] = Depends(get_cookies_optional),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtiene el detalle de una sección de un curso
+    
+    Entry:
+        course_id: int (query parameter)
+        section_id: int (query parameter)
+        user_info: dict (obtenido de cookies JWT, opcional)
+    
+    Return:
+        status_code: 200 o 404
+        content: json con:
+            - is_paid: bool (false si no está autenticado)
+            - section: position, id, title y lessons con el mismo formato
+              que /course_content (archivo, hilos, is_completed, mark_time)
+    
+    Errors:
+        404: Curso o sección no encontrados
+    """
+    content = await db.run_sync(
+        _build_course_section,
+        course_id=course_id,
+        section_id=section_id,
+        user_info=user_info
     )
+    if not content:
+        return JSONResponse(status_code=404, content={"message": "Section not found"})
+
+    return JSONResponse(content=content, status_code=200)
 
 
 @courses_router.get("/my_courses")
 @retry_db_operation(max_retries=3, delay=0.5)
 async def my_courses(
     user_info: dict = Depends(get_cookies),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene los cursos del usuario actual
@@ -197,13 +479,9 @@ async def my_courses(
     """
     is_sensei = bool(user_info["is_sensei"])
     if is_sensei:
-        print("Buscando cursos subidos por el sensei:", user_info)
-        courses = get_courses_by_user(user_id=user_info["user_id"], db=db)
-        print("Cusros del sensei:", courses)
+        courses = await db.run_sync(get_courses_by_user, user_id=user_info["user_id"])
     else:
-        print(f"Buscando cursos comprados para: {user_info}")
-        courses = get_purchased_courses_by_user(user_id=user_info["user_id"], db=db)
-        print("Cusros del estudiante:", courses)
+        courses = await db.run_sync(get_purchased_courses_by_user, user_id=user_info["user_id"])
     
     response = {
         "is_sensei": is_sensei,
@@ -212,11 +490,42 @@ async def my_courses(
     return JSONResponse(content=response, status_code=200)
 
 
+@courses_router.get("/dashboard")
+@retry_db_operation(max_retries=3, delay=0.5)
+async def dashboard(
+    user_info: dict = Depends(get_cookies),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Dashboard del estudiante en una sola request
+    
+    Entry:
+        user_info: dict (obtenido de cookies JWT)
+    
+    Return:
+        status_code: 200
+        content: json con:
+            - courses: cursos comprados, cada uno con:
+                - datos del curso, sensei_name, lessons_count y progress
+                - last_watched: última lección vista y posición (mark_id, mark_time), o null
+                - forum: unread_messages y hilos con mensajes nuevos
+            - resume: última lección vista entre todos los cursos (con course_id), o null
+            - unread_messages: total de mensajes sin leer del foro
+    
+    Notas:
+        - Reemplaza my_courses + course_content por curso + mtd_threads
+        - "Sin leer": mensajes de otros usuarios posteriores a la última
+          participación del usuario en el hilo (lo abrió o escribió en él)
+    """
+    content = await db.run_sync(_build_dashboard, user_id=user_info["user_id"])
+    return JSONResponse(content=content, status_code=200)
+
+
 @courses_router.post("/buy_course")
 async def buy_course(
     course_id: int, 
     user_info: dict = Depends(get_cookies),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Inicia el proceso de compra de un curso mediante Stripe
@@ -240,15 +549,13 @@ async def buy_course(
         409: Usuario ya posee el curso
         500: Error en Stripe Checkout
     """
-    get_response = get_purchased_courses_by_user(user_id=user_info["user_id"], db=db)
-    # get_response es una lista de diccionarios de cursos; validar por id
-    if any(c.get("id") == course_id for c in get_response):
+    if await db.run_sync(purchase_exists, user_id=user_info["user_id"], course_id=course_id):
         return JSONResponse(
             content="Ya posees este curso",
             status_code=status.HTTP_409_CONFLICT
         )
 
-    course = db.query(Course).filter_by(id=course_id).first()
+    course = await db.get(Course, course_id)
     if not course:
         return JSONResponse(
             content="Curso no encontrado",
@@ -260,7 +567,8 @@ async def buy_course(
         success_url = f"{settings.FRONTEND_URL}/success?session_id={{CHECKOUT_SESSION_ID}}"
         cancel_url = f"{settings.FRONTEND_URL}/cancel"
 
-        session = stripe.checkout.Session.create(
+        session = await run_io(
+            stripe.checkout.Session.create,
             payment_method_types=["card"],
             line_items=[{
                 "price_data": {
@@ -293,7 +601,7 @@ async def buy_course(
 @courses_router.post("/webhook")
 async def stripe_webhook(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Webhook para recibir eventos de Stripe (pagos completados)
@@ -324,8 +632,8 @@ async def stripe_webhook(
             user_id = int(session["metadata"]["user_id"])
             course_id = int(session["metadata"]["course_id"])
 
-            save_purchase(
-                db=db,
+            await db.run_sync(
+                save_purchase,
                 user_id=user_id, 
                 course_id=course_id
                 )
@@ -340,26 +648,26 @@ async def stripe_webhook(
 async def mark_progress(
     lesson_id: int = Form(),
     user_info: dict = Depends(get_cookies),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    response = mark_lesson_as_complete(
-        db=db,
+    response = await db.run_sync(
+        mark_lesson_as_complete,
         user_id=user_info["user_id"],
         lesson_id=lesson_id
     )
     
-    if not response:
+    if response is None:
         return JSONResponse(status_code=404, content={"message": "Lesson not found"})
     
-    # ✅ Esta línea debe estar al mismo nivel que el 'if', no indentada dentro
-    return JSONResponse(status_code=200, content={"message": "Lesson progress marked successfully"})
+    # Idempotente: marcar dos veces la misma lección no duplica el progreso
+    return JSONResponse(status_code=200, content={"message": "Lesson progress marked successfully", "created": response})
 
 
 @courses_router.delete("/unmark_progress")
 async def unmark_progress(
     lesson_id: int,
     user_info: dict = Depends(get_cookies),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Elimina el progreso de una leccion para el usuario actual
@@ -377,8 +685,8 @@ async def unmark_progress(
     Notas:
         - Elimina el progreso del curso para el usuario actual
     """
-    response = unmark_lesson_as_complete(
-        db=db, 
+    response = await db.run_sync(
+        unmark_lesson_as_complete,
         user_id=user_info["user_id"], 
         lesson_id=lesson_id
     )
@@ -394,10 +702,10 @@ async def mark_time(
     mark_id: int = Form(),
     mark_time: int = Form(),
     user_info: dict = Depends(get_cookies),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    response = update_mark_time(
-        db=db,
+    response = await db.run_sync(
+        update_mark_time,
         mark_id=mark_id,
         new_time=mark_time
     )
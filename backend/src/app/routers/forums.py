@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.dependencies import get_cookies, get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import get_cookies, get_async_db, get_read_db
 from fastapi.responses import JSONResponse
 from app.database.queries.threads import get_threads_by_lesson_id, create_thread, delete_thread_by_id
 from app.database.queries.messages import create_message, get_messages_by_thread_id
-from app.database.queries.user import get_user_by_id
+from app.database.queries.user import get_user_loader
 from app.models import Message, Thread
-from datetime import datetime, timezone
+from app.utils.util_database import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
 
 forums_router = APIRouter(tags=["forums"], prefix="/forums")
 
@@ -15,7 +16,7 @@ forums_router = APIRouter(tags=["forums"], prefix="/forums")
 async def create_new_thread(
     thread: Thread,
     user_info: dict = Depends(get_cookies),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Crea un nuevo hilo de discusión en un foro de lección
@@ -35,30 +36,26 @@ async def create_new_thread(
     Errors:
         400: Error al crear el hilo
     """
-    new_thread_response = create_thread(
+    new_thread_response = await db.run_sync(
+        create_thread,
         lesson_id=thread.lesson_id,
         user_id=user_info["user_id"],
         topic=thread.topic,
-        description=thread.description,
-        db=db
+        description=thread.description
     )
     
     if not new_thread_response:
         return JSONResponse(status_code=400, content={"message": "Error creating thread"})
-    from icecream import ic
 
     message = thread.message
 
     if message:
-        current_date = datetime.now(timezone.utc)
-        formatted_date = current_date.strftime("%Y-%m-%d %H:%M:%S")
-        # Agregar el mensaje inicial al hilo
-        create_response = create_message(
+        # Agregar el mensaje inicial al hilo (created_at lo pone el default de la columna)
+        create_response = await db.run_sync(
+            create_message,
             thread_id=new_thread_response.id,
             user_id=user_info["user_id"],
-            message=thread.message,
-            date_created=formatted_date,
-            db=db
+            message=thread.message
         )
 
     new_thread = {
@@ -73,7 +70,7 @@ async def create_new_thread(
 async def delete_thread(
     thread_id: int, 
     user_info: dict = Depends(get_cookies),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Elimina un hilo de discusión por su ID
@@ -93,9 +90,9 @@ async def delete_thread(
     if not is_sensei:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    deleted = delete_thread_by_id(
-        thread_id=thread_id,
-        db=db
+    deleted = await db.run_sync(
+        delete_thread_by_id,
+        thread_id=thread_id
     )
 
     if not deleted:
@@ -107,46 +104,62 @@ async def delete_thread(
 @forums_router.get("/mtd_threads")
 async def mtd_threads(
     lesson_id: int, 
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     user_info: dict = Depends(get_cookies),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Obtiene todos los hilos de discusión de una lección específica
+    Obtiene los hilos de discusión de una lección específica, paginados
     
     Entry:
         lesson_id: int (ID de la lección)
+        limit: int (tamaño de página, máximo MAX_PAGE_SIZE)
+        before: str (cursor, opcional - página anterior a ese hilo)
+        after: str (cursor, opcional - solo hilos nuevos desde ese cursor)
         user_info: dict (obtenido de cookies JWT)
     
     Return:
-        status_code: 200 o 404
+        status_code: 200 o 400
         content: json con:
-            - threads: lista de hilos
+            - threads: lista de hilos (orden cronológico)
+            - has_more: bool
+            - before_cursor / after_cursor: cursores para paginar / consultar novedades
             - lesson_id: ID de la lección
             - user_id: ID del usuario
     
     Errors:
-        404: No se encontraron hilos para esta lección
+        400: Cursor inválido
     """
-    threads = get_threads_by_lesson_id(
-        lesson_id=lesson_id,
-        db=db
-    )
+    # Encolar al usuario actual para resolverlo junto a los autores de los hilos
+    user_loader = await db.run_sync(get_user_loader)
+    user_loader.prime([user_info["user_id"]])
 
-    user = get_user_by_id(db, user_info["user_id"])
-    
-    if user:
-        name = user.username
+    try:
+        page = await db.run_sync(
+            get_threads_by_lesson_id,
+            lesson_id=lesson_id,
+            limit=limit,
+            before=before,
+            after=after
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+
+    # load() solo consulta si el usuario no quedó resuelto con los hilos
+    name = await db.run_sync(lambda _: user_loader.load(user_info["user_id"]))
         
     content_body = {   
-            "threads": threads,
+            "threads": page["items"],
+            "has_more": page["has_more"],
+            "before_cursor": page["before_cursor"],
+            "after_cursor": page["after_cursor"],
             "lesson_id": lesson_id,
             "user_id": user_info["user_id"],
             "username": name
         }
 
-    from icecream import ic
-    ic(content_body)
-
     return JSONResponse(
         status_code=200,
         content=content_body
@@ -157,7 +170,7 @@ async def mtd_threads(
 async def send_message(
     msg: Message,
     user_info: dict = Depends(get_cookies),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Envía un mensaje en un hilo de discusión específico
@@ -187,16 +200,11 @@ async def send_message(
         return JSONResponse(status_code=400, content={"message": "Message and thread ID are required"})
     
 
-    
-    current_date = datetime.now(timezone.utc)
-    formatted_date = current_date.strftime("%Y-%m-%d %H:%M:%S")
-
-    create_response = create_message(
+    create_response = await db.run_sync(
+        create_message,
         thread_id=thread_id,
         user_id=user_id,
-        message=message,
-        date_created=formatted_date,
-        db=db
+        message=message
     )
 
     return JSONResponse(
@@ -214,36 +222,52 @@ async def send_message(
 @forums_router.get("/messages_thread")
 async def messages_thread(
     thread_id: int, 
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     user_info: dict = Depends(get_cookies),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Obtiene todos los mensajes de un hilo de discusión específico
+    Obtiene los mensajes de un hilo de discusión específico, paginados
     
     Entry:
         thread_id: int (ID del hilo)
+        limit: int (tamaño de página, máximo MAX_PAGE_SIZE)
+        before: str (cursor, opcional - mensajes anteriores a ese cursor)
+        after: str (cursor, opcional - solo mensajes nuevos, para polling)
         user_info: dict (obtenido de cookies JWT)
     
     Return:
-        status_code: 200 o 404
+        status_code: 200 o 400
         content: json con:
-            - messages: lista de mensajes
+            - messages: lista de mensajes (orden cronológico)
+            - has_more: bool
+            - before_cursor / after_cursor: cursores para paginar / consultar novedades
             - thread_id: ID del hilo
             - user_id: ID del usuario
     
     Errors:
-        404: No se encontraron mensajes en el hilo
+        400: Cursor inválido
     """
-    messages = get_messages_by_thread_id(
-        thread_id=thread_id,
-        db=db
-    )
-    
+    try:
+        page = await db.run_sync(
+            get_messages_by_thread_id,
+            thread_id=thread_id,
+            limit=limit,
+            before=before,
+            after=after
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
         
     return JSONResponse(
         status_code=200, 
         content={
-            "messages": messages, 
+            "messages": page["items"], 
+            "has_more": page["has_more"],
+            "before_cursor": page["before_cursor"],
+            "after_cursor": page["after_cursor"],
             "thread_id": thread_id,
             "user_id": user_info["user_id"]
         }
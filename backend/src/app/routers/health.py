@@ -4,7 +4,14 @@ Health check router with database connection monitoring
 
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
-from app.database.session import health_check, reset_connection_pool
+from app.database.session import health_check, reset_connection_pool, db_breaker
+from app.database.async_config import replica_set
+from app.database.queries.user import get_user_cache_stats
+from app.database.queries.catalog import get_catalog_cache_stats, get_course_content_cache_stats
+from app.utils.cache import cache
+from app.database.query_cache import get_query_cache_stats
+from app.database.queries.courses import get_entitlement_cache_stats
+from app.utils.offload import get_offload_stats, run_db
 from app.parameters import settings
 import logging
 
@@ -32,14 +39,16 @@ async def database_health():
     Database connection health check
     """
     try:
-        is_healthy = health_check()
+        is_healthy = await run_db(health_check)
         
         if is_healthy:
             return JSONResponse(
                 content={
                     "status": "healthy",
                     "database": "connected",
-                    "message": "Database connection is working properly"
+                    "message": "Database connection is working properly",
+                    "circuit_breaker": db_breaker.stats(),
+                    "replicas": replica_set.stats()
                 },
                 status_code=200
             )
@@ -49,7 +58,9 @@ async def database_health():
                 content={
                     "status": "unhealthy",
                     "database": "disconnected",
-                    "message": "Database connection failed"
+                    "message": "Database connection failed",
+                    "circuit_breaker": db_breaker.stats(),
+                    "replicas": replica_set.stats()
                 },
                 status_code=503
             )
@@ -60,11 +71,39 @@ async def database_health():
             content={
                 "status": "error",
                 "database": "error",
-                "message": f"Database health check failed: {str(e)}"
+                "message": f"Database health check failed: {str(e)}",
+                "circuit_breaker": db_breaker.stats()
             },
             status_code=503
         )
 
+@health_router.get("/cache")
+async def cache_status():
+    """
+    Cache metrics: in-process caches and the shared backend
+    """
+    return JSONResponse(
+        content={
+            "user_profiles": get_user_cache_stats(),
+            "catalog": get_catalog_cache_stats(),
+            "course_content": get_course_content_cache_stats(),
+            "entitlements": get_entitlement_cache_stats(),
+            "shared": cache.stats(),
+            "queries": get_query_cache_stats()
+        },
+        status_code=200
+    )
+
+@health_router.get("/offload")
+async def offload_status():
+    """
+    Thread offload metrics: queue depth and wait time per pool
+    """
+    return JSONResponse(
+        content=get_offload_stats(),
+        status_code=200
+    )
+
 @health_router.post("/db/reset")
 async def reset_database_pool():
     """
@@ -74,7 +113,7 @@ async def reset_database_pool():
         reset_connection_pool()
         
         # Verify the reset worked
-        is_healthy = health_check()
+        is_healthy = await run_db(health_check)
         
         if is_healthy:
             return JSONResponse(
@@ -109,31 +148,31 @@ async def reset_database_pool():
 @health_router.post("/db/reinitialize")
 async def reinitialize_database():
     """
-    Attempt to reinitialize database tables - useful after Supabase SSL protection recovery
+    Reset the pool and report the schema version - useful after Supabase SSL protection recovery.
+    Migrations are not applied here: they run as a one-shot step (python -m app.database.migrate).
     """
     try:
-        from app.database.base import Base
-        from app.database.config import engine
+        from app.database.migrate import check_schema_version
         from sqlalchemy.exc import OperationalError
         
         logger.info("Attempting manual database reinitialization...")
         
         # First reset the connection pool
-        reset_connection_pool()
-        
-        # Try to recreate tables
-        Base.metadata.create_all(bind=engine)
+        await run_db(reset_connection_pool)
         
         # Verify it worked
-        is_healthy = health_check()
+        is_healthy = await run_db(health_check)
         
         if is_healthy:
+            schema = await run_db(check_schema_version)
             return JSONResponse(
                 content={
                     "status": "success",
                     "message": "Database reinitialized successfully",
                     "database": "connected",
-                    "action": "Tables created and connection verified"
+                    "schema": schema,
+                    "action": "Connection verified" if schema["up_to_date"]
+                        else "Connection verified; pending migrations, run python -m app.database.migrate"
                 },
                 status_code=200
             )
@@ -141,7 +180,7 @@ async def reinitialize_database():
             return JSONResponse(
                 content={
                     "status": "partial_success",
-                    "message": "Tables created but health check still failing",
+                    "message": "Connection pool reset but health check still failing",
                     "database": "unstable",
                     "tip": "Try again in a few minutes if Supabase is still recovering"
                 },
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
-from app.database.queries.stats import get_stats
+from sqlalchemy.orm import Session
+from app.database.queries.stats import get_stats, get_sales_timeseries
 from app.database.queries.lessons import get_total_lessons_by_course
 from app.dependencies import get_db
+from datetime import date
+from typing import Optional
 
 stats_router = APIRouter(tags=["stats"])
 
@@ -41,4 +44,31 @@ async def stats(
     
     return JSONResponse(
         content=sales,
-        status_code=200)
\ No newline at end of file
+        status_code=200)
+
+
+@stats_router.get("/stats/timeseries")
+async def stats_timeseries(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    course_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Ventas e ingresos por día y curso (lee solo el rollup sales_daily).
+
+    Entry:
+        start: date (opcional, YYYY-MM-DD)
+        end: date (opcional, YYYY-MM-DD)
+        course_id: int (opcional)
+    """
+    series = get_sales_timeseries(
+        db=db,
+        start=start,
+        end=end,
+        course_id=course_id
+    )
+
+    return JSONResponse(
+        content={"series": series},
+        status_code=200)
@@ -11,6 +11,7 @@ from app.models import Course, GiveCourseRequest
 from app.dependencies import get_cookies, get_db
 from app.utils.storage import save_file, get_unique_name, delete_file
 from app.utils.util_routers import get_video_duration_minutes, mkv_to_mp4_bytes
+from app.utils.offload import run_db, run_io
 from app.database.queries.preview import add_preview_file, get_preview_files_by_course, update_preview_file_by_course
 from pathlib import Path
 from fastapi.responses import JSONResponse
@@ -23,8 +24,7 @@ from app.database.queries.courses import (
     delete_course, 
     update_course, 
     get_course_by_id,
-    save_purchase,
-    get_purchased_courses_by_user
+    save_purchase
 )
 from app.database.queries.lessons import (
     create_lesson, 
@@ -95,7 +95,8 @@ async def create_course(
     file_id = get_unique_name(extension=file_extension)
 
     file_content = await file.read()
-    save_file(
+    await run_io(
+        save_file,
         content=file_content,
         name=file_id
     )
@@ -110,7 +111,7 @@ async def create_course(
         "miniature_id" : file_id
     }
     
-    course = add_course(db, course_data)
+    course = await run_db(add_course, db, course_data)
 
     course_mtd = {
         "course_id" : course.id,
@@ -162,21 +163,22 @@ async def del_course(
     is_sensei = user_info.get("is_sensei")
     if not is_sensei:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    course = get_course_by_id(db, course_id)
+    course = await run_db(get_course_by_id, db, course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
 
-    files_ids = get_all_drive_ids(course=course["object"])
-    delete_drive_files(file_ids=files_ids)
+    # get_all_drive_ids recorre course.lessons (lazy load), va en el pool de db
+    files_ids = await run_db(get_all_drive_ids, course=course["object"])
+    await run_io(delete_drive_files, file_ids=files_ids)
 
-    success = delete_course(db, course_id)
+    success = await run_db(delete_course, db, course_id)
     if not success:
         raise HTTPException(status_code=500, detail="Error deleting course")
 
     # Borrar video de preview
     preview = course["preview"]
     if preview:
-        delete_file(preview["file_id"])
+        await run_io(delete_file, preview["file_id"])
 
     return JSONResponse(
         content={
@@ -219,7 +221,8 @@ async def create_section(
     if not is_sensei:
         raise HTTPException(status_code=401, detail="Unauthorized")
         
-    new_section_response = add_section(
+    new_section_response = await run_db(
+        add_section,
         db=db, 
         section_data={
             "course_id": course_id,
@@ -271,10 +274,10 @@ async def delete_section(
     is_sensei = user_info.get("is_sensei")
     if not is_sensei:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    file_ids = get_file_ids_by_section_id(db, section_id)
-    delete_drive_files(file_ids=file_ids)
+    file_ids = await run_db(get_file_ids_by_section_id, db, section_id)
+    await run_io(delete_drive_files, file_ids=file_ids)
 
-    delete_section_response = delete_section_by_id(db, section_id)
+    delete_section_response = await run_db(delete_section_by_id, db, section_id)
 
 
     response = {
@@ -347,7 +350,8 @@ async def new_lesson(
         file_id = get_unique_name(extension=file_extension)
 
         # Guardar en almacenamiento (MP4 si fue convertido)
-        save_file(
+        await run_io(
+            save_file,
             content=contents,
             name=file_id
         )
@@ -358,7 +362,8 @@ async def new_lesson(
         else:
             duration = 0
 
-        create_response = create_lesson(
+        create_response = await run_db(
+            create_lesson,
             db=db, 
             section_id=section_id, 
             title=title, 
@@ -417,8 +422,8 @@ async def delete_lesson(
     if not is_sensei:
         raise HTTPException(status_code=401, detail="Unauthorized")
         
-    delete_file(name=file_id)
-    delete_lesson_by_id(db, lesson_id)
+    await run_io(delete_file, name=file_id)
+    await run_db(delete_lesson_by_id, db, lesson_id)
     return JSONResponse(content="Lesson deleted successfully!", status_code=200)
 
 
@@ -455,7 +460,7 @@ async def edit_metadata(
     if not mtd.course_id:
         raise HTTPException(status_code=400, detail="Course ID is required")
 
-    updated = update_course(db, mtd.course_id, mtd.model_dump(exclude_unset=True, exclude={"id"}))
+    updated = await run_db(update_course, db, mtd.course_id, mtd.model_dump(exclude_unset=True, exclude={"id"}))
 
     if not updated:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -485,22 +490,19 @@ async def give_course(
     if not is_sensei:
         raise HTTPException(status_code=403, detail="User is not a sensei")
     
-    user_to_give = get_user_by_email(db, payload.user_email_to_give)
+    user_to_give = await run_db(get_user_by_email, db, payload.user_email_to_give)
     if not user_to_give:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Validar contra los cursos del destinatario, no del sensei autenticado
+    # El upsert sobre (user_id, course_id) indica si el destinatario ya tenía el curso
     recipient_id = user_to_give["id"]
-    purchased = get_purchased_courses_by_user(user_id=recipient_id, db=db) or []
-    # Algunos listados pueden usar 'id' o 'course_id' como llave
-    if any((c.get("id") == payload.course_id) or (c.get("course_id") == payload.course_id) for c in purchased):
+    created = await run_db(save_purchase, db, recipient_id, payload.course_id)
+    if not created:
         return JSONResponse(
             content={"message": "Ya posee este curso"},
             status_code=status.HTTP_409_CONFLICT
         )
 
-    save_response = save_purchase(db, recipient_id, payload.course_id)
-
     return JSONResponse(
         content={"message": f"El curso con el ID {payload.course_id} fue transferido correctamente"},
         status_code=200
@@ -537,20 +539,21 @@ async def upload_preview(
 
     file_id = get_unique_name(extension=file_extension)
 
-    save_file(
+    await run_io(
+        save_file,
         content=file_content,
         name=file_id
     )
 
-    file_preview = get_preview_files_by_course(db, course_id)
+    file_preview = await run_db(get_preview_files_by_course, db, course_id)
     
     if file_preview:
         print("File already exists, updating...")
-        delete_file(file_preview["file_id"])
-        response = update_preview_file_by_course(db, course_id, file_id)
+        await run_io(delete_file, file_preview["file_id"])
+        response = await run_db(update_preview_file_by_course, db, course_id, file_id)
     else:
         print("File does not exist, adding...") 
-        response = add_preview_file(db, course_id, file_id)
+        response = await run_db(add_preview_file, db, course_id, file_id)
     
 
     return JSONResponse(content=response, status_code=200)
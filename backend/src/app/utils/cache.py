@@ -0,0 +1,582 @@
+"""
+Cache compartido entre workers con invalidación por pub/sub.
+
+Backends (settings.CACHE_BACKEND):
+- memory: en proceso (por defecto). Cada worker tiene su copia y los
+  mensajes de invalidación solo llegan al propio worker.
+- redis: cualquier servidor con protocolo Redis (Redis >= 7, Valkey,
+  Dragonfly). Requiere el paquete redis. CACHE_URL = redis://host:6379/0
+- sqlite: archivo compartido por los workers de una misma máquina; sirve
+  como sustituto local de Redis en pruebas. CACHE_URL = ruta del archivo.
+
+Los valores se guardan como JSON, con TTL y etiquetas (tags) para invalidar
+grupos de claves. Cada invalidate_tags avanza una generación del backend y la
+anota en sus etiquetas: set(..., generation=) descarta un valor calculado
+antes de que se invalidara alguna de sus etiquetas. publish()/subscribe() reparten eventos de invalidación a
+todos los workers: así los caches en memoria (perfiles, catálogo, esqueletos
+de course_content) se invalidan en todos los procesos tras una escritura.
+Un payload None en un evento significa "invalidar todo".
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from uuid import uuid4
+
+from cachetools import TLRUCache, TTLCache
+
+from app.parameters import settings
+
+logger = logging.getLogger(__name__)
+
+# Cuánto se recuerda la generación de una etiqueta invalidada: más que
+# cualquier consulta entre generation() y set()
+TAG_GENERATION_TTL = 3600
+
+
+class CacheBackend(ABC):
+    """
+    Interfaz común: get/set/delete/invalidate_tags para los valores y
+    publish/subscribe para los eventos de invalidación.
+    """
+
+    name = "base"
+    # False: los eventos no salen del proceso
+    broadcasts = True
+
+    def __init__(self, namespace: str, default_ttl: float):
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.origin = uuid4().hex
+        self._handlers: dict[str, list] = {}
+        self._outbox = queue.Queue()
+        self._sender = None
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.discarded = 0
+        self.published = 0
+        self.received = 0
+
+    # ---------------------------------------------- Valores ----------------------------------------------
+    def get(self, key: str):
+        raw = self._get(key)
+        with self._stats_lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def generation(self) -> int:
+        # Leer antes de calcular el valor y pasarlo a set()
+        return self._generation()
+
+    def set(self, key: str, value, ttl: float = None, tags=(), generation: int = None) -> bool:
+        """
+        Con generation (de generation(), leída antes de calcular el valor) no
+        se guarda si alguna de las etiquetas se invalidó desde entonces: el
+        valor pudo leer datos anteriores a esa escritura. Retorna si se guardó.
+        """
+        stored = self._set(key, json.dumps(value), ttl or self.default_ttl, tuple(tags), generation)
+        with self._stats_lock:
+            if stored:
+                self.sets += 1
+            else:
+                self.discarded += 1
+        return stored
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def invalidate_tags(self, *tags) -> int:
+        """
+        Borra todas las claves asociadas a alguna de las etiquetas y les anota
+        una generación nueva. Retorna cuántas claves se borraron.
+        """
+
+    @abstractmethod
+    def _generation(self) -> int:
+        ...
+
+    @abstractmethod
+    def _get(self, key: str) -> str | None:
+        ...
+
+    @abstractmethod
+    def _set(self, key: str, raw: str, ttl: float, tags: tuple, generation: int | None) -> bool:
+        ...
+
+    # ---------------------------------------------- Eventos ----------------------------------------------
+    def subscribe(self, event: str, handler) -> None:
+        # handler(payload) se llama en este worker para cada publish del evento
+        self._handlers.setdefault(event, []).append(handler)
+
+    def publish(self, event: str, payload=None) -> None:
+        """
+        Aplica el evento en este worker y lo envía al resto. El envío lo hace
+        un hilo aparte (se llama desde after_commit, a veces en el event loop);
+        sin start() se envía en línea.
+        """
+        self._dispatch(event, payload)
+        if not self.broadcasts:
+            return
+        message = json.dumps({"origin": self.origin, "event": event, "payload": payload})
+        if self._sender is not None:
+            self._outbox.put((self._send, message))
+        else:
+            self._send(message)
+
+    def invalidate_tags_later(self, *tags) -> None:
+        """
+        invalidate_tags en el hilo de envío, en orden con los publish. Para
+        llamar desde el event loop, donde no se puede esperar I/O del backend;
+        sin start() se invalida en línea.
+        """
+        if self._sender is not None:
+            self._outbox.put((self._invalidate_queued, tags))
+        else:
+            self._invalidate_queued(tags)
+
+    def _invalidate_queued(self, tags: tuple) -> None:
+        try:
+            self.invalidate_tags(*tags)
+        except Exception as e:
+            # Las entradas afectadas quedan hasta su TTL
+            logger.warning(f"Cache tag invalidation failed for {sorted(tags)}: {e!r}")
+
+    def _send(self, message: str) -> None:
+        try:
+            self._broadcast(message)
+            with self._stats_lock:
+                self.published += 1
+        except Exception as e:
+            # Sin bus el resto de workers dependen del TTL de sus caches
+            logger.warning(f"Cache invalidation broadcast failed: {e!r}")
+
+    def _send_loop(self) -> None:
+        while (item := self._outbox.get()) is not None:
+            func, arg = item
+            func(arg)
+
+    def _receive(self, raw) -> None:
+        message = json.loads(raw)
+        if message["origin"] == self.origin:
+            return
+        with self._stats_lock:
+            self.received += 1
+        self._dispatch(message["event"], message["payload"])
+
+    def _dispatch(self, event: str, payload) -> None:
+        for handler in self._handlers.get(event, []):
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.error(f"Cache invalidation handler for {event} failed: {e!r}")
+
+    def _resync(self) -> None:
+        # Tras perder el bus pudo haber eventos sin recibir: invalidar todo
+        for event in list(self._handlers):
+            self._dispatch(event, None)
+
+    def _broadcast(self, message: str) -> None:
+        # Sin bus por defecto (MemoryCache); los backends compartidos lo sobreescriben
+        pass
+
+    def start(self) -> None:
+        if self.broadcasts and self._sender is None:
+            self._sender = threading.Thread(target=self._send_loop, name="cache-publish", daemon=True)
+            self._sender.start()
+
+    def close(self) -> None:
+        if self._sender is not None:
+            # Vaciar los eventos e invalidaciones pendientes antes de salir
+            self._outbox.put(None)
+            self._sender.join(timeout=5)
+            self._sender = None
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "backend": self.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "sets": self.sets,
+                "discarded": self.discarded,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "published": self.published,
+                "received": self.received
+            }
+
+
+class MemoryCache(CacheBackend):
+    """
+    Cache en proceso (LRU con TTL por entrada). Los eventos no salen del worker.
+    """
+
+    name = "memory"
+    broadcasts = False
+
+    def __init__(self, namespace: str, default_ttl: float, maxsize: int = 10_000):
+        super().__init__(namespace, default_ttl)
+        self._cache = TLRUCache(maxsize=maxsize, ttu=lambda key, value, now: now + value[0])
+        self._tags: dict[str, set[str]] = {}
+        # Generación de la última invalidación por etiqueta
+        self._invalidated = TTLCache(maxsize=maxsize, ttl=TAG_GENERATION_TTL)
+        self._generation_count = 0
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._cache.get(key)
+            return entry[1] if entry else None
+
+    def _generation(self) -> int:
+        with self._lock:
+            return self._generation_count
+
+    def _set(self, key: str, raw: str, ttl: float, tags: tuple, generation: int | None) -> bool:
+        with self._lock:
+            if generation is not None and any(self._invalidated.get(tag, 0) > generation for tag in tags):
+                return False
+            self._cache[key] = (ttl, raw)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            if len(self._tags) > self._cache.maxsize:
+                # Quitar del índice las claves que ya expiraron o salieron por LRU
+                self._tags = {
+                    tag: alive
+                    for tag, keys in self._tags.items()
+                    if (alive := {key for key in keys if key in self._cache})
+                }
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def invalidate_tags(self, *tags) -> int:
+        deleted = 0
+        with self._lock:
+            if tags:
+                self._generation_count += 1
+            for tag in tags:
+                self._invalidated[tag] = self._generation_count
+                for key in self._tags.pop(tag, ()):
+                    if self._cache.pop(key, None) is not None:
+                        deleted += 1
+        return deleted
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._cache), "tags": len(self._tags)}
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache compartido en un archivo SQLite (modo WAL) para los workers de una
+    misma máquina. Los eventos se escriben en una tabla que cada worker
+    consulta cada poll_interval segundos.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, namespace: str, default_ttl: float, poll_interval: float = 0.5):
+        # "" o ":memory:" crean una base privada por conexión: nada se compartiría
+        if not path or path == ":memory:":
+            raise ValueError("CACHE_BACKEND=sqlite requires CACHE_URL to be a file path")
+        super().__init__(namespace, default_ttl)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._stopped = threading.Event()
+        self._thread = None
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS cache_tags (
+                    tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key)
+                );
+                CREATE TABLE IF NOT EXISTS cache_tag_generations (
+                    tag TEXT PRIMARY KEY, generation INTEGER NOT NULL, invalidated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS cache_generations (
+                    namespace TEXT PRIMARY KEY, generation INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS cache_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT NOT NULL, created_at REAL NOT NULL
+                );
+            """)
+        self._last_event = self._max_event_id()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Una conexión por hilo; autocommit con isolation_level=None
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _max_event_id(self) -> int:
+        return self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM cache_events").fetchone()[0]
+
+    def _get(self, key: str) -> str | None:
+        row = self._connection().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?",
+            (self._key(key), time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _generation(self) -> int:
+        row = self._connection().execute(
+            "SELECT generation FROM cache_generations WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _set(self, key: str, raw: str, ttl: float, tags: tuple, generation: int | None) -> bool:
+        tag_keys = [self._key(tag) for tag in tags]
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if generation is not None and tag_keys:
+                placeholders = ",".join("?" * len(tag_keys))
+                invalidated = conn.execute(
+                    f"SELECT 1 FROM cache_tag_generations WHERE tag IN ({placeholders}) AND generation > ? LIMIT 1",
+                    [*tag_keys, generation]
+                ).fetchone()
+                if invalidated:
+                    return False
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (self._key(key), raw, time.time() + ttl)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)",
+                [(tag_key, self._key(key)) for tag_key in tag_keys]
+            )
+        return True
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (self._key(key),))
+
+    def invalidate_tags(self, *tags) -> int:
+        tag_keys = [self._key(tag) for tag in tags]
+        if not tag_keys:
+            return 0
+        placeholders = ",".join("?" * len(tag_keys))
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO cache_generations (namespace, generation) VALUES (?, 1) "
+                "ON CONFLICT (namespace) DO UPDATE SET generation = generation + 1",
+                (self.namespace,)
+            )
+            generation = conn.execute(
+                "SELECT generation FROM cache_generations WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache_tag_generations (tag, generation, invalidated_at) VALUES (?, ?, ?)",
+                [(tag_key, generation, time.time()) for tag_key in tag_keys]
+            )
+            deleted = conn.execute(
+                f"DELETE FROM cache_entries WHERE key IN "
+                f"(SELECT key FROM cache_tags WHERE tag IN ({placeholders}))",
+                tag_keys
+            ).rowcount
+            conn.execute(f"DELETE FROM cache_tags WHERE tag IN ({placeholders})", tag_keys)
+        return deleted
+
+    def _broadcast(self, message: str) -> None:
+        self._connection().execute(
+            "INSERT INTO cache_events (message, created_at) VALUES (?, ?)",
+            (message, time.time())
+        )
+
+    def _poll(self) -> None:
+        last_purge = time.monotonic()
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                rows = self._connection().execute(
+                    "SELECT id, message FROM cache_events WHERE id > ? ORDER BY id",
+                    (self._last_event,)
+                ).fetchall()
+                for event_id, message in rows:
+                    self._last_event = event_id
+                    self._receive(message)
+
+                if time.monotonic() - last_purge > 60:
+                    last_purge = time.monotonic()
+                    now = time.time()
+                    conn = self._connection()
+                    conn.execute("DELETE FROM cache_events WHERE created_at < ?", (now - 60,))
+                    conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+                    conn.execute("DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)")
+                    conn.execute(
+                        "DELETE FROM cache_tag_generations WHERE invalidated_at < ?",
+                        (now - TAG_GENERATION_TTL,)
+                    )
+            except Exception as e:
+                logger.warning(f"SQLite cache poll failed: {e!r}")
+
+    def start(self) -> None:
+        super().start()
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._poll, name="cache-events", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        super().close()
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache sobre un servidor con protocolo Redis. Las etiquetas son SETs con
+    las claves asociadas y los eventos van por PUBLISH/SUBSCRIBE en un canal.
+    La generación es un contador INCR y cada etiqueta invalidada guarda la
+    suya en una clave aparte, vigilada con WATCH al guardar.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, namespace: str, default_ttl: float, channel: str):
+        if not url:
+            raise ValueError("CACHE_BACKEND=redis requires CACHE_URL (redis://host:6379/0)")
+        super().__init__(namespace, default_ttl)
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package (pip install redis)") from e
+        self.channel = channel
+        self._watch_error = redis.WatchError
+        self._client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.namespace}:tag:{tag}"
+
+    def _generation_key(self, tag: str = None) -> str:
+        return f"{self.namespace}:generation" if tag is None else f"{self.namespace}:generation:{tag}"
+
+    def _get(self, key: str) -> str | None:
+        raw = self._client.get(self._key(key))
+        return raw.decode() if raw is not None else None
+
+    def _generation(self) -> int:
+        return int(self._client.get(self._generation_key()) or 0)
+
+    def _set(self, key: str, raw: str, ttl: float, tags: tuple, generation: int | None) -> bool:
+        ttl = max(1, int(ttl))
+        with self._client.pipeline() as pipe:
+            if generation is not None and tags:
+                generation_keys = [self._generation_key(tag) for tag in tags]
+                pipe.watch(*generation_keys)
+                if any(int(value or 0) > generation for value in pipe.mget(generation_keys)):
+                    return False
+                pipe.multi()
+            pipe.set(self._key(key), raw, ex=ttl)
+            for tag in tags:
+                # El SET de la etiqueta vive al menos tanto como su clave más larga
+                pipe.sadd(self._tag(tag), self._key(key))
+                pipe.expire(self._tag(tag), ttl, nx=True)
+                pipe.expire(self._tag(tag), ttl, gt=True)
+            try:
+                pipe.execute()
+            except self._watch_error:
+                # Una etiqueta se invalidó entre la comprobación y el guardado
+                return False
+        return True
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._key(key))
+
+    def invalidate_tags(self, *tags) -> int:
+        if tags:
+            # La generación va antes de borrar: un set() en medio o la ve o se borra después
+            generation = self._client.incr(self._generation_key())
+            with self._client.pipeline() as pipe:
+                for tag in tags:
+                    pipe.set(self._generation_key(tag), generation, ex=TAG_GENERATION_TTL)
+                pipe.execute()
+        deleted = 0
+        for tag in tags:
+            keys = self._client.smembers(self._tag(tag))
+            if keys:
+                deleted += self._client.delete(*keys)
+            self._client.delete(self._tag(tag))
+        return deleted
+
+    def _broadcast(self, message: str) -> None:
+        self._client.publish(self.channel, message)
+
+    def _listen(self) -> None:
+        connected_before = False
+        while not self._stopped.is_set():
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                if connected_before:
+                    self._resync()
+                connected_before = True
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._receive(message["data"])
+            except Exception as e:
+                logger.warning(f"Cache invalidation channel lost, reconnecting: {e!r}")
+                self._stopped.wait(1.0)
+            finally:
+                pubsub.close()
+
+    def start(self) -> None:
+        super().start()
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._listen, name="cache-events", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        super().close()
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._client.close()
+
+
+def create_cache(backend: str, url: str = "") -> CacheBackend:
+    namespace = settings.CACHE_NAMESPACE
+    default_ttl = settings.CACHE_DEFAULT_TTL
+    if backend == "redis":
+        return RedisCache(url, namespace, default_ttl, channel=f"{namespace}:invalidate")
+    if backend == "sqlite":
+        return SQLiteCache(url.removeprefix("sqlite:///"), namespace, default_ttl)
+    if backend == "memory":
+        return MemoryCache(namespace, default_ttl)
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+
+cache = create_cache(settings.CACHE_BACKEND, settings.CACHE_URL)
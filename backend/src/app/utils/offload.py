@@ -0,0 +1,134 @@
+"""
+Ejecución de trabajo síncrono (queries con Session, storage R2, Stripe, Resend)
+fuera del event loop, en hilos acotados por un CapacityLimiter propio.
+
+- db_pool: tamaño = pool_size + max_overflow del engine (config.pool_args,
+  también en modo pooler), así nunca hay más hilos esperando conexión que
+  conexiones posibles. DB_OFFLOAD_THREADS > 0 lo fija a mano.
+- io_pool: trabajo bloqueante que no usa la base: llamadas HTTP a servicios
+  externos (R2, Stripe) y hashing bcrypt.
+
+Cada pool registra la cola (tareas enviadas que aún no arrancaron) y el
+tiempo de espera hasta obtener hilo, expuestos en /health/offload.
+"""
+
+import time
+from collections import deque
+from threading import Lock
+
+import anyio
+from anyio import to_thread
+
+from app.database.config import pool_args
+from app.parameters import settings
+
+# Con NullPool el engine no pone tope: lo pone el pooler de transacciones
+NULLPOOL_DB_THREADS = 15
+
+
+class OffloadPool:
+    """
+    Pool de hilos acotado e instrumentado sobre anyio.to_thread.run_sync.
+    """
+
+    def __init__(self, name: str, size: int, sample_size: int = 1000):
+        self.name = name
+        self.size = size
+        self._limiter = None
+        self._lock = Lock()
+        self._waits = deque(maxlen=sample_size)
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def limiter(self) -> anyio.CapacityLimiter:
+        # Se crea dentro del event loop en el primer uso
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.size)
+        return self._limiter
+
+    async def run(self, func, *args, **kwargs):
+        submitted = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        started = False
+
+        def call():
+            nonlocal started
+            started = True
+            wait = time.perf_counter() - submitted
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self._waits.append(wait)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        try:
+            return await to_thread.run_sync(call, limiter=self.limiter)
+        finally:
+            if not started:
+                # Cancelada mientras esperaba hilo
+                with self._lock:
+                    self.queued -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            completed = self.completed
+            return {
+                "size": self.size,
+                "queued": self.queued,
+                "running": self.running,
+                "max_queued": self.max_queued,
+                "completed": completed,
+                "avg_wait_ms": round(self.total_wait / completed * 1000, 3) if completed else 0.0,
+                "p95_wait_ms": round(waits[int(len(waits) * 0.95) - 1] * 1000, 3) if waits else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3)
+            }
+
+
+def db_pool_size() -> int:
+    if settings.DB_OFFLOAD_THREADS > 0:
+        return settings.DB_OFFLOAD_THREADS
+    if "pool_size" not in pool_args:
+        return NULLPOOL_DB_THREADS
+    return pool_args["pool_size"] + pool_args.get("max_overflow", 0)
+
+
+db_pool = OffloadPool("db", db_pool_size())
+io_pool = OffloadPool("io", settings.IO_OFFLOAD_THREADS)
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Ejecuta una función de app/database/queries (u otra que use la Session
+    síncrona) en el pool de base de datos.
+    """
+    return await db_pool.run(func, *args, **kwargs)
+
+
+async def run_io(func, *args, **kwargs):
+    """
+    Ejecuta trabajo bloqueante sin base de datos (storage, Stripe, bcrypt).
+    """
+    return await io_pool.run(func, *args, **kwargs)
+
+
+def get_offload_stats() -> dict:
+    return {
+        "db": db_pool.stats(),
+        "io": io_pool.stats()
+    }
@@ -1,3 +1,10 @@
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+# Paginación keyset sobre (created_at, id)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
 
 def course_to_dict(course):
     return {
@@ -13,3 +20,63 @@ def course_to_dict(course):
         "price": course.price
     }
 
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decodifica un cursor opaco generado por encode_cursor.
+    Lanza ValueError si el cursor no es válido.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_page(db, stmt, created_col, id_col, limit: int = DEFAULT_PAGE_SIZE, before: str = None, after: str = None):
+    """
+    Ejecuta stmt paginando por (created_at, id).
+
+    - after: devuelve las filas más nuevas que el cursor (polling incremental).
+    - before: devuelve la página anterior (más antigua) al cursor.
+    - sin cursor: devuelve la página más reciente.
+
+    Las filas siempre se devuelven en orden cronológico. has_more indica si
+    quedan filas más antiguas (before/sin cursor) o más nuevas (after).
+    """
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    key = tuple_(created_col, id_col)
+
+    if after:
+        stmt = stmt.where(key > decode_cursor(after)).order_by(created_col.asc(), id_col.asc())
+        rows = db.execute(stmt.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        if before:
+            stmt = stmt.where(key < decode_cursor(before))
+        stmt = stmt.order_by(created_col.desc(), id_col.desc())
+        rows = db.execute(stmt.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+
+    return rows, has_more
+
+
+def page_cursors(items: list, has_more: bool, after: str = None) -> dict:
+    """
+    Cursores para la respuesta: before_cursor pide la página anterior,
+    after_cursor se usa para consultar solo lo nuevo.
+    """
+    return {
+        "has_more": has_more,
+        "before_cursor": items[0]["cursor"] if items else None,
+        "after_cursor": items[-1]["cursor"] if items else after
+    }
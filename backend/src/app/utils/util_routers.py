@@ -1,4 +1,4 @@
-from app.database.queries.threads import get_threads_by_lesson_id
+from app.database.queries.threads import get_threads_by_lesson_ids
 from app.database.session import retry_db_operation
 from app.database.base import Course
 from app.utils.storage import delete_file
@@ -12,30 +12,34 @@ import ffmpeg
 import tempfile
 import math
 import os
+import logging
+
+logger = logging.getLogger(__name__)
+
 
 @retry_db_operation(max_retries=2, delay=0.3)
 def include_threads(lessons: list, db_session=None) -> list:
     """
-    Include threads for lessons using the provided database session
-    to avoid creating multiple connections
+    Include thread summaries for lessons using the provided database session.
+    All lessons are resolved with a single batched query.
     """
     if not db_session:
         raise ValueError("Database session is required")
-    
+
+    lesson_ids = [lesson["id"] for lesson in lessons]
+    try:
+        threads_by_lesson = get_threads_by_lesson_ids(
+            db=db_session,
+            lesson_ids=lesson_ids
+        )
+    except Exception as e:
+        # Sin hilos vacíos de relleno: el resultado puede terminar en course_content_cache
+        logger.error(f"Failed to get threads for lessons {lesson_ids}: {e!r}")
+        raise
+
     new_list = []
     for lesson in lessons:
-        lesson_id = lesson["id"]
-        try:
-            get_threads = get_threads_by_lesson_id(
-                db=db_session,
-                lesson_id=lesson_id
-            )
-            lesson["threads"] = get_threads
-        except Exception as e:
-            # Log the error but don't fail the entire operation
-            print(f"Warning: Failed to get threads for lesson {lesson_id}: {e}")
-            lesson["threads"] = []
-        
+        lesson["threads"] = threads_by_lesson.get(lesson["id"], [])
         new_list.append(lesson)
 
     return new_list
@@ -143,9 +147,13 @@ def process_code(
         db: Session,
         user_id: int = None,
         email: str = None,
-        username: str = None,
         is_restore: bool = False
 ):
+    """
+    Parte de base de datos del envío de código: crea el código de verificación
+    (o el token de restauración) y borra los códigos vencidos. Va en run_db;
+    el correo lo manda send_code_mail en run_io, sin ocupar una conexión.
+    """
     # Create verification code/token
     if is_restore:
         token: str = create_reset_token(data={"user_id": user_id, "email": email})
@@ -184,13 +192,26 @@ def process_code(
     # Delete expired codes
     delete_expired_codes(db=db)
 
+    response={
+        "status": 200,
+        "value": code.code if not is_restore else token,
+        }
+    
+    return response
+
+
+def send_code_mail(email: str, username: str, value: str, is_restore: bool = False) -> bool:
+    """
+    Envía por correo el código (o la URL de restauración) creado por process_code.
+    Llamada HTTP a Resend: va en run_io.
+    """
     # Send code or Url to the email
     if is_restore:
         send_mail_response = resend_mail(
             message=f"""
             We received a request to reset your password.
             To proceed with resetting your password, please use the following URL:
-            {settings.FRONTEND_URL}/auth/reset-password?token={token}
+            {settings.FRONTEND_URL}/auth/reset-password?token={value}
             If you did not request a password reset, please ignore this email.
             """,
             issue=f"Reset your password - ByteTech",
@@ -204,26 +225,18 @@ def process_code(
             Welcome to ByteTech!
             Thank you for registering with us. 
             To verify your email address and activate your account, please enter the following verification code:
-            {code.code}
+            {value}
             """,
-            issue=f"Your verification code - {code.code}",
+            issue=f"Your verification code - {value}",
             client_mail=email,
             username=username,
             is_restore_or_verify=True
         )
 
     if not send_mail_response:
-        response={
-            "status": 500,
-            "message": "Failed to send email"
-            }
-
-    response={
-        "status": 200,
-        "value": code.code if not is_restore else token,
-        }
-    
-    return response
+        logger.warning(f"Failed to send {'reset' if is_restore else 'verification'} email to user {username}")
+        return False
+    return True
 
 
 
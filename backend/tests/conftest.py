@@ -0,0 +1,30 @@
+"""
+Configuración común de los tests.
+
+Las settings obligatorias de la app toman valores de prueba si no vienen del
+entorno. Los tests que necesitan Postgres leen TEST_DATABASE_URL: una base
+descartable cuyo esquema public se recrea; sin esa variable se saltan.
+"""
+
+import os
+
+import pytest
+
+for name, value in {
+    "SUPABASE_URL": "postgresql://test@localhost/test",
+    "SUPABASE_URL_TEST": "postgresql://test@localhost/test",
+    "R2_ENDPOINT": "http://localhost:9000",
+    "RESEND_API_KEY": "test",
+    "SENDER_MAIL": "test",
+    "RECEIVER_MAIL": "test",
+    "STRIPE_API_KEY": "test",
+    "STRIPE_WEBHOOK": "test",
+    "R2_ACCESS_KEY_ID": "test",
+    "R2_SECRET_ACCESS_KEY": "test",
+    "R2_BUCKET": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+requires_postgres = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
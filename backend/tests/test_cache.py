@@ -0,0 +1,177 @@
+"""
+Backends de app/utils/cache.py: valores con TTL y etiquetas, y reparto de
+eventos de invalidación. No necesitan Postgres.
+"""
+
+import time
+
+import pytest
+
+from app.utils.cache import CacheBackend, MemoryCache, SQLiteCache, create_cache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryCache("test", default_ttl=60)
+    else:
+        backend = SQLiteCache(str(tmp_path / "cache.db"), "test", default_ttl=60)
+    yield backend
+    backend.close()
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend("test", default_ttl=60)
+
+
+def test_get_set_roundtrip(backend):
+    assert backend.get("missing") is None
+    backend.set("course:1", {"id": 1, "name": "Python", "tags": [1, 2]})
+    assert backend.get("course:1") == {"id": 1, "name": "Python", "tags": [1, 2]}
+
+    stats = backend.stats()
+    assert (stats["hits"], stats["misses"], stats["sets"]) == (1, 1, 1)
+
+
+def test_set_expires_after_ttl(backend):
+    backend.set("short", 1, ttl=0.2)
+    assert backend.get("short") == 1
+    time.sleep(0.3)
+    assert backend.get("short") is None
+
+
+def test_delete(backend):
+    backend.set("key", "value")
+    backend.delete("key")
+    assert backend.get("key") is None
+
+
+def test_invalidate_tags(backend):
+    backend.set("courses:all", [1, 2], tags=["courses"])
+    backend.set("course:1", 1, tags=["courses", "courses:1"])
+    backend.set("course:2", 2, tags=["courses:2"])
+
+    assert backend.invalidate_tags("courses:1") == 1
+    assert backend.get("course:1") is None
+    assert backend.get("courses:all") == [1, 2]
+
+    assert backend.invalidate_tags("courses", "courses:2") == 2
+    assert backend.get("courses:all") is None
+    assert backend.get("course:2") is None
+    assert backend.invalidate_tags() == 0
+
+
+def test_set_discards_values_computed_before_an_invalidation(backend):
+    generation = backend.generation()
+    backend.invalidate_tags("courses:1")
+
+    assert backend.set("course:1", 1, tags=["courses:1"], generation=generation) is False
+    assert backend.get("course:1") is None
+    # Otras etiquetas no se ven afectadas
+    assert backend.set("course:2", 2, tags=["courses:2"], generation=generation) is True
+    assert backend.get("course:2") == 2
+    # Calculado después de la invalidación: se guarda
+    assert backend.set("course:1", 1, tags=["courses:1"], generation=backend.generation()) is True
+    assert backend.get("course:1") == 1
+    assert backend.stats()["discarded"] == 1
+
+
+def test_invalidate_tags_later(backend):
+    backend.set("course:1", 1, tags=["courses:1"])
+    backend.invalidate_tags_later("courses:1")
+    assert backend.get("course:1") is None
+
+
+def test_invalidate_tags_later_runs_on_the_sender_thread(tmp_path):
+    backend = SQLiteCache(str(tmp_path / "cache.db"), "test", default_ttl=60)
+    backend.set("course:1", 1, tags=["courses:1"])
+    backend.start()
+    backend.invalidate_tags_later("courses:1")
+    # close() vacía la cola del hilo de envío
+    backend.close()
+    assert backend.get("course:1") is None
+
+
+def test_publish_dispatches_locally(backend):
+    received = []
+    backend.subscribe("catalog", received.append)
+    backend.publish("catalog", 7)
+    backend.publish("catalog")
+    assert received == [7, None]
+
+
+def test_failing_handler_does_not_block_others(backend):
+    received = []
+    backend.subscribe("catalog", lambda payload: 1 / 0)
+    backend.subscribe("catalog", received.append)
+    backend.publish("catalog", 1)
+    assert received == [1]
+
+
+def test_memory_cache_does_not_broadcast():
+    first = MemoryCache("test", default_ttl=60)
+    second = MemoryCache("test", default_ttl=60)
+    received = []
+    second.subscribe("catalog", received.append)
+    first.publish("catalog", 1)
+    first.set("key", 1)
+    assert received == []
+    assert second.get("key") is None
+
+
+def test_sqlite_cache_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = SQLiteCache(path, "test", default_ttl=60, poll_interval=0.05)
+    second = SQLiteCache(path, "test", default_ttl=60, poll_interval=0.05)
+    received = []
+    second.subscribe("course_content", received.append)
+    first.start()
+    second.start()
+    try:
+        first.set("course:1", {"id": 1}, tags=["courses"])
+        assert second.get("course:1") == {"id": 1}
+        generation = first.generation()
+        assert second.invalidate_tags("courses") == 1
+        assert first.get("course:1") is None
+        assert first.set("course:1", {"id": 1}, tags=["courses"], generation=generation) is False
+
+        first.publish("course_content", 3)
+        assert wait_for(lambda: received == [3])
+        # El propio worker no recibe su evento dos veces
+        time.sleep(0.2)
+        assert first.stats()["received"] == 0
+        assert second.stats()["received"] == 1
+    finally:
+        first.close()
+        second.close()
+
+
+def test_sqlite_cache_namespaces_are_isolated(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = SQLiteCache(path, "app1", default_ttl=60)
+    second = SQLiteCache(path, "app2", default_ttl=60)
+    first.set("key", 1, tags=["tag"])
+    assert second.get("key") is None
+    assert second.invalidate_tags("tag") == 0
+    assert first.get("key") == 1
+
+
+@pytest.mark.parametrize("url", ["", ":memory:", "sqlite:///"])
+def test_sqlite_cache_requires_a_file(url):
+    with pytest.raises(ValueError):
+        create_cache("sqlite", url)
+
+
+def test_create_cache_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        create_cache("memcached")
@@ -0,0 +1,77 @@
+"""
+Decorador cached_query de app/database/query_cache.py sobre un backend
+compartido (SQLite). No necesita Postgres: las funciones cacheadas reciben
+una Session sin conexión.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.database import query_cache
+from app.database.query_cache import cached_query, get_query_cache_stats
+from app.parameters import settings
+from app.utils.cache import SQLiteCache
+
+
+@pytest.fixture
+def shared_cache(monkeypatch, tmp_path):
+    backend = SQLiteCache(str(tmp_path / "cache.db"), "test", default_ttl=60)
+    monkeypatch.setattr(query_cache, "cache", backend)
+    monkeypatch.setattr(settings, "QUERY_CACHE_ENABLED", True)
+    yield backend
+    backend.close()
+
+
+def make_query(calls: list):
+    @cached_query(tables=("courses",), tags=lambda args, result: [f"courses:{args['course_id']}"])
+    def get_course(db: Session, course_id: int):
+        calls.append(course_id)
+        return {"id": course_id}
+    return get_course
+
+
+def test_cached_query_hits_off_the_event_loop(shared_cache):
+    calls = []
+    get_course = make_query(calls)
+    assert get_course(Session(), 1) == {"id": 1}
+    assert get_course(Session(), 1) == {"id": 1}
+    assert calls == [1]
+
+    shared_cache.invalidate_tags("courses:1")
+    get_course(Session(), 1)
+    assert calls == [1, 1]
+
+
+def test_cached_query_skips_the_cache_on_the_event_loop(shared_cache):
+    calls = []
+    get_course = make_query(calls)
+
+    async def handler():
+        # Como AsyncSession.run_sync: código síncrono en el hilo del loop
+        return get_course(Session(), 2)
+
+    assert asyncio.run(handler()) == {"id": 2}
+    assert asyncio.run(handler()) == {"id": 2}
+    assert calls == [2, 2]
+    assert shared_cache.sets == 0
+    assert get_query_cache_stats()["test_query_cache.get_course"]["bypassed"] >= 2
+
+
+def test_cached_query_discards_results_invalidated_while_running(shared_cache):
+    calls = []
+
+    @cached_query(tables=("courses",), tags=lambda args, result: [f"courses:{args['course_id']}"])
+    def get_course(db: Session, course_id: int):
+        calls.append(course_id)
+        if len(calls) == 1:
+            # Otra sesión hace commit de una escritura al curso durante la consulta
+            shared_cache.invalidate_tags("courses:3")
+        return {"id": course_id}
+
+    get_course(Session(), 3)
+    assert shared_cache.stats()["discarded"] == 1
+    get_course(Session(), 3)
+    get_course(Session(), 3)
+    assert calls == [3, 3]
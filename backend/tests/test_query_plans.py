@@ -0,0 +1,133 @@
+"""
+Comprueba con EXPLAIN que las consultas principales de app/database/queries
+usan índices sobre un dataset sembrado (esquema creado con las migraciones).
+"""
+
+import argparse
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from app.parameters import settings
+from app.database.queries import courses, lessons, marks, messages, progress, sections, threads, user
+from app.database.queries.courses import entitlement_cache
+from conftest import TEST_DATABASE_URL, requires_postgres
+
+pytestmark = requires_postgres
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Tablas sembradas con suficientes filas para que un Seq Scan sea un error de plan
+LARGE_TABLES = {
+    "users", "courses", "sections", "lessons", "threads", "messages", "lessons_complete",
+    "lesson_mark_time", "my_byd_courses", "course_progress",
+}
+
+SEED = [
+    "INSERT INTO users (id, username, email) "
+    "SELECT g, 'user ' || g, 'user' || g || '@test' FROM generate_series(1, 20000) g",
+    "INSERT INTO courses (id, sensei_id, name, price, lessons_count) "
+    "SELECT g, 1 + g % 100, 'course ' || g, 10, 100 FROM generate_series(1, 500) g",
+    "INSERT INTO sections (id, course_id, title) "
+    "SELECT g, 1 + (g - 1) / 10, 'section ' || g FROM generate_series(1, 5000) g",
+    "INSERT INTO lessons (id, section_id, course_id, title) "
+    "SELECT g, 1 + (g - 1) / 10, 1 + (g - 1) / 100, 'lesson ' || g FROM generate_series(1, 50000) g",
+    "INSERT INTO threads (id, lesson_id, user_id, topic) "
+    "SELECT g, 1 + g % 50000, 1 + g % 20000, 'topic ' || g FROM generate_series(1, 200000) g",
+    "INSERT INTO messages (thread_id, user_id, message) "
+    "SELECT 1 + g % 200000, 1 + g % 20000, 'message ' || g FROM generate_series(1, 500000) g",
+    "INSERT INTO lessons_complete (user_id, lesson_id) "
+    "SELECT 1 + g % 20000, 1 + g / 20000 FROM generate_series(0, 199999) g",
+    "INSERT INTO lesson_mark_time (user_id, lesson_id, mark_time, updated_at) "
+    "SELECT 1 + g % 20000, 1 + g / 20000, 30, now() - g * interval '1 second' FROM generate_series(0, 199999) g",
+    "INSERT INTO my_byd_courses (user_id, course_id, price) "
+    "SELECT 1 + g % 20000, 1 + g / 20000, 10 FROM generate_series(0, 99999) g",
+    "INSERT INTO course_progress (user_id, course_id, lesson_ids) "
+    "SELECT 1 + g % 20000, 1 + g / 20000, ARRAY[1, 2, 3] FROM generate_series(0, 99999) g",
+]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.cmd_opts = argparse.Namespace(x=[f"url={TEST_DATABASE_URL}"])
+    command.upgrade(config, "head")
+
+    with engine.begin() as conn:
+        for statement in SEED:
+            conn.execute(text(statement))
+        conn.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def no_result_caches(monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_CACHE_ENABLED", False)
+    entitlement_cache.clear()
+
+
+def _seq_scans(plan: dict) -> set[str]:
+    tables = set()
+    if plan.get("Node Type") == "Seq Scan":
+        tables.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        tables |= _seq_scans(child)
+    return tables
+
+
+QUERY_CASES = [
+    (progress.is_lesson_completed, {"user_id": 5, "lesson_id": 3}),
+    (progress.get_completed_lesson_ids, {"user_id": 5, "course_id": 1}),
+    (progress.get_course_progress, {"user_id": 5, "course_id": 1}),
+    (marks.get_marks_by_lessons, {"user_id": 5, "lesson_ids": [1, 2, 3, 4]}),
+    (marks.get_last_watched_by_course, {"user_id": 5, "course_ids": [1, 2, 3]}),
+    (courses.get_owned_course_ids, {"user_id": 5}),
+    (courses.get_purchased_courses_by_user, {"user_id": 5}),
+    (courses.get_course_by_name, {"name": "course 7"}),
+    (courses.get_courses_by_user, {"user_id": 7}),
+    (sections.get_sections_by_course_id, {"course_id": 3}),
+    (lessons.get_lessons_by_section_ids, {"section_ids": [21, 22, 23]}),
+    (threads.get_threads_by_lesson_id, {"lesson_id": 10}),
+    (threads.get_threads_by_lesson_ids, {"lesson_ids": [10, 11, 12]}),
+    (threads.get_unread_activity_by_course, {"user_id": 5, "course_ids": [1, 2, 3]}),
+    (messages.get_messages_by_thread_id, {"thread_id": 10}),
+    (user.get_user_by_email, {"email": "user5@test"}),
+]
+
+
+@pytest.mark.parametrize(
+    "func, kwargs",
+    [pytest.param(func, kwargs, id=func.__name__) for func, kwargs in QUERY_CASES]
+)
+def test_query_uses_indexes(engine, func, kwargs):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    with Session(engine) as db:
+        # Costo de lectura aleatoria para SSD (el valor que usa Supabase)
+        db.execute(text("SET random_page_cost = 1.1"))
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            func(db, **kwargs)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        assert statements, f"{func.__name__} ran no SELECT"
+        for statement, parameters in statements:
+            plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+            scanned = _seq_scans(plan[0]["Plan"]) & LARGE_TABLES
+            assert not scanned, f"{func.__name__}: Seq Scan on {sorted(scanned)}\n{statement}"
+        db.rollback()